@@ -5,6 +5,10 @@ from sqlalchemy import pool
 
 from alembic import context
 
+import models  # noqa: F401  реєструє всі таблиці в Base.metadata
+from models.base import Base
+from postgreSQLConnect import DATABASE_URI
+
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
 config = context.config
@@ -14,11 +18,14 @@ config = context.config
 if config.config_file_name is not None:
     fileConfig(config.config_file_name)
 
+# Та сама база, що й у застосунку (DATABASE_URL / .env), а не адреса з alembic.ini
+config.set_main_option("sqlalchemy.url", DATABASE_URI.replace("%", "%%"))
+
 # add your model's MetaData object here
 # for 'autogenerate' support
 # from myapp import mymodel
 # target_metadata = mymodel.Base.metadata
-target_metadata = None
+target_metadata = Base.metadata
 
 # other values from the config, defined by the needs of env.py,
 # can be acquired:
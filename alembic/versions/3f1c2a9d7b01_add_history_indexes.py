@@ -0,0 +1,51 @@
+"""add composite (fk, date) indexes to history tables
+
+Revision ID: 3f1c2a9d7b01
+Revises:
+Create Date: 2026-10-18 09:20:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f1c2a9d7b01'
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (назва індексу, таблиця, колонки)
+INDEXES = [
+    ('ix_sale_history_product_id_sale_date', 'sale_history', ['product_id', 'sale_date']),
+    ('ix_sale_history_customer_id_sale_date', 'sale_history', ['customer_id', 'sale_date']),
+    ('ix_sale_history_sale_date_id', 'sale_history', ['sale_date', 'id']),
+    ('ix_purchase_history_product_id_purchase_date', 'purchase_history', ['product_id', 'purchase_date']),
+    ('ix_purchase_history_supplier_id_purchase_date', 'purchase_history', ['supplier_id', 'purchase_date']),
+    ('ix_stock_history_product_id_timestamp', 'stock_history', ['product_id', 'timestamp']),
+    ('ix_packaging_sale_history_sale_id', 'packaging_sale_history', ['sale_id']),
+    ('ix_packaging_sale_history_material_id_sale_date', 'packaging_sale_history',
+     ['packaging_material_id', 'sale_date']),
+    ('ix_packaging_purchase_history_material_id_purchase_date', 'packaging_purchase_history',
+     ['material_id', 'purchase_date']),
+    ('ix_packaging_purchase_history_supplier_id_purchase_date', 'packaging_purchase_history',
+     ['supplier_id', 'purchase_date']),
+    ('ix_packaging_stock_history_material_id_timestamp', 'packaging_stock_history', ['material_id', 'timestamp']),
+    ('ix_gift_set_sales_history_sold_at_id', 'gift_set_sales_history', ['sold_at', 'id']),
+    ('ix_gift_set_sales_history_customer_id_sold_at', 'gift_set_sales_history', ['customer_id', 'sold_at']),
+    ('ix_gift_set_sales_history_gift_set_id', 'gift_set_sales_history', ['gift_set_id']),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # if_not_exists: таблиці могли бути створені через create_all() вже з цими індексами
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns, if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table, if_exists=True)
@@ -0,0 +1,33 @@
+"""add product_article_seq for PRD-xxxx article numbers
+
+Revision ID: 8b4e6d0c2f13
+Revises: 3f1c2a9d7b01
+Create Date: 2026-10-18 09:45:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8b4e6d0c2f13'
+down_revision: Union[str, Sequence[str], None] = '3f1c2a9d7b01'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("CREATE SEQUENCE IF NOT EXISTS product_article_seq")
+    # Продовжуємо нумерацію після найбільшого наявного артикула
+    op.execute(
+        "SELECT setval('product_article_seq', "
+        "COALESCE((SELECT max(substring(article FROM '^PRD-([0-9]+)$')::bigint) FROM products), 1), "
+        "(SELECT count(*) > 0 FROM products WHERE article ~ '^PRD-[0-9]+$'))"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP SEQUENCE IF EXISTS product_article_seq")
@@ -0,0 +1,67 @@
+"""add monthly_rollup with a backfill from sale_history and purchase_history
+
+Revision ID: e4a7c1d9b352
+Revises: c5d21a7e9f40
+Create Date: 2026-10-18 18:40:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4a7c1d9b352'
+down_revision: Union[str, Sequence[str], None] = 'c5d21a7e9f40'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (таблиця, колонка дати, {метрика: колонка-джерело або None для кількості записів}) —
+# копія services/rollup_service.py на момент міграції
+SOURCES = [
+    ('sale_history', 'sale_date', {
+        'sales_total': 'selling_total_price',
+        'sales_quantity': 'quantity_sold',
+        'sales_profit': 'profit',
+        'sales_count': None,
+    }),
+    ('purchase_history', 'purchase_date', {
+        'purchases_total': 'purchase_total_price',
+        'purchases_quantity': 'quantity_purchase',
+        'purchases_price_per_item_sum': 'purchase_price_per_item',
+        'purchases_count': None,
+    }),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # if_not_exists: таблицю могли вже створити create_all() або rebuild_monthly_rollup.py
+    op.create_table(
+        'monthly_rollup',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('year', sa.Integer(), nullable=False),
+        sa.Column('month', sa.Integer(), nullable=False),
+        sa.Column('metric', sa.String(length=50), nullable=False),
+        sa.Column('value', sa.DECIMAL(18, 4), nullable=False),
+        sa.UniqueConstraint('year', 'month', 'metric', name='uq_monthly_rollup_year_month_metric'),
+        if_not_exists=True,
+    )
+
+    # Бекфіл: те саме, що rebuild_monthly_rollup(), — рахуємо заново, навіть якщо таблиця вже була
+    op.execute("DELETE FROM monthly_rollup")
+    for table, date_column, metrics in SOURCES:
+        for metric, column in metrics.items():
+            aggregate = 'count(id)' if column is None else f'COALESCE(sum({column}), 0)'
+            op.execute(
+                f"INSERT INTO monthly_rollup (year, month, metric, value) "
+                f"SELECT extract(year FROM {date_column}), extract(month FROM {date_column}), '{metric}', {aggregate} "
+                f"FROM {table} WHERE {date_column} IS NOT NULL "
+                f"GROUP BY 1, 2"
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('monthly_rollup', if_exists=True)
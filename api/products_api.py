@@ -1,5 +1,10 @@
+from flask import request
 from flask_restx import Namespace, Resource
+from models import Product, Supplier, Category, product_categories_table
 from services.product_service import ProductService
+from services.serializers import parse_fields, PRODUCT_FIELDS
+from services.streaming import wants_ndjson, ndjson_response
+from services.table_versions import conditional_get
 
 products_ns = Namespace(
     "products",
@@ -8,9 +13,20 @@ products_ns = Namespace(
 
 @products_ns.route("/")
 class ProductList(Resource):
+    @conditional_get(Product, Supplier, Category, product_categories_table)
     def get(self):
         """
         Отримати всі товари
+
+        З заголовком Accept: application/x-ndjson товари віддаються потоком, по одному на рядок.
+        ?fields=id,name,... — лише вказані поля (і лише їхні колонки в запиті).
         """
-        products, status = ProductService.get_all_products()
+        try:
+            fields = parse_fields(request.args.get('fields'), PRODUCT_FIELDS)
+        except ValueError as e:
+            return {'error': str(e)}, 400
+
+        if wants_ndjson():
+            return ndjson_response(ProductService.iter_all_products(fields))
+        products, status = ProductService.get_all_products(fields)
         return products, status
\ No newline at end of file
@@ -0,0 +1,114 @@
+"""
+Масове завантаження через COPY (bulk_loader) проти пакетного імпортера (import_engine) на згенерованих CSV.
+
+Генерує --rows рядків товарів у --files файлах у форматі import_data_csv/csv_product (кожен файл — окрема
+дата надходження; частина назв повторюється між файлами, тож імпорт і створює товари, і додає надходження).
+Кожен режим завантажує ті самі файли в порожню схему; наприкінці порівнюються підсумки по товарах.
+
+    BENCH_DATABASE_URL=... python -m benchmarks.bulk_import --rows 1000000
+"""
+import argparse
+import csv
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, func
+
+from benchmarks.common import reset_schema, print_table
+from import_data_func.bulk_loader import bulk_load_products
+from import_data_func.import_engine import import_products_files
+from models import Product, PurchaseHistory
+from postgreSQLConnect import db_session
+from services.rollup_service import rebuild_monthly_rollup
+
+HEADER = ['Наименование', 'Поставщик', 'Количество', 'Стоимость за 1 шт', 'Стоимость за количество']
+FIRST_DATE = datetime(2023, 1, 15)
+
+
+def generate(directory, rows, files, seed=42):
+    """Пише CSV-файли і повертає [(шлях, дата)] у порядку імпорту."""
+    rng = random.Random(seed)
+    names = max(rows // 10, 1)
+    suppliers = max(names // 50, 1)
+    per_file = -(-rows // files)
+    result = []
+    for index in range(files):
+        path = os.path.join(directory, f'products_{index:03d}.csv')
+        with open(path, 'w', encoding='utf-8', newline='') as file:
+            writer = csv.writer(file)
+            writer.writerow(HEADER)
+            for _ in range(min(per_file, rows - index * per_file)):
+                product = rng.randrange(names)
+                quantity = rng.randint(1, 50)
+                price = rng.randint(100, 10_000) / 100
+                writer.writerow([f'Товар {product}', f'Постачальник {product % suppliers}', f'{quantity} шт',
+                                 f'{price:.2f}'.replace('.', ','), f'{price * quantity:.2f}'.replace('.', ',')])
+        result.append((path, FIRST_DATE + timedelta(days=30 * index)))
+    return result
+
+
+def load_copy(files, workers):
+    report = bulk_load_products(db_session, files)
+    rebuild_monthly_rollup(db_session)  # bulk-режим не веде monthly_rollup по ходу
+    db_session.commit()
+    return report
+
+
+def load_batches(files, workers):
+    return import_products_files(db_session, files, workers=workers)
+
+
+MODES = {
+    'copy': load_copy,
+    'batches': load_batches,
+}
+
+
+def totals():
+    """Підсумки, які мають збігатися між режимами."""
+    return tuple(db_session.execute(select(
+        select(func.count(Product.id)).scalar_subquery(),
+        select(func.sum(Product.total_quantity)).scalar_subquery(),
+        select(func.sum(Product.purchase_total_price)).scalar_subquery(),
+        select(func.count(PurchaseHistory.id)).scalar_subquery(),
+    )).one())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--files', type=int, default=10)
+    parser.add_argument('--workers', type=int, default=1, help='parse processes for the batch importer')
+    parser.add_argument('--modes', nargs='+', choices=MODES, default=list(MODES))
+    parser.add_argument('--dir', help='where to write the CSV files (default: a temporary directory)')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        directory = args.dir or tmp
+        os.makedirs(directory, exist_ok=True)
+        print(f'Generating {args.rows:,} rows in {args.files} files...')
+        files = generate(directory, args.rows, args.files)
+
+        rows, results = [], {}
+        for mode in args.modes:
+            reset_schema()
+            started = time.perf_counter()
+            report = MODES[mode](files, args.workers)
+            elapsed = time.perf_counter() - started
+            db_session.remove()
+            results[mode] = totals()
+            db_session.remove()
+            rows.append([mode, f'{elapsed:.1f}', f'{report.rows / elapsed:,.0f}', report.inserted, report.updated,
+                         len(report.errors)])
+
+    print_table(['mode', 'seconds', 'rows/s', 'inserted', 'updated', 'errors'], rows)
+    if len(set(results.values())) > 1:
+        raise SystemExit(f'Modes disagree on product totals: {results}')
+    print('Product count, quantities, purchase totals and purchase history match across modes.')
+
+
+if __name__ == '__main__':
+    main()
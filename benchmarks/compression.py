@@ -0,0 +1,81 @@
+"""
+Байти на дроті і процесорний час стиснення відповідей (services/compression.py) по ендпоінтах.
+
+Кожна відповідь береться один раз без стиснення (Accept-Encoding: identity), після чого стискається
+кожним кодуванням: gzip рівнів 1/6/9 і brotli якостей 4/6 (якщо встановлено). Потокові відповіді (NDJSON, CSV)
+стискаються тими самими фрагментами, що й у застосунку, з flush кожні COMPRESS_STREAM_FLUSH_SIZE байтів;
+рядок «gzip-6, flush 0» показує ціну flush після кожного фрагмента.
+
+    BENCH_DATABASE_URL=... python -m benchmarks.compression --products 50000
+"""
+import argparse
+
+from benchmarks.common import seed_catalog, get_app, cpu_time, print_table
+from services.compression import GzipEncoder, BrotliEncoder, brotli_available
+
+ENDPOINTS = [
+    ('products, json', 'GET', '/api/get_all_products/', {}),
+    ('products, ndjson', 'GET', '/api/get_all_products/', {'Accept': 'application/x-ndjson'}),
+    ('customers, json', 'GET', '/api/customers/get_all_customers', {}),
+    ('gift sets, json', 'GET', '/api/get_all_gift_sets', {}),
+    ('sales history, json', 'GET', '/api/get_all_sales_history', {}),
+    ('sales history, ndjson', 'GET', '/api/get_all_sales_history', {'Accept': 'application/x-ndjson'}),
+    ('sales export, csv', 'POST', '/api/export/sales', {}),
+]
+
+
+def encoders():
+    result = [(f'gzip-{level}', GzipEncoder(level=level)) for level in (1, 6, 9)]
+    result.append(('gzip-6, flush 0', GzipEncoder(level=6, flush_size=0)))
+    if brotli_available():
+        result += [(f'br-{quality}', BrotliEncoder(quality=quality)) for quality in (4, 6)]
+    return result
+
+
+def fetch(client, method, url, headers):
+    """Фрагменти тіла без стиснення — так, як їх віддає застосунок, — і чи відповідь потокова."""
+    response = client.open(url, method=method, buffered=False, json={'format': 'csv'} if method == 'POST' else None,
+                           headers={**headers, 'Accept-Encoding': 'identity'})
+    assert response.status_code == 200, (url, response.status_code)
+    streamed = response.is_streamed
+    chunks = [chunk for chunk in response.response if chunk]
+    response.close()
+    return chunks, streamed
+
+
+def compress(encoder, chunks, streamed):
+    if streamed:
+        return b''.join(encoder.stream(iter(chunks)))
+    return encoder.compress(b''.join(chunks))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--products', type=int, default=50_000)
+    parser.add_argument('--sales', type=int, default=200_000)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--skip-seed', action='store_true', help='reuse the data from a previous run')
+    args = parser.parse_args()
+
+    if not args.skip_seed:
+        print(f'Seeding {args.products:,} products and {args.sales:,} sales...')
+        seed_catalog(args.products, args.sales)
+    client = get_app().test_client()
+
+    rows = []
+    for name, method, url, headers in ENDPOINTS:
+        chunks, streamed = fetch(client, method, url, headers)
+        size = sum(len(chunk) for chunk in chunks)
+        for encoding, encoder in encoders():
+            if encoder.flush_size == 0 and not streamed:
+                continue  # flush стосується лише потокових відповідей
+            compressed = len(compress(encoder, chunks, streamed))
+            cpu = cpu_time(lambda: compress(encoder, chunks, streamed), repeat=args.repeat)
+            rows.append([name, f'{size / 1024:,.0f}', encoding, f'{compressed / 1024:,.0f}',
+                         f'{size / compressed:.1f}x', f'{cpu * 1000:,.1f}', f'{size / cpu / 2 ** 20:,.0f}'])
+
+    print_table(['endpoint', 'raw, KiB', 'encoding', 'on wire, KiB', 'ratio', 'CPU, ms', 'MiB/s'], rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""
+Швидкість і розмір експорту (services/export_engine.py) у кожному форматі: xlsx, csv, parquet.
+
+Для кожного набору даних пише файл кожним форматом у тимчасовий файл і друкує рядків за секунду,
+байтів на рядок і пік пам'яті Python. Parquet міряється лише зі встановленим pyarrow
+(pip install .[parquet]).
+
+    BENCH_DATABASE_URL=... python -m benchmarks.export_formats --products 50000 --sales 1000000
+"""
+import argparse
+import tempfile
+import time
+import tracemalloc
+
+from sqlalchemy import select, func
+
+from benchmarks.common import seed_catalog, print_table
+from postgreSQLConnect import db_session
+from services.export_engine import EXPORT_DATASETS, EXPORT_FORMATS, ExportParams, parquet_available
+
+DATASETS = ('products', 'sales')
+
+
+def count_rows(dataset, params):
+    query = dataset.build_query(params).order_by(None).subquery()
+    return db_session.scalar(select(func.count()).select_from(query))
+
+
+def export(export_format, dataset, params, trace):
+    """(секунди, байтів у файлі, пік пам'яті в байтах або None)."""
+    with tempfile.TemporaryFile() as file:
+        if trace:
+            tracemalloc.start()
+        started = time.perf_counter()
+        try:
+            export_format.write(db_session, dataset, params, file)
+            elapsed = time.perf_counter() - started
+            peak = tracemalloc.get_traced_memory()[1] if trace else None
+        finally:
+            if trace:
+                tracemalloc.stop()
+            db_session.remove()
+        file.seek(0, 2)
+        return elapsed, file.tell(), peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--products', type=int, default=50_000)
+    parser.add_argument('--sales', type=int, default=1_000_000)
+    parser.add_argument('--skip-seed', action='store_true', help='reuse the data from a previous run')
+    parser.add_argument('--no-memory', action='store_true', help='skip the tracemalloc run (it slows the export)')
+    args = parser.parse_args()
+
+    if not args.skip_seed:
+        print(f'Seeding {args.products:,} products and {args.sales:,} sales...')
+        seed_catalog(args.products, args.sales)
+
+    formats = [name for name in EXPORT_FORMATS if name != 'parquet' or parquet_available()]
+    if 'parquet' not in formats:
+        print('pyarrow is not installed: parquet is skipped (pip install .[parquet])')
+
+    params = ExportParams()
+    rows = []
+    for dataset_name in DATASETS:
+        dataset = EXPORT_DATASETS[dataset_name]
+        total = count_rows(dataset, params)
+        db_session.remove()
+        for format_name in formats:
+            elapsed, size, _ = export(EXPORT_FORMATS[format_name], dataset, params, trace=False)
+            peak = None if args.no_memory else export(EXPORT_FORMATS[format_name], dataset, params, trace=True)[2]
+            rows.append([dataset_name, format_name, f'{total:,}', f'{elapsed:.1f}', f'{total / elapsed:,.0f}',
+                         f'{size / total:.1f}', f'{size / 2 ** 20:,.1f}',
+                         '-' if peak is None else f'{peak / 2 ** 20:,.1f}'])
+
+    print_table(['dataset', 'format', 'rows', 'seconds', 'rows/s', 'bytes/row', 'file, MiB', 'peak, MiB'], rows)
+
+
+if __name__ == '__main__':
+    main()
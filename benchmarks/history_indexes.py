@@ -0,0 +1,175 @@
+"""
+Затримка ендпоінтів історії до і після композитних індексів (fk, дата) з міграції 3f1c2a9d7b01.
+
+Заливає --rows рядків у sale_history, purchase_history і stock_history (і --rows / 5 у таблиці історії
+пакування), міряє ендпоінти без індексів міграції, створює їх знову і міряє ще раз. Для кожного
+ендпоінта друкує медіану затримки й індекси, які планувальник обрав для його запитів (EXPLAIN).
+
+    BENCH_DATABASE_URL=... python -m benchmarks.history_indexes --rows 1000000
+"""
+import argparse
+import importlib.util
+import re
+from pathlib import Path
+
+from sqlalchemy import event
+
+from benchmarks.common import reset_schema, execute_sql, analyze, get_app, measure, print_table
+from postgreSQLConnect import engine, db_session
+
+MIGRATION = Path(__file__).resolve().parent.parent / 'alembic' / 'versions' / '3f1c2a9d7b01_add_history_indexes.py'
+
+PRODUCTS = 20_000
+CUSTOMERS = 20_000
+SUPPLIERS = 2_000
+PACKAGINGS = 2_000
+PACKAGING_SUPPLIERS = 200
+DAYS = 3 * 365
+
+
+def load_migration_indexes():
+    spec = importlib.util.spec_from_file_location('history_indexes_migration', MIGRATION)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.INDEXES
+
+
+def seed(rows):
+    reset_schema()
+    packaging_rows = rows // 5
+    execute_sql(
+        f"INSERT INTO suppliers (name, is_active) SELECT 'Supplier ' || i, true FROM generate_series(1, {SUPPLIERS}) i",
+        f"INSERT INTO customers (name) SELECT 'Customer ' || i FROM generate_series(1, {CUSTOMERS}) i",
+        f"""INSERT INTO products (name, supplier_id, total_quantity, available_quantity, sold_quantity, reserved_quantity,
+                selling_quantity, purchase_price_per_item, purchase_total_price, selling_price_per_item,
+                selling_total_price, article, product_description, created_date)
+            SELECT 'Product ' || i, 1 + i % {SUPPLIERS}, 100, 100, 0, 0, 0, 2.5, 250, 5, 0,
+                   'BENCH-' || i, '', now() FROM generate_series(1, {PRODUCTS}) i""",
+        f"""INSERT INTO packaging_material_suppliers (name, is_active)
+            SELECT 'Packaging supplier ' || i, true FROM generate_series(1, {PACKAGING_SUPPLIERS}) i""",
+        f"""INSERT INTO packaging_materials (name, packaging_material_supplier_id, total_quantity, available_quantity,
+                reserved_quantity, sold_quantity, purchase_price_per_unit, created_date)
+            SELECT 'Box ' || i, 1 + i % {PACKAGING_SUPPLIERS}, 100, 100, 0, 0, 1, now()
+            FROM generate_series(1, {PACKAGINGS}) i""",
+        f"""INSERT INTO sale_history (product_id, customer_id, quantity_sold, selling_price_per_item,
+                selling_total_price, sale_date, profit, packaging_material_id, packaging_quantity, total_packaging_cost)
+            SELECT 1 + i % {PRODUCTS}, 1 + (i * 7) % {CUSTOMERS}, 1, 5, 5,
+                   timestamp '2022-01-01' + (i % {DAYS}) * interval '1 day' + (i % 86400) * interval '1 second',
+                   2.5, CASE WHEN i % 5 = 0 THEN 1 + i % {PACKAGINGS} END, 0, 0
+            FROM generate_series(1, {rows}) i""",
+        f"""INSERT INTO purchase_history (product_id, supplier_id, purchase_price_per_item, purchase_total_price,
+                purchase_date, quantity_purchase)
+            SELECT 1 + i % {PRODUCTS}, 1 + (i % {PRODUCTS}) % {SUPPLIERS}, 2.5, 25,
+                   date '2022-01-01' + i % {DAYS}, 10
+            FROM generate_series(1, {rows}) i""",
+        f"""INSERT INTO stock_history (product_id, change_amount, change_type, timestamp)
+            SELECT 1 + i % {PRODUCTS}, 1, 'purchase', timestamp '2022-01-01' + (i % {DAYS}) * interval '1 day'
+            FROM generate_series(1, {rows}) i""",
+        f"""INSERT INTO packaging_sale_history (sale_id, packaging_material_id, packaging_quantity,
+                total_packaging_cost, sale_date)
+            SELECT i * 5, 1 + (i * 5) % {PACKAGINGS}, 1, 1, timestamp '2022-01-01' + (i % {DAYS}) * interval '1 day'
+            FROM generate_series(1, {packaging_rows}) i""",
+        f"""INSERT INTO packaging_purchase_history (material_id, supplier_id, quantity_purchased,
+                purchase_price_per_unit, purchase_total_price, purchase_date)
+            SELECT 1 + i % {PACKAGINGS}, 1 + (i % {PACKAGINGS}) % {PACKAGING_SUPPLIERS}, 10, 1, 10,
+                   timestamp '2022-01-01' + (i % {DAYS}) * interval '1 day'
+            FROM generate_series(1, {packaging_rows}) i""",
+        f"""INSERT INTO packaging_stock_history (material_id, change_amount, change_type, timestamp)
+            SELECT 1 + i % {PACKAGINGS}, 1, 'purchase', timestamp '2022-01-01' + (i % {DAYS}) * interval '1 day'
+            FROM generate_series(1, {packaging_rows}) i""",
+    )
+    analyze()
+
+
+ENDPOINTS = [
+    ('product history', '/api/product/{product}/history'),
+    ('customer details', '/api/customers_details/{customer}'),
+    ('supplier purchase history', '/api/supplier/{supplier}/purchase-history'),
+    ('packaging material history', '/api/materials/{packaging}/history'),
+    ('packaging supplier purchases', '/api/packaging-supplier/{packaging_supplier}/purchase-history'),
+    ('sales page, customer filter', '/api/get_sales_history_page?customer_id={customer}&limit=50'),
+    ('sales page, product + period', '/api/get_sales_history_page?product_id={product}&date_from=2023-01-01'
+                                     '&date_to=2023-12-31'),
+    ('statistics: top products', '/api/statistics/top-products'),
+    ('statistics: customer activity', '/api/statistics/customer-activity'),
+    ('statistics: profit-expense', '/api/statistics/profit-expense'),
+]
+
+IDS = {'product': 1234, 'customer': 4321, 'supplier': 123, 'packaging': 321, 'packaging_supplier': 12}
+
+
+def used_indexes(client, url, index_names):
+    """Імена індексів міграції в планах усіх запитів, які виконує ендпоінт."""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(('SELECT', 'WITH')):
+            statements.append((statement, parameters))
+
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        client.get(url)
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+
+    used = set()
+    raw = engine.raw_connection()
+    try:
+        cursor = raw.cursor()
+        for statement, parameters in statements:
+            cursor.execute('EXPLAIN ' + statement, parameters)
+            plan = '\n'.join(row[0] for row in cursor.fetchall())
+            used.update(name for name in re.findall(r'(?:using|on) (\w+)', plan) if name in index_names)
+        raw.rollback()
+    finally:
+        raw.close()
+    return sorted(used)
+
+
+def run(client, repeat, index_names):
+    results = {}
+    for name, template in ENDPOINTS:
+        url = template.format(**IDS)
+        status = client.get(url).status_code
+        results[name] = (status, measure(lambda: client.get(url), repeat=repeat), used_indexes(client, url, index_names))
+        db_session.remove()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1_000_000, help='rows in each product history table')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--skip-seed', action='store_true', help='reuse the data from a previous run')
+    args = parser.parse_args()
+
+    indexes = load_migration_indexes()
+    index_names = {name for name, _, _ in indexes}
+
+    if not args.skip_seed:
+        print(f'Seeding {args.rows:,} rows per history table...')
+        seed(args.rows)
+    client = get_app().test_client()
+
+    execute_sql(*(f'DROP INDEX IF EXISTS {name}' for name, _, _ in indexes))
+    analyze()
+    before = run(client, args.repeat, index_names)
+
+    from models import Base
+    for name, table, _ in indexes:
+        index = next(index for index in Base.metadata.tables[table].indexes if index.name == name)
+        index.create(engine, checkfirst=True)
+    analyze()
+    after = run(client, args.repeat, index_names)
+
+    rows = []
+    for name, _ in ENDPOINTS:
+        status, without, _ = before[name]
+        _, with_indexes, used = after[name]
+        rows.append([name, status, f'{without * 1000:.1f}', f'{with_indexes * 1000:.1f}',
+                     f'{without / with_indexes:.1f}x', ', '.join(used) or '-'])
+    print_table(['endpoint', 'status', 'without, ms', 'with, ms', 'speedup', 'indexes used'], rows)
+
+
+if __name__ == '__main__':
+    main()
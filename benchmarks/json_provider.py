@@ -0,0 +1,73 @@
+"""
+Серіалізація відповідей: FastJSONProvider (orjson, services/json_provider.py) проти стандартного
+DefaultJSONProvider Flask на даних найбільших списків.
+
+Дані кожного списку будуються один раз тими ж функціями, що й ендпоінти (з Decimal і datetime як є),
+після чого міряється лише кодування: response() для JSON-відповіді цілком і dumps() по рядку для NDJSON.
+
+    BENCH_DATABASE_URL=... python -m benchmarks.json_provider --products 50000 --sales 200000
+"""
+import argparse
+
+from flask.json.provider import DefaultJSONProvider
+
+from benchmarks.common import seed_catalog, get_app, measure, print_table
+from postgreSQLConnect import db_session
+from services.json_provider import FastJSONProvider, orjson
+from services.sales_history_services import query_product_sales, query_gift_set_sales, serialize_product_sale, \
+    serialize_gift_set_sale
+from services.serializers import iter_products, iter_customers, list_gift_sets
+
+
+def sales_history():
+    return [serialize_product_sale(sale) for sale in query_product_sales(db_session).all()] + \
+           [serialize_gift_set_sale(sale) for sale in query_gift_set_sales(db_session).all()]
+
+
+PAYLOADS = [
+    ('products', lambda: list(iter_products(db_session))),
+    ('sales history', sales_history),
+    ('gift sets', lambda: list_gift_sets(db_session)),
+    ('customers', lambda: list(iter_customers(db_session))),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--products', type=int, default=50_000)
+    parser.add_argument('--sales', type=int, default=200_000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--skip-seed', action='store_true', help='reuse the data from a previous run')
+    args = parser.parse_args()
+
+    if orjson is None:
+        raise SystemExit('orjson is not installed: FastJSONProvider falls back to json and there is nothing to compare')
+    if not args.skip_seed:
+        print(f'Seeding {args.products:,} products and {args.sales:,} sales...')
+        seed_catalog(args.products, args.sales)
+
+    app = get_app()
+    providers = [('json', DefaultJSONProvider(app)), ('orjson', FastJSONProvider(app))]
+
+    rows = []
+    with app.app_context():
+        for name, load in PAYLOADS:
+            payload = load()
+            db_session.remove()
+            size = len(providers[1][1].response(payload).get_data())
+            timings = {}
+            for provider_name, provider in providers:
+                timings[provider_name, 'response'] = measure(lambda: provider.response(payload), repeat=args.repeat)
+                timings[provider_name, 'ndjson'] = measure(
+                    lambda: [provider.dumps(row) + '\n' for row in payload], repeat=args.repeat
+                )
+            for mode in ('response', 'ndjson'):
+                old, new = timings['json', mode], timings['orjson', mode]
+                rows.append([name, mode, f'{len(payload):,}', f'{size / 2 ** 20:,.1f}', f'{old * 1000:,.1f}',
+                             f'{new * 1000:,.1f}', f'{old / new:.1f}x', f'{size / new / 2 ** 20:,.0f}'])
+
+    print_table(['payload', 'mode', 'rows', 'MiB', 'json, ms', 'orjson, ms', 'speedup', 'orjson, MiB/s'], rows)
+
+
+if __name__ == '__main__':
+    main()
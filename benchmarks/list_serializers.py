@@ -0,0 +1,122 @@
+"""
+Серіалізатори списків на проєкціях (services/serializers.py) проти старого шляху ORM-об'єкт + to_dict().
+
+Старий шлях відтворено тут так, як він був у сервісах до проєкцій. Для кожного списку друкує процесорний
+час на рядок (медіана) і пік виділеної пам'яті Python (tracemalloc) для обох шляхів і перевіряє,
+що словники однакові.
+
+    BENCH_DATABASE_URL=... python -m benchmarks.list_serializers --products 50000
+"""
+import argparse
+import tracemalloc
+
+from sqlalchemy.orm import joinedload
+
+from benchmarks.common import seed_catalog, cpu_time, print_table
+from models import Product, PackagingMaterial, Customer, OtherInvestment
+from postgreSQLConnect import db_session
+from services.serializers import iter_products, iter_packaging_materials, iter_customers, iter_investments
+
+
+def legacy_product(product):
+    product_dict = product.to_dict()
+    product_dict['purchase_total_price'] = float(product.purchase_total_price)
+    product_dict['purchase_price_per_item'] = float(product.purchase_price_per_item)
+    product_dict['selling_total_price'] = float(product.selling_total_price or 0)
+    product_dict['selling_price_per_item'] = float(product.selling_price_per_item or 0)
+    product_dict['category_ids'] = [category.id for category in product.categories]
+    product_dict['supplier'] = product.supplier.to_dict() if product.supplier else None
+    return product_dict
+
+
+def legacy_products():
+    products = db_session.query(Product).options(joinedload(Product.categories), joinedload(Product.supplier)).all()
+    return [legacy_product(product) for product in products]
+
+
+def legacy_packaging_materials():
+    return [material.to_dict() for material in db_session.query(PackagingMaterial).all()]
+
+
+def legacy_customers():
+    return [customer.to_dict() for customer in db_session.query(Customer).all()]
+
+
+def legacy_investments():
+    return [{
+        "id": inv.id,
+        "type_name": inv.type_name,
+        "cost": float(inv.cost),
+        "supplier": inv.supplier,
+        "date": inv.date.strftime('%Y-%m-%d')
+    } for inv in db_session.query(OtherInvestment).all()]
+
+
+LISTS = [
+    ('products', legacy_products, lambda: list(iter_products(db_session))),
+    ('packaging materials', legacy_packaging_materials, lambda: list(iter_packaging_materials(db_session))),
+    ('customers', legacy_customers, lambda: list(iter_customers(db_session))),
+    ('investments', legacy_investments, lambda: list(iter_investments(db_session))),
+]
+
+
+def normalized(rows):
+    """Порядок рядків і id категорій у старому шляху не гарантований."""
+    result = []
+    for row in rows:
+        if 'category_ids' in row:
+            row = {**row, 'category_ids': sorted(row['category_ids'])}
+        result.append(row)
+    return sorted(result, key=lambda row: row['id'])
+
+
+def run(load):
+    """Список у новій сесії: identity map попереднього виміру не допомагає наступному."""
+    try:
+        return load()
+    finally:
+        db_session.remove()
+
+
+def peak_memory(load):
+    tracemalloc.start()
+    try:
+        run(load)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--products', type=int, default=50_000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--skip-seed', action='store_true', help='reuse the data from a previous run')
+    args = parser.parse_args()
+
+    if not args.skip_seed:
+        print(f'Seeding {args.products:,} products...')
+        seed_catalog(args.products, sales=0)
+
+    rows = []
+    for name, legacy, projection in LISTS:
+        legacy_rows, projection_rows = run(legacy), run(projection)
+        if normalized(legacy_rows) != normalized(projection_rows):
+            raise SystemExit(f'{name}: projection output differs from to_dict()')
+        count = len(projection_rows)
+        del legacy_rows, projection_rows
+
+        results = []
+        for load in (legacy, projection):
+            cpu = cpu_time(lambda: run(load), repeat=args.repeat)
+            results.append((cpu / count * 1e6, peak_memory(load) / 2 ** 20))
+        (old_cpu, old_peak), (new_cpu, new_peak) = results
+        rows.append([name, f'{count:,}', f'{old_cpu:.1f}', f'{new_cpu:.1f}', f'{old_cpu / new_cpu:.1f}x',
+                     f'{old_peak:,.1f}', f'{new_peak:,.1f}'])
+
+    print_table(['list', 'rows', 'to_dict, us/row', 'projection, us/row', 'speedup', 'to_dict peak, MiB',
+                 'projection peak, MiB'], rows)
+
+
+if __name__ == '__main__':
+    main()
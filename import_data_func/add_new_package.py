@@ -1,10 +1,8 @@
 import os
 from datetime import datetime
 
-import csv
-from sqlalchemy.exc import IntegrityError
-
-from models import PackagingMaterial, PackagingMaterialSupplier, PackagingPurchaseHistory, PackagingStockHistory
+from import_data_func.bulk_loader import bulk_load_packaging
+from import_data_func.import_engine import import_packaging_csv, import_packaging_files
 from postgreSQLConnect import db_session
 
 
@@ -14,99 +12,32 @@ def import_packaging_materials_from_csv(file_path, purchase_date, db_session):
     """
     Import packaging materials from a CSV file into the database.
 
+    Рядки пишуться пакетами через import_engine; помилки окремих рядків не зупиняють імпорт.
+
     :param file_path: Path to the CSV file.
     :param purchase_date: Date of purchase.
     :param db_session: SQLAlchemy session instance.
+    :return: ImportReport або None, якщо файл не знайдено.
     """
     try:
-        with open(file_path, newline='', encoding='utf-8') as csvfile:
-            reader = csv.DictReader(csvfile)
-
-            for row in reader:
-                name = row.get('Наименование')
-                raw_supplier_name = row.get('Поставщик')
-
-                quantity = int(row['Количество'].split()[0])
-                total_cost = float(row.get('Стоимость за количество', 0).replace(',', '.'))
-                cost_per_unit = float(row.get('Стоимость за 1 шт', 0).replace(',', '.'))
-
-                # Truncate supplier_name to 30 characters and store full name in contact_info
-                # Обробка імені постачальника
-                supplier_name = raw_supplier_name.strip() if raw_supplier_name and raw_supplier_name.strip() else "N/A"
-                truncated_supplier_name = supplier_name[:30]
-                contact_info = supplier_name
-
-                # Get or create PackagingMaterialSupplier
-                supplier = db_session.query(PackagingMaterialSupplier).filter_by(name=truncated_supplier_name).first()
-                if not supplier:
-                    supplier = PackagingMaterialSupplier(
-                        name=truncated_supplier_name,
-                        contact_info=contact_info,
-                        address=contact_info
-                    )
-                    db_session.add(supplier)
-                    db_session.commit()
-
-                # Check if the packaging material already exists
-                material = db_session.query(PackagingMaterial).filter_by(
-                    name=name, packaging_material_supplier_id=supplier.id).first()
-
-                if material:
-                    # Update existing material
-                    material.available_quantity += quantity
-                    material.total_quantity += quantity
-                    material.purchase_price_per_unit = cost_per_unit
-                    material.total_purchase_cost += total_cost
-                    material.available_stock_cost += total_cost
-                else:
-                    # Add new material
-                    material = PackagingMaterial(
-                        name=name,
-                        packaging_material_supplier_id=supplier.id,
-                        total_quantity=quantity,
-                        available_quantity=quantity,
-                        purchase_price_per_unit=cost_per_unit,
-                        reorder_level=0,
-                        created_date=purchase_date,
-                        total_purchase_cost=total_cost,
-                        available_stock_cost=quantity * cost_per_unit
-                    )
-                    db_session.add(material)
-                    db_session.flush()  # Забезпечує генерацію material.id
-
-                # Add to purchase history
-                purchase_history = PackagingPurchaseHistory(
-                    material_id=material.id,
-                    supplier_id=supplier.id,
-                    quantity_purchased=quantity,
-                    purchase_price_per_unit=cost_per_unit,
-                    purchase_total_price=total_cost,
-                    purchase_date=purchase_date
-                )
-                db_session.add(purchase_history)
-
-                # Add to stock history
-                stock_history = PackagingStockHistory(
-                    material_id=material.id,
-                    change_amount=quantity,
-                    change_type='purchase',
-                    timestamp=purchase_date
-                )
-                db_session.add(stock_history)
-
-            db_session.commit()
-            print(f"Successfully imported packaging materials from {file_path}")
+        report = import_packaging_csv(db_session, file_path, purchase_date)
     except FileNotFoundError:
         print(f"File not found: {file_path}")
-    except IntegrityError as e:
-        db_session.rollback()
-        print(f"Integrity error: {e}")
-    except Exception as e:
-        db_session.rollback()
-        print(f"Error processing file {file_path}: {e}")
+        return None
+
+    print(f"Imported packaging materials from {file_path}: {report.summary()}")
+    for error_file, line_no, message in report.errors:
+        print(f"  line {line_no}: {message}")
+    return report
 
 
-def import_all_packages():
+def import_all_packages(bulk=False, workers=1):
+    """
+    Імпортує всі файли пакувань.
+
+    :param bulk: Завантажити всі файли одним COPY через staging-таблицю (для початкового наповнення).
+    :param workers: Скільки процесів розбирають файли паралельно; запис завжди один і в порядку файлів.
+    """
     # Базова папка, яку можна змінити в одному місці
     base_dir = '../import_data_csv/csv_package'
 
@@ -121,10 +52,27 @@ def import_all_packages():
         ('15.01.2025.csv', "15.01.2025"),
     ]
 
+    files = [
+        (os.path.join(base_dir, filename), datetime.strptime(date_str, "%d.%m.%Y").date())
+        for filename, date_str in files_data
+    ]
+
+    if bulk:
+        report = bulk_load_packaging(db_session, files)
+        print(f"Bulk imported packaging materials: {report.summary()}")
+        for error_file, line_no, message in report.errors:
+            print(f"  {error_file}, line {line_no}: {message}")
+        return
+
+    if workers > 1:
+        report = import_packaging_files(db_session, files, workers)
+        print(f"Imported packaging materials ({workers} processes): {report.summary()}")
+        for error_file, line_no, message in report.errors:
+            print(f"  {error_file}, line {line_no}: {message}")
+        return
+
     # Цикл для виклику функції import_packaging_materials_from_csv для кожного файлу
-    for filename, date_str in files_data:
-        file_path_package = os.path.join(base_dir, filename)
-        purchase_date_package = datetime.strptime(date_str, "%d.%m.%Y").date()
+    for file_path_package, purchase_date_package in files:
         import_packaging_materials_from_csv(file_path_package, purchase_date_package, db_session)
 
 # import_all_packages()
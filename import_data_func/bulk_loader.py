@@ -0,0 +1,322 @@
+"""
+Масове завантаження (bulk mode) для початкового наповнення бази.
+
+Рядки CSV розбираються тими самими parse_*_row, що й у import_engine, і потоком ідуть у тимчасову
+staging-таблицю через COPY FROM STDIN (psycopg2 copy_expert). Постачальники, товари / пакування
+та історія виводяться зі staging-таблиці кількома INSERT ... SELECT та UPDATE ... FROM — без
+жодного запиту на рядок.
+
+Завантаження одного набору файлів — одна транзакція. monthly_rollup тут не оновлюється:
+після завантаження викличте rebuild_monthly_rollup.
+"""
+import csv
+import io
+from itertools import chain, count
+
+from sqlalchemy import MetaData, Table, Column, BigInteger, Integer, Float, String, Numeric, DateTime, Boolean, \
+    select, update, func, case, literal, literal_column, cast, text
+from sqlalchemy.dialects.postgresql import insert, aggregate_order_by, array_agg
+
+from import_data_func.import_engine import ImportReport, read_csv_rows, parse_product_row, parse_packaging_row
+from models import Product, Supplier, PurchaseHistory, StockHistory, PackagingMaterial, PackagingMaterialSupplier, \
+    PackagingPurchaseHistory, PackagingStockHistory, product_article_seq
+from services.article_allocator import ARTICLE_PREFIX
+
+_stage_metadata = MetaData()
+
+product_stage = Table(
+    'import_product_stage', _stage_metadata,
+    Column('seq', BigInteger, primary_key=True),  # Порядок рядків у файлах
+    Column('name', String, nullable=False),
+    Column('supplier', String, nullable=False),
+    Column('quantity', Integer, nullable=False),
+    Column('total_price', Numeric(12, 2)),
+    Column('price_per_item', Numeric(10, 2)),
+    Column('date', DateTime, nullable=False),
+    Column('product_id', Integer),
+    Column('is_new', Boolean, nullable=False, server_default='false'),
+    prefixes=['TEMPORARY'],
+)
+
+packaging_stage = Table(
+    'import_packaging_stage', _stage_metadata,
+    Column('seq', BigInteger, primary_key=True),
+    Column('name', String, nullable=False),
+    Column('supplier', String, nullable=False),
+    Column('supplier_contact', String),
+    Column('quantity', Float, nullable=False),
+    Column('total_price', Numeric(12, 2)),
+    Column('price_per_item', Numeric(10, 2)),
+    Column('date', DateTime, nullable=False),
+    prefixes=['TEMPORARY'],
+)
+
+
+class CopySource:
+    """
+    Файлоподібний об'єкт для copy_expert: форматує рядки у CSV по мірі читання,
+    тож увесь набір даних не тримається в пам'яті як один текст.
+    """
+
+    def __init__(self, rows):
+        self._rows = iter(rows)
+        self._rest = ''
+
+    def read(self, size=-1):
+        out = io.StringIO()
+        out.write(self._rest)
+        writer = csv.writer(out, lineterminator='\n')
+        while size < 0 or out.tell() < size:
+            row = next(self._rows, None)
+            if row is None:
+                break
+            writer.writerow(row)
+        data = out.getvalue()
+        if size < 0:
+            self._rest = ''
+            return data
+        self._rest = data[size:]
+        return data[:size]
+
+
+def copy_rows(db_session, table, rows):
+    """COPY table FROM STDIN у з'єднанні сесії (None -> NULL), після чого збирає статистику таблиці."""
+    columns = ', '.join(rows.columns)
+    cursor = db_session.connection().connection.cursor()
+    try:
+        cursor.copy_expert(f"COPY {table.name} ({columns}) FROM STDIN WITH (FORMAT csv)", CopySource(rows))
+    finally:
+        cursor.close()
+    # autovacuum не бачить тимчасових таблиць — без статистики планувальник не знає, скільки там рядків
+    db_session.execute(text(f"ANALYZE {table.name}"))
+
+
+class StagedRows:
+    """Розібрані рядки з усіх файлів у вигляді кортежів для COPY; seq зберігає порядок файлів і рядків."""
+
+    def __init__(self, files, parse_row, columns, report):
+        self.columns = columns
+        self._rows = chain.from_iterable(read_csv_rows(path, parse_row, date, report) for path, date in files)
+        self._seq = count(1)
+
+    def __iter__(self):
+        for row in self._rows:
+            yield (next(self._seq),) + tuple(row[name] for name in self.columns[1:])
+
+
+def _create_stage(db_session, stage):
+    connection = db_session.connection()
+    stage.drop(connection, checkfirst=True)
+    stage.create(connection)
+
+
+def _format_article(number):
+    """SQL-аналог format_article: PRD-0001, ..., PRD-12345 (number — колонка, не виклик nextval)."""
+    text_number = cast(number, String)
+    return literal(ARTICLE_PREFIX) + func.lpad(text_number, func.greatest(4, func.length(text_number)), '0')
+
+
+def bulk_load_products(db_session, files, report=None):
+    """
+    Масово завантажує товари з CSV-файлів [(шлях, дата)] з тією ж семантикою, що й import_products_csv:
+    наявні товари (за назвою, найстаріший при дублікатах) отримують надходження, нові — створюються.
+
+    :return: ImportReport.
+    """
+    report = report or ImportReport()
+    stage = product_stage
+    _create_stage(db_session, stage)
+    copy_rows(db_session, stage, StagedRows(
+        files, parse_product_row, ('seq', 'name', 'supplier', 'quantity', 'total_price', 'price_per_item', 'date'),
+        report
+    ))
+
+    db_session.execute(
+        insert(Supplier.__table__)
+            .from_select(['name'], select(stage.c.supplier).group_by(stage.c.supplier).order_by(func.min(stage.c.seq)))
+            .on_conflict_do_nothing(index_elements=['name'])
+    )
+
+    def match_products(**values):
+        existing = (
+            select(Product.name, func.min(Product.id).label('id'))
+                .group_by(Product.name)
+                .subquery()
+        )
+        return db_session.execute(
+            update(stage)
+                .where(stage.c.name == existing.c.name, stage.c.product_id.is_(None))
+                .values(product_id=existing.c.id, **values)
+        ).rowcount
+
+    match_products()
+
+    # Нові товари — по одному на назву, з першого рядка; кількості додає спільний UPDATE нижче
+    first_rows = (
+        select(stage.c.seq, stage.c.name, stage.c.supplier, stage.c.date)
+            .where(stage.c.product_id.is_(None))
+            .distinct(stage.c.name)
+            .order_by(stage.c.name, stage.c.seq)
+            .subquery()
+    )
+    # nextval в окремому підзапиті: рівно один номер на новий товар
+    numbered = (
+        select(first_rows, product_article_seq.next_value().label('number'))
+            .order_by(first_rows.c.seq)
+            .subquery()
+    )
+    new_products = (
+        select(
+            numbered.c.name, Supplier.id, numbered.c.date, _format_article(numbered.c.number),
+            literal(0), literal(0), literal(0), literal(0)
+        )
+            .join(Supplier, Supplier.name == numbered.c.supplier)
+            .order_by(numbered.c.seq)
+    )
+    inserted = db_session.execute(
+        insert(Product.__table__).from_select(
+            ['name', 'supplier_id', 'created_date', 'article', 'total_quantity', 'available_quantity',
+             'purchase_total_price', 'purchase_price_per_item'],
+            new_products
+        )
+    ).rowcount
+    match_products(is_new=True)
+    report.inserted += inserted
+    report.updated += db_session.execute(select(func.count()).select_from(stage)).scalar() - inserted
+
+    db_session.execute(
+        insert(PurchaseHistory.__table__).from_select(
+            ['product_id', 'supplier_id', 'purchase_price_per_item', 'purchase_total_price', 'purchase_date',
+             'quantity_purchase'],
+            select(stage.c.product_id, Supplier.id, stage.c.price_per_item, stage.c.total_price,
+                   cast(stage.c.date, PurchaseHistory.purchase_date.type), stage.c.quantity)
+                .join(Supplier, Supplier.name == stage.c.supplier)
+                .order_by(stage.c.seq)
+        )
+    )
+    first_of_new = stage.c.is_new & (
+        func.row_number().over(partition_by=stage.c.product_id, order_by=stage.c.seq) == 1
+    )
+    db_session.execute(
+        insert(StockHistory.__table__).from_select(
+            ['product_id', 'change_amount', 'change_type', 'timestamp'],
+            select(stage.c.product_id, stage.c.quantity, case((first_of_new, 'create'), else_='update'),
+                   stage.c.date)
+                .order_by(stage.c.seq)
+        )
+    )
+
+    totals = (
+        select(
+            stage.c.product_id,
+            func.sum(stage.c.quantity).label('quantity'),
+            func.sum(stage.c.total_price).label('total'),
+            array_agg(aggregate_order_by(stage.c.price_per_item, stage.c.seq.desc()))[1].label('price')
+        )
+            .group_by(stage.c.product_id)
+            .subquery()
+    )
+    db_session.execute(
+        update(Product)
+            .where(Product.id == totals.c.product_id)
+            .values(
+                total_quantity=Product.total_quantity + totals.c.quantity,
+                available_quantity=Product.available_quantity + totals.c.quantity,
+                purchase_total_price=Product.purchase_total_price + totals.c.total,
+                purchase_price_per_item=totals.c.price
+            )
+            .execution_options(synchronize_session=False)
+    )
+
+    stage.drop(db_session.connection())
+    db_session.commit()
+    return report
+
+
+def bulk_load_packaging(db_session, files, report=None):
+    """
+    Масово завантажує пакування з CSV-файлів [(шлях, дата)] з тією ж семантикою, що й import_packaging_csv.
+
+    :return: ImportReport.
+    """
+    report = report or ImportReport()
+    stage = packaging_stage
+    _create_stage(db_session, stage)
+    copy_rows(db_session, stage, StagedRows(
+        files, parse_packaging_row,
+        ('seq', 'name', 'supplier', 'supplier_contact', 'quantity', 'total_price', 'price_per_item', 'date'),
+        report
+    ))
+
+    db_session.execute(
+        insert(PackagingMaterialSupplier.__table__)
+            .from_select(
+                ['name', 'contact_info', 'address'],
+                select(stage.c.supplier, stage.c.supplier_contact, stage.c.supplier_contact)
+                    .distinct(stage.c.supplier)
+                    .order_by(stage.c.supplier, stage.c.seq)
+            )
+            .on_conflict_do_nothing(index_elements=['name'])
+    )
+
+    # Один рядок на матеріал: постачальник і дата — з першого рядка, ціна — з останнього
+    by_seq = stage.c.seq
+    materials = (
+        select(
+            stage.c.name,
+            array_agg(aggregate_order_by(stage.c.supplier, by_seq))[1].label('supplier'),
+            func.sum(stage.c.quantity).label('quantity'),
+            array_agg(aggregate_order_by(stage.c.price_per_item, by_seq.desc()))[1].label('price'),
+            func.sum(stage.c.total_price).label('total'),
+            func.min(stage.c.date).label('date'),
+            func.min(by_seq).label('seq')
+        )
+            .group_by(stage.c.name)
+            .subquery()
+    )
+    table = PackagingMaterial.__table__
+    stmt = insert(table).from_select(
+        ['name', 'packaging_material_supplier_id', 'total_quantity', 'available_quantity',
+         'purchase_price_per_unit', 'reorder_level', 'created_date', 'total_purchase_cost', 'available_stock_cost'],
+        select(materials.c.name, PackagingMaterialSupplier.id, materials.c.quantity, materials.c.quantity,
+               materials.c.price, literal(0), materials.c.date, materials.c.total, materials.c.total)
+            .join(PackagingMaterialSupplier, PackagingMaterialSupplier.name == materials.c.supplier)
+            .order_by(materials.c.seq)
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['name'],
+        set_={
+            'total_quantity': table.c.total_quantity + stmt.excluded.total_quantity,
+            'available_quantity': table.c.available_quantity + stmt.excluded.available_quantity,
+            'purchase_price_per_unit': stmt.excluded.purchase_price_per_unit,
+            'total_purchase_cost': table.c.total_purchase_cost + stmt.excluded.total_purchase_cost,
+            'available_stock_cost': table.c.available_stock_cost + stmt.excluded.available_stock_cost,
+        }
+    ).returning(literal_column('xmax = 0'))
+    inserted = sum(db_session.execute(stmt).scalars().all())
+    report.inserted += inserted
+    report.updated += db_session.execute(select(func.count()).select_from(stage)).scalar() - inserted
+
+    db_session.execute(
+        insert(PackagingPurchaseHistory.__table__).from_select(
+            ['material_id', 'supplier_id', 'quantity_purchased', 'purchase_price_per_unit', 'purchase_total_price',
+             'purchase_date'],
+            select(PackagingMaterial.id, PackagingMaterialSupplier.id, stage.c.quantity, stage.c.price_per_item,
+                   stage.c.total_price, stage.c.date)
+                .join(PackagingMaterial, PackagingMaterial.name == stage.c.name)
+                .join(PackagingMaterialSupplier, PackagingMaterialSupplier.name == stage.c.supplier)
+                .order_by(stage.c.seq)
+        )
+    )
+    db_session.execute(
+        insert(PackagingStockHistory.__table__).from_select(
+            ['material_id', 'change_amount', 'change_type', 'timestamp'],
+            select(PackagingMaterial.id, stage.c.quantity, literal('purchase'), stage.c.date)
+                .join(PackagingMaterial, PackagingMaterial.name == stage.c.name)
+                .order_by(stage.c.seq)
+        )
+    )
+
+    stage.drop(db_session.connection())
+    db_session.commit()
+    return report
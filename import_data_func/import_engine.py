@@ -0,0 +1,457 @@
+"""
+Потоковий імпорт товарів і пакувань з CSV.
+
+Імпорт розділено на два етапи:
+  * розбір (parse_*_row, read_csv_rows) — чисті функції без доступу до бази, рядок CSV -> нормалізований словник;
+  * запис (ProductImportWriter, PackagingImportWriter) — пакетні INSERT/UPDATE з мапами назва -> id,
+    завантаженими з бази один раз.
+
+Кілька файлів можна розбирати паралельно в пулі процесів (import_files); запис при цьому лишається
+в одному процесі й іде в порядку файлів, тож результат той самий, що й при послідовному імпорті.
+
+Помилки окремих рядків потрапляють у ImportReport і не зупиняють імпорт решти пакета.
+"""
+import csv
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from decimal import Decimal, InvalidOperation
+from itertools import islice, repeat
+
+from sqlalchemy import select, update, func, bindparam, literal_column, Integer, Numeric
+from sqlalchemy.dialects.postgresql import insert, ARRAY
+
+from models import Product, Supplier, PurchaseHistory, StockHistory, PackagingMaterial, PackagingMaterialSupplier, \
+    PackagingPurchaseHistory, PackagingStockHistory
+from services.article_allocator import reserve_articles
+from services.rollup_service import collect_row_deltas, apply_rollup_deltas
+import services.table_versions  # noqa: F401 — імпорт теж має збільшувати версії таблиць (ETag списків)
+
+IMPORT_BATCH_SIZE = 1000
+SUPPLIER_NAME_MAX_LENGTH = 30  # Для постачальників пакування; повна назва йде в contact_info
+
+
+class ImportReport:
+    """Підсумок імпорту: скільки рядків прочитано, додано, оновлено, і помилки по рядках."""
+
+    def __init__(self):
+        self.rows = 0
+        self.inserted = 0
+        self.updated = 0
+        self.errors = []  # (файл, номер рядка, повідомлення)
+
+    def add_error(self, file_path, line_no, message):
+        self.errors.append((file_path, line_no, message))
+
+    def summary(self):
+        return (f"рядків: {self.rows}, додано: {self.inserted}, оновлено: {self.updated}, "
+                f"помилок: {len(self.errors)}")
+
+
+# --- Розбір ---
+
+def parse_decimal(value):
+    return Decimal(str(value).strip().replace(',', '.'))
+
+
+def parse_quantity(value):
+    """'12 шт' -> 12"""
+    return int(str(value).split()[0])
+
+
+def _supplier_name(row):
+    raw_supplier = row.get('Поставщик')
+    return raw_supplier.strip() if raw_supplier and raw_supplier.strip() else "N/A"
+
+
+def parse_product_row(row, created_date):
+    """Рядок CSV товарів -> словник; ValueError/KeyError для некоректного рядка."""
+    name = (row.get('Наименование') or '').strip()
+    if not name:
+        raise ValueError("Порожня назва товару")
+    return {
+        'name': name,
+        'supplier': _supplier_name(row),
+        'quantity': parse_quantity(row['Количество']),
+        'total_price': parse_decimal(row['Стоимость за количество']),
+        'price_per_item': parse_decimal(row['Стоимость за 1 шт']),
+        'date': created_date,
+    }
+
+
+def parse_packaging_row(row, purchase_date):
+    """Рядок CSV пакування -> словник; ValueError/KeyError для некоректного рядка."""
+    name = (row.get('Наименование') or '').strip()
+    if not name:
+        raise ValueError("Порожня назва пакування")
+    supplier_name = _supplier_name(row)
+    return {
+        'name': name,
+        'supplier': supplier_name[:SUPPLIER_NAME_MAX_LENGTH],
+        'supplier_contact': supplier_name,
+        'quantity': parse_quantity(row['Количество']),
+        'total_price': parse_decimal(row.get('Стоимость за количество') or 0),
+        'price_per_item': parse_decimal(row.get('Стоимость за 1 шт') or 0),
+        'date': purchase_date,
+    }
+
+
+def read_csv_rows(file_path, parse_row, date, report):
+    """
+    Читає CSV потоком і віддає розібрані рядки; некоректні рядки записує в report.
+
+    Номер рядка рахується як у файлі (заголовок — рядок 1).
+    """
+    with open(file_path, mode='r', encoding='utf-8', newline='') as file:
+        for line_no, row in enumerate(csv.DictReader(file), start=2):
+            report.rows += 1
+            try:
+                parsed = parse_row(row, date)
+            except (ValueError, KeyError, InvalidOperation, IndexError, AttributeError) as e:
+                report.add_error(file_path, line_no, f"{type(e).__name__}: {e}")
+                continue
+            parsed['source'] = (file_path, line_no)
+            yield parsed
+
+
+def parse_csv_file(file_path, parse_row, date):
+    """
+    Розбирає весь файл (для працівника пулу процесів).
+
+    :return: (розібрані рядки, скільки рядків прочитано, помилки розбору).
+    """
+    report = ImportReport()
+    rows = list(read_csv_rows(file_path, parse_row, date, report))
+    return rows, report.rows, report.errors
+
+
+def batched(rows, size):
+    iterator = iter(rows)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+# --- Запис ---
+
+class BatchWriter(ABC):
+    """
+    Спільна логіка записувачів: пакет пишеться в savepoint; якщо пакет падає,
+    рядки пишуться по одному, щоб знайти й пропустити саме зіпсовані.
+    """
+
+    def __init__(self, db_session, report):
+        self.db_session = db_session
+        self.report = report
+
+    def write_batch(self, rows):
+        try:
+            with self.db_session.begin_nested():
+                result = self._write(rows)
+            self._apply(result)
+        except Exception:
+            for row in rows:
+                try:
+                    with self.db_session.begin_nested():
+                        result = self._write([row])
+                    self._apply(result)
+                except Exception as e:
+                    file_path, line_no = row.get('source', (None, None))
+                    self.report.add_error(file_path, line_no, f"{type(e).__name__}: {e}")
+
+    def _apply(self, result):
+        # Кеш і лічильники оновлюються лише після успішного savepoint
+        cache_updates, inserted, updated = result
+        self._commit_cache(cache_updates)
+        self.report.inserted += inserted
+        self.report.updated += updated
+
+    @abstractmethod
+    def _write(self, rows):
+        """:return: (оновлення кешу назв, скільки додано, скільки оновлено)."""
+
+    @abstractmethod
+    def _commit_cache(self, cache_updates):
+        """Переносить у кеш назв записи пакета, що пройшов savepoint."""
+
+
+# UPDATE products ... FROM unnest(масиви) — масиви йдуть параметрами, тож запит компілюється один раз,
+# а не на кожен пакет, як VALUES з тисячею рядків
+_delivery = func.unnest(
+    bindparam('ids', type_=ARRAY(Integer)), bindparam('quantities', type_=ARRAY(Integer)),
+    bindparam('totals', type_=ARRAY(Numeric(12, 2))), bindparam('prices', type_=ARRAY(Numeric(10, 2)))
+).table_valued('id', 'quantity', 'total', 'price').render_derived(name='delivery')
+PRODUCT_TOTALS_UPDATE = (
+    update(Product)
+        .where(Product.id == _delivery.c.id)
+        .values(
+            total_quantity=Product.total_quantity + _delivery.c.quantity,
+            available_quantity=Product.available_quantity + _delivery.c.quantity,
+            purchase_total_price=Product.purchase_total_price + _delivery.c.total,
+            purchase_price_per_item=_delivery.c.price
+        )
+        .execution_options(synchronize_session=False)
+)
+
+
+class ProductImportWriter(BatchWriter):
+    """
+    Пише товари: нові створює, для наявних (за назвою) додає надходження.
+
+    Назва товару не унікальна в схемі, тож наявні товари шукаються за мапою, завантаженою один раз;
+    постачальники (унікальна назва) додаються через INSERT ... ON CONFLICT.
+    """
+
+    def __init__(self, db_session, report):
+        super().__init__(db_session, report)
+        self.suppliers = dict(db_session.execute(select(Supplier.name, Supplier.id)).all())
+        self.products = {}
+        for name, product_id in db_session.execute(select(Product.name, Product.id).order_by(Product.id.desc())):
+            self.products[name] = product_id  # При дублікатах назв лишається найстаріший товар
+
+    def _commit_cache(self, cache_updates):
+        suppliers, products = cache_updates
+        self.suppliers.update(suppliers)
+        self.products.update(products)
+
+    def _write(self, rows):
+        db_session = self.db_session
+
+        # Постачальники
+        new_suppliers = {}
+        missing = sorted({row['supplier'] for row in rows} - self.suppliers.keys())
+        if missing:
+            new_suppliers = dict(db_session.execute(
+                insert(Supplier.__table__)
+                    .on_conflict_do_nothing(index_elements=['name'])
+                    .returning(Supplier.name, Supplier.id),
+                [{'name': name} for name in missing]
+            ).all())
+            if len(new_suppliers) < len(missing):  # Хтось додав їх паралельно
+                new_suppliers.update(db_session.execute(
+                    select(Supplier.name, Supplier.id).where(Supplier.name.in_(missing))
+                ).all())
+
+        def supplier_id(name):
+            return new_suppliers.get(name) or self.suppliers[name]
+
+        # Нові товари: створюються з першого рядка, кількості додає спільний UPDATE нижче
+        first_rows = OrderedDict()
+        for row in rows:
+            if row['name'] not in self.products:
+                first_rows.setdefault(row['name'], row)
+
+        new_products = {}
+        if first_rows:
+            articles = reserve_articles(db_session, len(first_rows))
+            new_products = dict(db_session.execute(
+                insert(Product.__table__).returning(Product.name, Product.id, sort_by_parameter_order=True),
+                [
+                    {'name': name, 'supplier_id': supplier_id(row['supplier']), 'created_date': row['date'],
+                     'article': article, 'total_quantity': 0, 'available_quantity': 0,
+                     'purchase_total_price': 0, 'purchase_price_per_item': 0}
+                    for (name, row), article in zip(first_rows.items(), articles)
+                ]
+            ).all())
+
+        def product_id(name):
+            return new_products.get(name) or self.products[name]
+
+        # Надходження по товарах пакета одним UPDATE ... FROM (VALUES ...)
+        totals = OrderedDict()
+        for row in rows:
+            entry = totals.setdefault(product_id(row['name']), [0, Decimal(0), None])
+            entry[0] += row['quantity']
+            entry[1] += row['total_price']
+            entry[2] = row['price_per_item']
+        ids, quantities, total_prices, prices = zip(*(
+            (item_id, quantity, total, price) for item_id, (quantity, total, price) in sorted(totals.items())
+        ))
+        db_session.execute(PRODUCT_TOTALS_UPDATE, {
+            'ids': list(ids), 'quantities': list(quantities), 'totals': list(total_prices), 'prices': list(prices)
+        })
+
+        # Історія по кожному рядку CSV
+        created = set()
+        purchase_rows = []
+        stock_rows = []
+        for row in rows:
+            item_id = product_id(row['name'])
+            is_new = row['name'] in new_products and item_id not in created
+            created.add(item_id)
+            purchase_rows.append({
+                'product_id': item_id,
+                'supplier_id': supplier_id(row['supplier']),
+                'purchase_price_per_item': row['price_per_item'],
+                'purchase_total_price': row['total_price'],
+                'purchase_date': row['date'],
+                'quantity_purchase': row['quantity'],
+            })
+            stock_rows.append({
+                'product_id': item_id,
+                'change_amount': row['quantity'],
+                'change_type': 'create' if is_new else 'update',
+                'timestamp': row['date'],
+            })
+        db_session.execute(insert(PurchaseHistory.__table__), purchase_rows)
+        db_session.execute(insert(StockHistory.__table__), stock_rows)
+        apply_rollup_deltas(db_session, collect_row_deltas(PurchaseHistory, purchase_rows))
+
+        return (new_suppliers, new_products), len(new_products), len(rows) - len(new_products)
+
+
+class PackagingImportWriter(BatchWriter):
+    """
+    Пише пакування: назва матеріалу унікальна, тож матеріали додаються або доповнюються
+    одним INSERT ... ON CONFLICT (name) DO UPDATE на пакет.
+    """
+
+    def __init__(self, db_session, report):
+        super().__init__(db_session, report)
+        self.suppliers = dict(db_session.execute(
+            select(PackagingMaterialSupplier.name, PackagingMaterialSupplier.id)
+        ).all())
+
+    def _commit_cache(self, cache_updates):
+        self.suppliers.update(cache_updates)
+
+    def _write(self, rows):
+        db_session = self.db_session
+        table = PackagingMaterial.__table__
+
+        new_suppliers = {}
+        contacts = OrderedDict((row['supplier'], row['supplier_contact']) for row in rows)
+        missing = sorted(contacts.keys() - self.suppliers.keys())
+        if missing:
+            new_suppliers = dict(db_session.execute(
+                insert(PackagingMaterialSupplier.__table__)
+                    .on_conflict_do_nothing(index_elements=['name'])
+                    .returning(PackagingMaterialSupplier.name, PackagingMaterialSupplier.id),
+                [{'name': name, 'contact_info': contacts[name], 'address': contacts[name]} for name in missing]
+            ).all())
+            if len(new_suppliers) < len(missing):
+                new_suppliers.update(db_session.execute(
+                    select(PackagingMaterialSupplier.name, PackagingMaterialSupplier.id)
+                        .where(PackagingMaterialSupplier.name.in_(missing))
+                ).all())
+
+        def supplier_id(name):
+            return new_suppliers.get(name) or self.suppliers[name]
+
+        # Один рядок на матеріал: ON CONFLICT не може оновити той самий рядок двічі за запит
+        materials = OrderedDict()
+        for row in rows:
+            entry = materials.get(row['name'])
+            if entry is None:
+                materials[row['name']] = {
+                    'name': row['name'],
+                    'packaging_material_supplier_id': supplier_id(row['supplier']),
+                    'total_quantity': row['quantity'],
+                    'available_quantity': row['quantity'],
+                    'purchase_price_per_unit': row['price_per_item'],
+                    'reorder_level': 0,
+                    'created_date': row['date'],
+                    'total_purchase_cost': row['total_price'],
+                    'available_stock_cost': row['total_price'],
+                }
+            else:
+                entry['total_quantity'] += row['quantity']
+                entry['available_quantity'] += row['quantity']
+                entry['purchase_price_per_unit'] = row['price_per_item']
+                entry['total_purchase_cost'] += row['total_price']
+                entry['available_stock_cost'] += row['total_price']
+
+        stmt = insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['name'],
+            set_={
+                'total_quantity': table.c.total_quantity + stmt.excluded.total_quantity,
+                'available_quantity': table.c.available_quantity + stmt.excluded.available_quantity,
+                'purchase_price_per_unit': stmt.excluded.purchase_price_per_unit,
+                'total_purchase_cost': table.c.total_purchase_cost + stmt.excluded.total_purchase_cost,
+                'available_stock_cost': table.c.available_stock_cost + stmt.excluded.available_stock_cost,
+            }
+        ).returning(table.c.name, table.c.id, literal_column('xmax = 0').label('inserted'))
+        material_ids = {}
+        inserted_count = 0
+        for name, material_id, inserted in db_session.execute(stmt, list(materials.values())):
+            material_ids[name] = material_id
+            inserted_count += bool(inserted)
+
+        purchase_rows = []
+        stock_rows = []
+        for row in rows:
+            material_id = material_ids[row['name']]
+            purchase_rows.append({
+                'material_id': material_id,
+                'supplier_id': supplier_id(row['supplier']),
+                'quantity_purchased': row['quantity'],
+                'purchase_price_per_unit': row['price_per_item'],
+                'purchase_total_price': row['total_price'],
+                'purchase_date': row['date'],
+            })
+            stock_rows.append({
+                'material_id': material_id,
+                'change_amount': row['quantity'],
+                'change_type': 'purchase',
+                'timestamp': row['date'],
+            })
+        db_session.execute(insert(PackagingPurchaseHistory.__table__), purchase_rows)
+        db_session.execute(insert(PackagingStockHistory.__table__), stock_rows)
+
+        return new_suppliers, inserted_count, len(rows) - inserted_count
+
+
+def import_csv(db_session, writer, file_path, parse_row, date, report, batch_size=IMPORT_BATCH_SIZE):
+    """Потоково читає файл і пише його пакетами; кожен пакет комітиться окремо."""
+    for batch in batched(read_csv_rows(file_path, parse_row, date, report), batch_size):
+        writer.write_batch(batch)
+        db_session.commit()
+    return report
+
+
+def import_products_csv(db_session, file_path, created_date, report=None, writer=None, batch_size=IMPORT_BATCH_SIZE):
+    report = report or ImportReport()
+    writer = writer or ProductImportWriter(db_session, report)
+    return import_csv(db_session, writer, file_path, parse_product_row, created_date, report, batch_size)
+
+
+def import_packaging_csv(db_session, file_path, purchase_date, report=None, writer=None,
+                         batch_size=IMPORT_BATCH_SIZE):
+    report = report or ImportReport()
+    writer = writer or PackagingImportWriter(db_session, report)
+    return import_csv(db_session, writer, file_path, parse_packaging_row, purchase_date, report, batch_size)
+
+
+def import_files(db_session, writer, files, parse_row, report, workers=None, batch_size=IMPORT_BATCH_SIZE):
+    """
+    Імпортує файли [(шлях, дата)]: розбір — у пулі з workers процесів, запис — тут, одним записувачем.
+
+    Результати розбору забираються в порядку files, тож пакети пишуться в тому ж порядку, що й при
+    послідовному імпорті: дати надходжень, ціни «з останнього рядка» і підсумки збігаються.
+    Поки записується один файл, наступні вже розбираються.
+    """
+    paths = [path for path, _ in files]
+    dates = [date for _, date in files]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for rows, rows_read, errors in pool.map(parse_csv_file, paths, repeat(parse_row), dates):
+            report.rows += rows_read
+            report.errors.extend(errors)
+            for batch in batched(rows, batch_size):
+                writer.write_batch(batch)
+                db_session.commit()
+    return report
+
+
+def import_products_files(db_session, files, workers=None, report=None, batch_size=IMPORT_BATCH_SIZE):
+    report = report or ImportReport()
+    writer = ProductImportWriter(db_session, report)
+    return import_files(db_session, writer, files, parse_product_row, report, workers, batch_size)
+
+
+def import_packaging_files(db_session, files, workers=None, report=None, batch_size=IMPORT_BATCH_SIZE):
+    report = report or ImportReport()
+    writer = PackagingImportWriter(db_session, report)
+    return import_files(db_session, writer, files, parse_packaging_row, report, workers, batch_size)
@@ -1,10 +1,28 @@
+import argparse
+
 from import_data_func.add_new_Product import import_all_product
 from import_data_func.add_new_category import import_categories_from_csv
 from import_data_func.add_new_package import import_all_packages
 from import_data_func.add_others_investments import import_all_investment
 from postgreSQLConnect import db_session
+from services.rollup_service import rebuild_monthly_rollup
+
+
+def run_import(bulk=False, workers=1):
+    import_all_product(bulk=bulk, workers=workers)
+    import_all_packages(bulk=bulk, workers=workers)
+    import_all_investment()
+    import_categories_from_csv('../import_data_csv/csv_categories/categories.csv', db_session)
+
+    # Помісячна статистика рахується з уже імпортованої історії
+    rebuild_monthly_rollup(db_session)
+    db_session.commit()
+
 
-import_all_product()
-import_all_packages()
-import_all_investment()
-import_categories_from_csv('../import_data_csv/csv_categories/categories.csv', db_session)
+# Захист __main__ потрібен для пулу процесів (на Windows/macOS працівники заново імпортують цей модуль)
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Повний імпорт даних з CSV")
+    parser.add_argument('--bulk', action='store_true', help="товари й пакування через COPY у staging-таблиці")
+    parser.add_argument('--workers', type=int, default=1, help="скільки процесів розбирають CSV паралельно")
+    args = parser.parse_args()
+    run_import(bulk=args.bulk, workers=args.workers)
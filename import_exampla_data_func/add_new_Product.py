@@ -6,10 +6,12 @@ from sqlalchemy import inspect
 
 from datetime import datetime
 
-from import_data_func.add_new_Product import load_products_from_csv
+from import_data_func.add_new_Product import load_products_from_csv, ensure_table_exists
+from import_data_func.bulk_loader import bulk_load_products
+from postgreSQLConnect import db_session
 
 
-def example_import_all_product():
+def example_import_all_product(bulk=False):
     # Базовий шлях до папки з продуктами
     base_dir = '../example_import_data_csv/csv_product'
 
@@ -18,7 +20,16 @@ def example_import_all_product():
         ('15.09.2024.csv', "15.09.2024"),
     ]
 
-    for filename, date_str in files_data:
-        file_path = os.path.join(base_dir, filename)
-        created_date = datetime.strptime(date_str, "%d.%m.%Y")
+    files = [
+        (os.path.join(base_dir, filename), datetime.strptime(date_str, "%d.%m.%Y"))
+        for filename, date_str in files_data
+    ]
+
+    if bulk:
+        ensure_table_exists('suppliers')
+        report = bulk_load_products(db_session, files)
+        print(f"Масовий імпорт товарів: {report.summary()}")
+        return
+
+    for file_path, created_date in files:
         load_products_from_csv(file_path, created_date)
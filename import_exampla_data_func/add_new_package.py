@@ -2,11 +2,12 @@ import os
 from datetime import datetime
 
 from import_data_func.add_new_package import import_packaging_materials_from_csv
+from import_data_func.bulk_loader import bulk_load_packaging
 
 from postgreSQLConnect import db_session
 
 
-def example_import_all_packages():
+def example_import_all_packages(bulk=False):
     # Базова папка, яку можна змінити в одному місці
     base_dir = '../example_import_data_csv/csv_package'
 
@@ -15,10 +16,18 @@ def example_import_all_packages():
         ('15.01.2025.csv', "15.01.2025"),
     ]
 
+    files = [
+        (os.path.join(base_dir, filename), datetime.strptime(date_str, "%d.%m.%Y").date())
+        for filename, date_str in files_data
+    ]
+
+    if bulk:
+        report = bulk_load_packaging(db_session, files)
+        print(f"Bulk imported packaging materials: {report.summary()}")
+        return
+
     # Цикл для виклику функції import_packaging_materials_from_csv для кожного файлу
-    for filename, date_str in files_data:
-        file_path_package = os.path.join(base_dir, filename)
-        purchase_date_package = datetime.strptime(date_str, "%d.%m.%Y").date()
+    for file_path_package, purchase_date_package in files:
         import_packaging_materials_from_csv(file_path_package, purchase_date_package, db_session)
 
 
@@ -1,21 +1,31 @@
+import sys
+
 from import_data_func.add_new_category import import_categories_from_csv
 from import_exampla_data_func.add_new_Product import example_import_all_product
 from import_exampla_data_func.add_new_package import example_import_all_packages
 from import_exampla_data_func.add_others_investments import example_import_all_investment
 from postgreSQLConnect import db_session
+from services.rollup_service import rebuild_monthly_rollup
 from app import app
 
 
-def run_import():
-    example_import_all_product()
-    example_import_all_packages()
+def run_import(bulk=False):
+    """
+    :param bulk: Товари й пакування — через COPY у staging-таблиці (python example_import_full_db.py --bulk).
+    """
+    example_import_all_product(bulk=bulk)
+    example_import_all_packages(bulk=bulk)
     example_import_all_investment()
     import_categories_from_csv(
         '../example_import_data_csv/csv_categories/categories.csv',
         db_session
     )
 
+    # Помісячна статистика рахується з уже імпортованої історії
+    rebuild_monthly_rollup(db_session)
+    db_session.commit()
+
 
 if __name__ == "__main__":
     with app.app_context():
-        run_import()
\ No newline at end of file
+        run_import(bulk='--bulk' in sys.argv)
\ No newline at end of file
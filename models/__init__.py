@@ -1,6 +1,6 @@
 from .base import db, Base
 from .roleUser import User, Role
-from .product import Product
+from .product import Product, product_article_seq
 from .supplier import Supplier
 from .category import Category
 from .purchaseHistory import PurchaseHistory
@@ -20,3 +20,5 @@ from .giftModels import GiftSet, GiftSetSalesHistoryPackaging, GiftSetSalesHisto
     GiftSetSalesHistory, GiftSetProduct
 from .otherInvestment import OtherInvestment
 from .stockHistory import StockHistory
+from .monthlyRollup import MonthlyRollup
+from .tableVersion import TableVersion
@@ -1,6 +1,24 @@
 from flask_sqlalchemy import SQLAlchemy
 
-db = SQLAlchemy()
+
+class SharedEngineSQLAlchemy(SQLAlchemy):
+    """
+    Flask-SQLAlchemy, що працює поверх engine та sessionmaker з postgreSQLConnect,
+    щоб застосунок і сервіси ділили один пул з'єднань замість двох.
+    """
+
+    def _make_engine(self, bind_key, options, app):
+        if bind_key is None:
+            from postgreSQLConnect import engine
+            return engine
+        return super()._make_engine(bind_key, options, app)
+
+    def _make_session_factory(self, options):
+        from postgreSQLConnect import Session
+        return Session
+
+
+db = SharedEngineSQLAlchemy()
 
 # Define your base model
-Base = db.Model  # Use SQLAlchemy's model base
\ No newline at end of file
+Base = db.Model  # Use SQLAlchemy's model base
@@ -110,6 +110,13 @@ class GiftSetSalesHistory(db.Model):
     sales_history_products = db.relationship('GiftSetSalesHistoryProduct', back_populates='sales_history')
     sales_history_packagings = db.relationship('GiftSetSalesHistoryPackaging', back_populates='sales_history')
 
+    # Складені індекси під стрічку продажів (keyset) і деталі клієнта
+    __table_args__ = (
+        db.Index('ix_gift_set_sales_history_sold_at_id', 'sold_at', 'id'),
+        db.Index('ix_gift_set_sales_history_customer_id_sold_at', 'customer_id', 'sold_at'),
+        db.Index('ix_gift_set_sales_history_gift_set_id', 'gift_set_id'),
+    )
+
     def to_dict(self):
         """Перетворити об'єкт в словник для відповіді API."""
 
@@ -137,7 +144,7 @@ class GiftSetSalesHistory(db.Model):
         return {
             "id": self.id,
             "gift_set_id": self.gift_set_id,
-            "sold_at": self.sold_at.isoformat(),
+            "sold_at": self.sold_at,
             "sold_price": self.sold_price,
             "quantity": self.quantity,
             "customer_name": self.customer_id,
@@ -0,0 +1,26 @@
+from sqlalchemy import Column, String, Integer, DECIMAL, UniqueConstraint
+
+from models.base import Base
+
+
+class MonthlyRollup(Base):
+    """Попередньо агреговані помісячні показники продажів і закупівель (одна метрика на рядок)."""
+    __tablename__ = 'monthly_rollup'
+
+    id = Column(Integer, primary_key=True)
+    year = Column(Integer, nullable=False)
+    month = Column(Integer, nullable=False)
+    metric = Column(String(50), nullable=False)
+    value = Column(DECIMAL(18, 4), nullable=False, default=0)
+
+    __table_args__ = (
+        UniqueConstraint('year', 'month', 'metric', name='uq_monthly_rollup_year_month_metric'),
+    )
+
+    def to_dict(self):
+        return {
+            'year': self.year,
+            'month': self.month,
+            'metric': self.metric,
+            'value': self.value
+        }
@@ -20,5 +20,5 @@ class OtherInvestment(Base):
             'type_name': self.type_name,
             'supplier': self.supplier,
             'cost': float(self.cost or 0),  # Convert to float, handling possible None
-            'date': self.date.isoformat() if self.date else None,  # Format date to ISO string
+            'date': self.date,  # ISO-рядок робить JSON-провайдер
         }
@@ -42,7 +42,7 @@ class PackagingMaterial(Base):
             'reorder_level': self.reorder_level,
             'total_purchase_cost': float(self.total_purchase_cost or 0),
             'available_stock_cost': float(self.available_stock_cost or 0),
-            'created_date': self.created_date.isoformat() if self.created_date else None,
+            'created_date': self.created_date,
             'supplier': self.packaging_material_supplier.to_dict() if self.packaging_material_supplier else None
         }
 
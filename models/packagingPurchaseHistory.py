@@ -1,6 +1,6 @@
 from datetime import datetime
 
-from sqlalchemy import Column, String, Boolean, Integer, ForeignKey, DECIMAL, DateTime, Float
+from sqlalchemy import Column, String, Boolean, Integer, ForeignKey, DECIMAL, DateTime, Float, Index
 from sqlalchemy.orm import relationship
 
 from models.base import Base
@@ -20,13 +20,19 @@ class PackagingPurchaseHistory(Base):
     material = relationship("PackagingMaterial", back_populates="purchase_history")
     packaging_material_supplier = relationship("PackagingMaterialSupplier")  # Updated to PackagingMaterialSupplier
 
+    # Закупівлі пакування за матеріалом і постачальником
+    __table_args__ = (
+        Index('ix_packaging_purchase_history_material_id_purchase_date', 'material_id', 'purchase_date'),
+        Index('ix_packaging_purchase_history_supplier_id_purchase_date', 'supplier_id', 'purchase_date'),
+    )
+
     def to_dict(self):
         return {
             'id': self.id,
             'material_id': self.material_id,
             'supplier_id': self.supplier_id,
             'quantity_purchased': self.quantity_purchased,
-            'purchase_price_per_unit': float(self.purchase_price_per_unit),
-            'purchase_total_price': float(self.purchase_total_price),
-            'purchase_date': self.purchase_date.isoformat()
+            'purchase_price_per_unit': self.purchase_price_per_unit,
+            'purchase_total_price': self.purchase_total_price,
+            'purchase_date': self.purchase_date
         }
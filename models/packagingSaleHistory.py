@@ -1,6 +1,6 @@
 from datetime import datetime
 
-from sqlalchemy import Column, String, Boolean, Integer, ForeignKey, DECIMAL, DateTime, Float
+from sqlalchemy import Column, String, Boolean, Integer, ForeignKey, DECIMAL, DateTime, Float, Index
 from sqlalchemy.orm import relationship
 
 from models.base import Base
@@ -18,12 +18,17 @@ class PackagingSaleHistory(Base):
     sale = relationship("SaleHistory", back_populates="packaging_sale_history")
     packaging_material = relationship("PackagingMaterial")
 
+    __table_args__ = (
+        Index('ix_packaging_sale_history_sale_id', 'sale_id'),
+        Index('ix_packaging_sale_history_material_id_sale_date', 'packaging_material_id', 'sale_date'),
+    )
+
     def to_dict(self):
         return {
             'id': self.id,
             'sale_id': self.sale_id,
             'packaging_material_id': self.packaging_material_id,
             'packaging_quantity': self.packaging_quantity,
-            'total_packaging_cost': float(self.total_packaging_cost),
-            'sale_date': self.sale_date.isoformat()
+            'total_packaging_cost': self.total_packaging_cost,
+            'sale_date': self.sale_date
         }
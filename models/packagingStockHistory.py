@@ -1,6 +1,6 @@
 from datetime import datetime
 
-from sqlalchemy import Column, String, Boolean, Integer, ForeignKey, DECIMAL, DateTime, Float
+from sqlalchemy import Column, String, Boolean, Integer, ForeignKey, DECIMAL, DateTime, Float, Index
 from sqlalchemy.orm import relationship
 
 from models.base import Base
@@ -15,11 +15,15 @@ class PackagingStockHistory(Base):
     timestamp = Column(DateTime, default=datetime.now)
     material = relationship("PackagingMaterial", back_populates="stock_history")
 
+    __table_args__ = (
+        Index('ix_packaging_stock_history_material_id_timestamp', 'material_id', 'timestamp'),
+    )
+
     def to_dict(self):
         return {
             'id': self.id,
             'material_id': self.material_id,
             'change_amount': self.change_amount,
             'change_type': self.change_type,
-            'timestamp': self.timestamp.isoformat()
+            'timestamp': self.timestamp
         }
@@ -1,11 +1,14 @@
 from datetime import datetime
 
-from sqlalchemy import Column, String, Boolean, Integer, ForeignKey, DECIMAL, DateTime
+from sqlalchemy import Column, String, Boolean, Integer, ForeignKey, DECIMAL, DateTime, Sequence
 from sqlalchemy.orm import relationship
 
 from models.associations import product_categories_table
 from models.base import Base
 
+# Лічильник артикулів PRD-xxxx (див. services/article_allocator.py)
+product_article_seq = Sequence('product_article_seq', metadata=Base.metadata)
+
 
 class Product(Base):
     __tablename__ = 'products'
@@ -49,7 +52,7 @@ class Product(Base):
             'purchase_price_per_item': float(self.purchase_price_per_item or 0),
             'selling_total_price': float(self.selling_total_price or 0),
             'selling_price_per_item': float(self.selling_price_per_item or 0),
-            'created_date': self.created_date.isoformat() if self.created_date else None,
+            'created_date': self.created_date,
             'article': self.article,
             'product_description': self.product_description
         }
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Boolean, Integer, ForeignKey, DECIMAL, DateTime, Date, Float
+from sqlalchemy import Column, String, Boolean, Integer, ForeignKey, DECIMAL, DateTime, Date, Float, Index
 from sqlalchemy.orm import relationship
 
 from models.base import Base
@@ -16,13 +16,19 @@ class PurchaseHistory(Base):
     product = relationship("Product", back_populates="purchases")
     supplier = relationship("Supplier", back_populates="purchase_history")
 
+    # Історія закупівель товару та постачальника
+    __table_args__ = (
+        Index('ix_purchase_history_product_id_purchase_date', 'product_id', 'purchase_date'),
+        Index('ix_purchase_history_supplier_id_purchase_date', 'supplier_id', 'purchase_date'),
+    )
+
     def to_dict(self):
         return {
             'id': self.id,
             'product_id': self.product_id,
             'supplier_id': self.supplier_id,
-            'purchase_price_per_item': float(self.purchase_price_per_item),
-            'purchase_total_price': float(self.purchase_total_price),
+            'purchase_price_per_item': self.purchase_price_per_item,
+            'purchase_total_price': self.purchase_total_price,
             'purchase_date': self.purchase_date.strftime('%Y-%m-%d'),
             'quantity_purchase': self.quantity_purchase,
             'supplier': self.supplier.to_dict() if self.supplier else None
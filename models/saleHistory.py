@@ -1,6 +1,6 @@
 from datetime import datetime
 
-from sqlalchemy import Column, String, Boolean, Integer, ForeignKey, DECIMAL, DateTime, Float
+from sqlalchemy import Column, String, Boolean, Integer, ForeignKey, DECIMAL, DateTime, Float, Index
 from sqlalchemy.orm import relationship
 
 from models.base import Base
@@ -29,16 +29,23 @@ class SaleHistory(Base):
     returns = relationship("ReturnHistory", back_populates="sale", cascade="all, delete-orphan")
     packaging_sale_history = relationship("PackagingSaleHistory", back_populates="sale", cascade="all, delete-orphan")
 
+    # Історія товару і клієнта, статистика та keyset-стрічка продажів
+    __table_args__ = (
+        Index('ix_sale_history_product_id_sale_date', 'product_id', 'sale_date'),
+        Index('ix_sale_history_customer_id_sale_date', 'customer_id', 'sale_date'),
+        Index('ix_sale_history_sale_date_id', 'sale_date', 'id'),
+    )
+
     def to_dict(self, include_customer=False):
         result = {
             'id': self.id,
             'product_id': self.product_id,
             'customer_id': self.customer_id,
             'quantity_sold': self.quantity_sold,
-            'selling_price_per_item': float(self.selling_price_per_item),
-            'selling_total_price': float(self.selling_total_price),
+            'selling_price_per_item': self.selling_price_per_item,
+            'selling_total_price': self.selling_total_price,
             'sale_date': self.sale_date.strftime('%Y-%m-%d %H:%M:%S'),
-            'profit': float(self.profit),
+            'profit': self.profit,
             'packaging_material_id': self.packaging_material_id,
             'packaging_quantity': self.packaging_quantity,
             'total_packaging_cost': self.total_packaging_cost
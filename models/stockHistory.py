@@ -1,6 +1,6 @@
 from datetime import datetime
 
-from sqlalchemy import Column, String, Boolean, Integer, ForeignKey, DECIMAL, DateTime
+from sqlalchemy import Column, String, Boolean, Integer, ForeignKey, DECIMAL, DateTime, Index
 from sqlalchemy.orm import relationship
 
 from models.base import Base
@@ -16,6 +16,10 @@ class StockHistory(Base):
     timestamp = Column(DateTime, default=datetime.now)
     product = relationship("Product", back_populates="stock_history")
 
+    __table_args__ = (
+        Index('ix_stock_history_product_id_timestamp', 'product_id', 'timestamp'),
+    )
+
     def to_dict(self):
         return {
             'id': self.id,
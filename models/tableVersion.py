@@ -0,0 +1,12 @@
+from sqlalchemy import Column, String, BigInteger, DateTime, func
+
+from models.base import Base
+
+
+class TableVersion(Base):
+    """Лічильник змін таблиці: зростає з кожною транзакцією, що пише в неї (див. services/table_versions.py)."""
+    __tablename__ = 'table_versions'
+
+    table_name = Column(String(100), primary_key=True)
+    version = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
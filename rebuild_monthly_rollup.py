@@ -0,0 +1,16 @@
+from postgreSQLConnect import engine, db_session
+from models import MonthlyRollup
+from services.rollup_service import rebuild_monthly_rollup
+
+
+def rebuild():
+    # Таблицю створює міграція e4a7c1d9b352; тут — для баз, які ведуться без Alembic
+    MonthlyRollup.__table__.create(bind=engine, checkfirst=True)
+
+    rebuild_monthly_rollup(db_session)
+    db_session.commit()
+    print("✅ Таблицю monthly_rollup перераховано з історії продажів і закупівель.")
+
+
+if __name__ == "__main__":
+    rebuild()
@@ -0,0 +1,49 @@
+from sqlalchemy import func, select, text
+
+from models import product_article_seq
+
+ARTICLE_PREFIX = "PRD-"
+ARTICLE_BLOCK_SIZE = 100
+
+
+def format_article(number):
+    return f"{ARTICLE_PREFIX}{number:04d}"
+
+
+def next_article(db_session):
+    """Атомарно видає наступний артикул з послідовності product_article_seq."""
+    number = db_session.execute(select(product_article_seq.next_value())).scalar_one()
+    return format_article(number)
+
+
+def reserve_articles(db_session, count):
+    """
+    Резервує блок з count артикулів одним запитом (для масового імпорту).
+
+    Номери унікальні між усіма з'єднаннями; невикористані номери просто стають пропусками.
+    """
+    if count <= 0:
+        return []
+    numbers = db_session.execute(
+        select(product_article_seq.next_value()).select_from(func.generate_series(1, count))
+    ).scalars().all()
+    return [format_article(number) for number in sorted(numbers)]
+
+
+def iter_articles(db_session, block_size=ARTICLE_BLOCK_SIZE):
+    """Нескінченний генератор артикулів, що резервує їх блоками по block_size."""
+    while True:
+        yield from reserve_articles(db_session, block_size)
+
+
+def sync_article_sequence(db_session):
+    """
+    Ставить product_article_seq після найбільшого наявного номера PRD-xxxx.
+
+    Потрібно після ручного заповнення products з артикулами в обхід послідовності.
+    """
+    db_session.execute(text(
+        "SELECT setval('product_article_seq', "
+        "COALESCE((SELECT max(substring(article FROM '^PRD-([0-9]+)$')::bigint) FROM products), 1), "
+        "(SELECT count(*) > 0 FROM products WHERE article ~ '^PRD-[0-9]+$'))"
+    ))
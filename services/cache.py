@@ -0,0 +1,86 @@
+"""
+Кеш довідкових даних у пам'яті процесу (категорії, постачальники, клієнти).
+
+Дані читаються через кеш (read-through) і живуть до REFERENCE_CACHE_TTL секунд; обробники,
+що змінюють довідник, явно скидають його ключ. Кеш у кожного процесу свій: зміни, зроблені
+в іншому процесі (інший воркер gunicorn, скрипти імпорту), стануть видимими не пізніше ніж через TTL.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+
+REFERENCE_CACHE_TTL = int(os.getenv('REFERENCE_CACHE_TTL', 300))
+REFERENCE_CACHE_MAXSIZE = int(os.getenv('REFERENCE_CACHE_MAXSIZE', 64))
+
+# Ключі довідників
+CATEGORIES_KEY = 'categories'
+SUPPLIERS_LIST_KEY = 'suppliers_list'  # Постачальники товарів + пакування разом
+PACKAGING_SUPPLIERS_KEY = 'packaging_suppliers'
+CUSTOMERS_KEY = 'customers'
+
+
+class TTLCache:
+    """
+    Потокобезпечний кеш з TTL і LRU-витісненням, коли записів більше за maxsize.
+
+    Значення, завантажене під час invalidate() того ж ключа, не зберігається: інакше
+    повільний запит, що почався до зміни, міг би покласти в кеш застарілі дані.
+    """
+
+    def __init__(self, maxsize=REFERENCE_CACHE_MAXSIZE, ttl=REFERENCE_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._generations = {}  # key -> лічильник інвалідацій
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_or_load(self, key, loader):
+        """Повертає значення з кешу або викликає loader() і кешує результат."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            generation = self._generations.setdefault(key, 0)
+
+        value = loader()  # Поза блокуванням: запит до бази не тримає інші потоки
+
+        with self._lock:
+            if self._generations.get(key, 0) == generation:
+                self._entries[key] = (time.monotonic() + self.ttl, value)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+        return value
+
+    def invalidate(self, *keys):
+        """Скидає вказані ключі (без аргументів — весь кеш)."""
+        with self._lock:
+            for key in keys or list(self._generations):
+                self._entries.pop(key, None)
+                self._generations[key] = self._generations.get(key, 0) + 1
+
+    def stats(self):
+        with self._lock:
+            requests = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_ratio': round(self.hits / requests, 4) if requests else None,
+                'keys': list(self._entries),
+            }
+
+
+reference_cache = TTLCache()
@@ -5,6 +5,7 @@ from api.categories_api import categories_ns, category_model
 
 # Create a Blueprint for categories
 from models import Category, Product
+from services.cache import reference_cache, CATEGORIES_KEY
 
 category_bp = Blueprint('categories', __name__)
 
@@ -20,11 +21,13 @@ class CategoryList(Resource):
     def get(self):
         from postgreSQLConnect import db_session
 
-        categories = db_session.query(Category).all()
-        return [
-            {"id": cat.id, "name": cat.name}
-            for cat in categories
-        ], 200
+        def load():
+            return [
+                {"id": cat.id, "name": cat.name}
+                for cat in db_session.query(Category).all()
+            ]
+
+        return reference_cache.get_or_load(CATEGORIES_KEY, load), 200
 
 
 
@@ -53,6 +56,7 @@ def create_category():
             category = Category(name=category_name)
             session.add(category)
             session.commit()
+            reference_cache.invalidate(CATEGORIES_KEY)
 
             return jsonify({
                 'message': 'Category created successfully',
@@ -0,0 +1,138 @@
+"""
+Стиснення відповідей (gzip, brotli) для великих JSON/NDJSON/CSV.
+
+Кодування обирається за Accept-Encoding клієнта: br, якщо встановлено пакет brotli
+(необов'язкова залежність) і клієнт його приймає, інакше gzip. Звичайні відповіді менші за
+COMPRESS_MIN_SIZE віддаються як є; потокові (NDJSON, CSV-експорт) стискаються по мірі генерації,
+без збирання тіла в пам'яті. Файли з диска (send_file) не чіпаються: для них мають лишатися
+правильними Content-Length і Range.
+"""
+import gzip
+import importlib.util
+import os
+import zlib
+
+from flask import request
+
+COMPRESS_MIN_SIZE = int(os.getenv('COMPRESS_MIN_SIZE', 1024))  # Байтів; менші відповіді не стискаються
+COMPRESS_GZIP_LEVEL = int(os.getenv('COMPRESS_GZIP_LEVEL', 6))  # 1 (швидко) .. 9 (найменше)
+COMPRESS_BROTLI_QUALITY = int(os.getenv('COMPRESS_BROTLI_QUALITY', 4))  # 0 .. 11
+
+# Скільки байтів потоку стискати перед flush: клієнт отримує дані частинами, а не наприкінці відповіді.
+# 0 — flush після кожного фрагмента (кожен flush коштує кілька байтів і трохи гіршого стиснення)
+COMPRESS_STREAM_FLUSH_SIZE = int(os.getenv('COMPRESS_STREAM_FLUSH_SIZE', 16 * 1024))
+
+COMPRESSIBLE_MIMETYPES = {
+    'application/json',
+    'application/x-ndjson',
+    'text/csv',
+    'text/plain',
+    'text/html',
+}
+
+
+def brotli_available():
+    return importlib.util.find_spec('brotli') is not None
+
+
+def _stream(chunks, process, flush, finish, flush_size):
+    """
+    Стискає фрагменти потоку; щойно набралося flush_size байтів, віддає клієнту все стиснене до цього місця.
+
+    Без flush компресор тримає дані у своєму буфері, і потокова відповідь знову приходить цілком наприкінці.
+    """
+    compressed = []
+    pending = 0
+    for chunk in chunks:
+        compressed.append(process(chunk))
+        pending += len(chunk)
+        if pending >= flush_size:
+            compressed.append(flush())
+            yield b''.join(compressed)
+            compressed, pending = [], 0
+    compressed.append(finish())
+    yield b''.join(compressed)
+
+
+class GzipEncoder:
+    name = 'gzip'
+
+    def __init__(self, level=COMPRESS_GZIP_LEVEL, flush_size=COMPRESS_STREAM_FLUSH_SIZE):
+        self.level = level
+        self.flush_size = flush_size
+
+    def compress(self, data):
+        return gzip.compress(data, compresslevel=self.level, mtime=0)
+
+    def stream(self, chunks):
+        compressor = zlib.compressobj(self.level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)  # 16+ — заголовок gzip
+        return _stream(chunks, compressor.compress, lambda: compressor.flush(zlib.Z_SYNC_FLUSH), compressor.flush,
+                       self.flush_size)
+
+
+class BrotliEncoder:
+    name = 'br'
+
+    def __init__(self, quality=COMPRESS_BROTLI_QUALITY, flush_size=COMPRESS_STREAM_FLUSH_SIZE):
+        self.quality = quality
+        self.flush_size = flush_size
+
+    def compress(self, data):
+        import brotli
+
+        return brotli.compress(data, quality=self.quality)
+
+    def stream(self, chunks):
+        import brotli
+
+        compressor = brotli.Compressor(quality=self.quality)
+        return _stream(chunks, compressor.process, compressor.flush, compressor.finish, self.flush_size)
+
+
+# Порядок — пріоритет сервера, коли клієнт приймає кілька кодувань з однаковою вагою
+ENCODERS = [encoder for encoder, available in (
+    (BrotliEncoder(), brotli_available()),
+    (GzipEncoder(), True),
+) if available]
+
+
+def _choose_encoder():
+    best = request.accept_encodings.best_match([encoder.name for encoder in ENCODERS])
+    return next((encoder for encoder in ENCODERS if encoder.name == best), None)
+
+
+def compress_response(response):
+    """after_request: стискає відповідь, якщо тип стисливий, клієнт це приймає і тіло достатньо велике."""
+    if (
+        response.mimetype not in COMPRESSIBLE_MIMETYPES
+        or response.status_code < 200
+        or response.status_code in (204, 206, 304)
+        or response.direct_passthrough
+        or 'Content-Encoding' in response.headers
+    ):
+        return response
+
+    response.vary.add('Accept-Encoding')
+    encoder = _choose_encoder()
+    if encoder is None or request.method == 'HEAD':
+        return response
+
+    # Довжину знають і звичайні відповіді, і HTTP-помилки Werkzeug (вони приходять як потік)
+    if response.content_length is not None and response.content_length < COMPRESS_MIN_SIZE:
+        return response
+
+    if response.is_streamed:
+        original = response.response
+        response.response = encoder.stream(response.iter_encoded())
+        if hasattr(original, 'close'):
+            response.call_on_close(original.close)  # Закриває курсор, якщо клієнт обірвав потік
+        response.headers.pop('Content-Length', None)
+    else:
+        data = response.get_data()
+        compressed = encoder.compress(data)
+        if len(compressed) >= len(data):
+            return response
+        response.set_data(compressed)
+
+    response.headers['Content-Encoding'] = encoder.name
+    return response
@@ -4,6 +4,10 @@ from flask_sqlalchemy.session import Session
 
 from api.customer_api import customers_ns
 from models import Customer, Supplier
+from services.cache import reference_cache, CUSTOMERS_KEY
+from services.serializers import iter_customers, parse_fields, CUSTOMER_FIELDS
+from services.streaming import wants_ndjson, ndjson_response, STREAM_BATCH_SIZE
+from services.table_versions import conditional_get
 from sqlalchemy.exc import IntegrityError
 
 # Create Blueprint for customers
@@ -40,6 +44,7 @@ def create_customer():
         )
         db_session.add(customer)
         db_session.commit()
+        reference_cache.invalidate(CUSTOMERS_KEY)
         return jsonify({'message': 'Customer created successfully', 'customer': customer.to_dict()}), 201
     except IntegrityError as e:
         db_session.rollback()
@@ -65,11 +70,24 @@ class CustomerList(Resource):
         summary="Отримати всіх клієнтів",
         description="Повертає список усіх клієнтів"
     )
+    @conditional_get(Customer)
     def get(self):
+        """?fields=id,name,... — лише вказані поля."""
         from postgreSQLConnect import db_session
 
-        customers = db_session.query(Customer).all()
-        return [customer.to_dict() for customer in customers], 200
+        try:
+            fields = parse_fields(request.args.get('fields'), CUSTOMER_FIELDS)
+        except ValueError as e:
+            return {'error': str(e)}, 400
+
+        if wants_ndjson():
+            return ndjson_response(iter_customers(db_session, batch_size=STREAM_BATCH_SIZE, fields=fields))
+
+        if fields is not None:
+            # У кеші лише повний список; вузькі вибірки дешеві й так
+            return list(iter_customers(db_session, fields=fields)), 200
+
+        return reference_cache.get_or_load(CUSTOMERS_KEY, lambda: list(iter_customers(db_session))), 200
 
 # Get customer details by ID
 @customer_bp.route('/customers_details/<int:customer_id>', methods=['GET'])
@@ -140,6 +158,7 @@ def update_customer(session: Session, customer_id: int, customer_data: dict):
 
     try:
         session.commit()
+        reference_cache.invalidate(CUSTOMERS_KEY)
         return customer
     except Exception as e:
         session.rollback()
@@ -166,6 +185,7 @@ def delete_customer(session: Session, customer_id: int):
     try:
         session.delete(customer)
         session.commit()
+        reference_cache.invalidate(CUSTOMERS_KEY)
         return True
     except Exception as e:
         session.rollback()
@@ -0,0 +1,422 @@
+"""
+Потоковий експорт у XLSX, CSV і Parquet.
+
+Рядки читаються серверним курсором пакетами по EXPORT_YIELD_PER (yield_per) і відразу дописуються
+у файл потрібного формату:
+  * xlsx — книга openpyxl у write-only режимі, яка тримає аркуш у тимчасовому файлі, а не в пам'яті;
+  * csv — текст, що віддається клієнту по пакету, поки курсор ще читає наступні;
+  * parquet — по row group на пакет через pyarrow (необов'язкова залежність).
+Готові xlsx/parquet пишуться на диск і віддаються з нього потоком.
+"""
+import csv
+import importlib.util
+import io
+import os
+import tempfile
+from contextlib import contextmanager
+from datetime import datetime
+
+from openpyxl import Workbook
+from sqlalchemy import select, func, literal_column, Integer, Numeric, DateTime, Date, Boolean
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+
+from models import Product, Supplier, Category, Customer, SaleHistory, PurchaseHistory, PackagingMaterial, \
+    PackagingMaterialSupplier, GiftSet, GiftSetSalesHistory, OtherInvestment, product_categories_table
+
+EXPORT_YIELD_PER = 1000
+XLSX_MIMETYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+CSV_MIMETYPE = "text/csv"
+PARQUET_MIMETYPE = "application/vnd.apache.parquet"
+NOT_AVAILABLE = "Н/Д"
+
+
+def format_date(value):
+    return value.strftime("%Y-%m-%d") if value else None
+
+
+def format_datetime(value):
+    return value.strftime("%Y-%m-%d %H:%M") if value else None
+
+
+def to_float(value):
+    return float(value) if value is not None else None
+
+
+class ExportParams:
+    """Фільтри експорту: ids позицій і період [date_from, date_to] для історії."""
+
+    def __init__(self, ids=None, date_from=None, date_to=None):
+        self.ids = ids or []
+        self.date_from = date_from
+        self.date_to = date_to
+
+    @classmethod
+    def from_json(cls, data, ids_field='ids'):
+        """
+        Розбирає тіло запиту; ValueError з поясненням для некоректних полів.
+
+        Дати — YYYY-MM-DD, date_to включно.
+        """
+        data = data or {}
+        ids = data.get(ids_field) or []
+        if not isinstance(ids, list) or not all(isinstance(item_id, int) for item_id in ids):
+            raise ValueError(f"{ids_field} must be a list of integers")
+
+        def parse_date(field):
+            value = data.get(field)
+            if not value:
+                return None
+            try:
+                return datetime.strptime(value, "%Y-%m-%d")
+            except (TypeError, ValueError):
+                raise ValueError(f"{field} must be in YYYY-MM-DD format")
+
+        return cls(ids, parse_date('date_from'), parse_date('date_to'))
+
+
+class ExportDataset:
+    """
+    Набір даних для експорту: аркуш, колонки і запит.
+
+    :param columns: [(заголовок, перетворення значення або None)] у порядку колонок запиту.
+    :param build_query: build_query(params) -> select; рядки мають іти в порядку для файлу.
+    :param ids_field: Поле тіла запиту зі списком id для фільтра.
+    """
+
+    def __init__(self, sheet_title, filename_prefix, columns, build_query, ids_field='product_ids'):
+        self.sheet_title = sheet_title
+        self.filename_prefix = filename_prefix
+        self.columns = columns
+        self.build_query = build_query
+        self.ids_field = ids_field
+
+    @property
+    def headers(self):
+        return [title for title, _ in self.columns]
+
+    def filename(self, extension='xlsx'):
+        return f"{self.filename_prefix}_{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}.{extension}"
+
+    def iter_batches(self, db_session, params, converters=None):
+        """
+        Пакети рядків (списки списків) по EXPORT_YIELD_PER з серверного курсора.
+
+        :param converters: Перетворення по колонках; за замовчуванням — ті, що для xlsx/csv.
+        """
+        if converters is None:
+            converters = [convert for _, convert in self.columns]
+        result = db_session.execute(self.build_query(params).execution_options(yield_per=EXPORT_YIELD_PER))
+        for partition in result.partitions():
+            yield [[convert(value) if convert else value for convert, value in zip(converters, row)]
+                   for row in partition]
+
+    def iter_rows(self, db_session, params):
+        for batch in self.iter_batches(db_session, params):
+            yield from batch
+
+
+def _filter_period(query, date_column, params):
+    if params.date_from:
+        query = query.where(date_column >= params.date_from)
+    if params.date_to:
+        query = query.where(func.date(date_column) <= params.date_to.date())
+    return query
+
+
+def products_query(params):
+    # Категорії — один GROUP BY на всі товари; корельований підзапит читав би product_categories
+    # (без індексу за product_id) заново для кожного товару
+    categories = (
+        select(
+            product_categories_table.c.product_id,
+            func.string_agg(Category.name, aggregate_order_by(literal_column("', '"), Category.name)).label('names')
+        )
+            .join(Category, Category.id == product_categories_table.c.category_id)
+            .group_by(product_categories_table.c.product_id)
+    )
+    if params.ids:
+        categories = categories.where(product_categories_table.c.product_id.in_(params.ids))
+    categories = categories.subquery()
+
+    query = (
+        select(
+            Product.name, func.coalesce(Supplier.name, NOT_AVAILABLE), func.coalesce(categories.c.names, ''),
+            Product.total_quantity, Product.available_quantity, Product.sold_quantity,
+            Product.purchase_price_per_item, Product.selling_price_per_item, Product.created_date
+        )
+            .outerjoin(Supplier, Supplier.id == Product.supplier_id)
+            .outerjoin(categories, categories.c.product_id == Product.id)
+            .order_by(Product.id)
+    )
+    if params.ids:
+        query = query.where(Product.id.in_(params.ids))
+    return query
+
+
+def sales_query(params):
+    query = (
+        select(
+            SaleHistory.sale_date, Product.article, Product.name, func.coalesce(Customer.name, NOT_AVAILABLE),
+            SaleHistory.quantity_sold, SaleHistory.selling_price_per_item, SaleHistory.selling_total_price,
+            SaleHistory.profit, SaleHistory.total_packaging_cost
+        )
+            .join(Product, Product.id == SaleHistory.product_id)
+            .outerjoin(Customer, Customer.id == SaleHistory.customer_id)
+            .order_by(SaleHistory.sale_date, SaleHistory.id)
+    )
+    if params.ids:
+        query = query.where(SaleHistory.product_id.in_(params.ids))
+    return _filter_period(query, SaleHistory.sale_date, params)
+
+
+def purchases_query(params):
+    query = (
+        select(
+            PurchaseHistory.purchase_date, Product.article, Product.name, func.coalesce(Supplier.name, NOT_AVAILABLE),
+            PurchaseHistory.quantity_purchase, PurchaseHistory.purchase_price_per_item,
+            PurchaseHistory.purchase_total_price
+        )
+            .join(Product, Product.id == PurchaseHistory.product_id)
+            .outerjoin(Supplier, Supplier.id == PurchaseHistory.supplier_id)
+            .order_by(PurchaseHistory.purchase_date, PurchaseHistory.id)
+    )
+    if params.ids:
+        query = query.where(PurchaseHistory.product_id.in_(params.ids))
+    return _filter_period(query, PurchaseHistory.purchase_date, params)
+
+
+def packaging_query(params):
+    query = (
+        select(
+            PackagingMaterial.name, func.coalesce(PackagingMaterialSupplier.name, NOT_AVAILABLE),
+            PackagingMaterial.status, PackagingMaterial.total_quantity, PackagingMaterial.available_quantity,
+            PackagingMaterial.purchase_price_per_unit, PackagingMaterial.total_purchase_cost,
+            PackagingMaterial.available_stock_cost, PackagingMaterial.created_date
+        )
+            .outerjoin(PackagingMaterialSupplier,
+                       PackagingMaterialSupplier.id == PackagingMaterial.packaging_material_supplier_id)
+            .order_by(PackagingMaterial.id)
+    )
+    if params.ids:
+        query = query.where(PackagingMaterial.id.in_(params.ids))
+    return query
+
+
+def gift_set_sales_query(params):
+    query = (
+        select(
+            GiftSetSalesHistory.sold_at, GiftSet.name, func.coalesce(Customer.name, NOT_AVAILABLE),
+            GiftSetSalesHistory.quantity, GiftSetSalesHistory.sold_price
+        )
+            .join(GiftSet, GiftSet.id == GiftSetSalesHistory.gift_set_id)
+            .outerjoin(Customer, Customer.id == GiftSetSalesHistory.customer_id)
+            .order_by(GiftSetSalesHistory.sold_at, GiftSetSalesHistory.id)
+    )
+    if params.ids:
+        query = query.where(GiftSetSalesHistory.gift_set_id.in_(params.ids))
+    return _filter_period(query, GiftSetSalesHistory.sold_at, params)
+
+
+def investments_query(params):
+    query = (
+        select(OtherInvestment.date, OtherInvestment.type_name, OtherInvestment.supplier, OtherInvestment.cost)
+            .order_by(OtherInvestment.date, OtherInvestment.id)
+    )
+    if params.ids:
+        query = query.where(OtherInvestment.id.in_(params.ids))
+    return _filter_period(query, OtherInvestment.date, params)
+
+
+EXPORT_DATASETS = {
+    'products': ExportDataset("Products", "Products", [
+        ("Назва товару", None),
+        ("Постачальник", None),
+        ("Категорії", None),
+        ("Загальна кількість", None),
+        ("Доступна кількість", None),
+        ("Продана кількість", None),
+        ("Ціна закупівлі за одиницю", to_float),
+        ("Ціна продажу за одиницю", to_float),
+        ("Дата створення", format_date),
+    ], products_query),
+    'sales': ExportDataset("Sales", "Sales", [
+        ("Дата продажу", format_datetime),
+        ("Артикул", None),
+        ("Назва товару", None),
+        ("Покупець", None),
+        ("Кількість", None),
+        ("Ціна продажу за одиницю", to_float),
+        ("Сума продажу", to_float),
+        ("Прибуток", to_float),
+        ("Вартість пакування", to_float),
+    ], sales_query),
+    'purchases': ExportDataset("Purchases", "Purchases", [
+        ("Дата закупівлі", format_date),
+        ("Артикул", None),
+        ("Назва товару", None),
+        ("Постачальник", None),
+        ("Кількість", None),
+        ("Ціна закупівлі за одиницю", to_float),
+        ("Сума закупівлі", to_float),
+    ], purchases_query),
+    'packaging': ExportDataset("Packaging", "Packaging", [
+        ("Назва пакування", None),
+        ("Постачальник", None),
+        ("Статус", None),
+        ("Загальна кількість", None),
+        ("Доступна кількість", None),
+        ("Ціна закупівлі за одиницю", to_float),
+        ("Сума закупівлі", to_float),
+        ("Вартість залишку", to_float),
+        ("Дата створення", format_date),
+    ], packaging_query, ids_field='packaging_ids'),
+    'gift_set_sales': ExportDataset("Gift set sales", "GiftSetSales", [
+        ("Дата продажу", format_datetime),
+        ("Набір", None),
+        ("Покупець", None),
+        ("Кількість", None),
+        ("Сума продажу", to_float),
+    ], gift_set_sales_query, ids_field='gift_set_ids'),
+    'investments': ExportDataset("Investments", "Investments", [
+        ("Дата", format_date),
+        ("Тип вкладення", None),
+        ("Постачальник", None),
+        ("Вартість", to_float),
+    ], investments_query, ids_field='investment_ids'),
+}
+
+
+def write_xlsx(db_session, dataset, params, file):
+    """Пише набір даних у file (шлях або бінарний файл) write-only книгою openpyxl."""
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(dataset.sheet_title)
+    sheet.append(dataset.headers)
+    for row in dataset.iter_rows(db_session, params):
+        sheet.append(row)
+    workbook.save(file)
+
+
+def iter_csv(db_session, dataset, params):
+    """
+    CSV частинами по пакету курсора: перший шматок (BOM і заголовок) іде клієнту ще до кінця запиту.
+
+    BOM — щоб Excel відкривав кирилицю без вибору кодування.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(dataset.headers)
+    yield '\ufeff' + buffer.getvalue()
+    for batch in dataset.iter_batches(db_session, params):
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(batch)
+        yield buffer.getvalue()
+
+
+@contextmanager
+def _binary_output(file):
+    """Шлях відкривається і закривається тут; переданий файловий об'єкт лишається відкритим."""
+    if isinstance(file, (str, os.PathLike)):
+        with open(file, 'wb') as output:
+            yield output
+    else:
+        yield file
+
+
+def write_csv(db_session, dataset, params, file):
+    """Пише CSV (UTF-8 з BOM) у file — шлях або бінарний файл."""
+    with _binary_output(file) as output:
+        for chunk in iter_csv(db_session, dataset, params):
+            output.write(chunk.encode('utf-8'))
+
+
+def parquet_available():
+    return importlib.util.find_spec('pyarrow') is not None
+
+
+def _parquet_column(sql_type):
+    """(тип arrow, перетворення значення) за типом колонки запиту; Decimal стає float64, як і в xlsx."""
+    import pyarrow as pa
+
+    if isinstance(sql_type, Integer):
+        return pa.int64(), None
+    if isinstance(sql_type, Numeric):
+        return pa.float64(), to_float
+    if isinstance(sql_type, DateTime):
+        return pa.timestamp('us'), None
+    if isinstance(sql_type, Date):
+        return pa.date32(), None
+    if isinstance(sql_type, Boolean):
+        return pa.bool_(), None
+    return pa.string(), None
+
+
+def write_parquet(db_session, dataset, params, file):
+    """
+    Пише Parquet у file (шлях або бінарний файл): схема — з типів колонок запиту, row group на пакет.
+
+    Дати лишаються датами (не рядками, як у xlsx/csv).
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    query_columns = dataset.build_query(params).selected_columns
+    arrow_columns = [_parquet_column(column.type) for column in query_columns]
+    schema = pa.schema([(title, arrow_type) for title, (arrow_type, _) in zip(dataset.headers, arrow_columns)])
+    converters = [convert for _, convert in arrow_columns]
+
+    with pq.ParquetWriter(file, schema) as writer:
+        for batch in dataset.iter_batches(db_session, params, converters):
+            writer.write_table(pa.Table.from_arrays(
+                [pa.array(values, type=field.type) for values, field in zip(zip(*batch), schema)],
+                schema=schema
+            ))
+
+
+class ExportFormatUnavailable(Exception):
+    """Формат відомий, але його бібліотеку не встановлено."""
+
+
+class ExportFormat:
+    def __init__(self, extension, mimetype, write):
+        self.extension = extension
+        self.mimetype = mimetype
+        self.write = write  # write(db_session, dataset, params, file)
+
+
+EXPORT_FORMATS = {
+    'xlsx': ExportFormat('xlsx', XLSX_MIMETYPE, write_xlsx),
+    'csv': ExportFormat('csv', CSV_MIMETYPE, write_csv),
+    'parquet': ExportFormat('parquet', PARQUET_MIMETYPE, write_parquet),
+}
+
+
+def get_export_format(name):
+    """
+    ExportFormat за назвою (за замовчуванням xlsx).
+
+    :raises ValueError: Невідомий формат.
+    :raises ExportFormatUnavailable: Формат потребує бібліотеки, якої немає.
+    """
+    export_format = EXPORT_FORMATS.get(name or 'xlsx')
+    if export_format is None:
+        raise ValueError(f"format must be one of: {', '.join(EXPORT_FORMATS)}")
+    if export_format.extension == 'parquet' and not parquet_available():
+        raise ExportFormatUnavailable("Parquet export requires pyarrow")
+    return export_format
+
+
+def render_export(db_session, dataset, params, export_format):
+    """
+    Рендерить файл у тимчасовий файл і повертає його, перемотаним на початок.
+
+    Файл анонімний: зникає, щойно його закриють (send_file закриває після відправки).
+    """
+    file = tempfile.TemporaryFile()
+    try:
+        export_format.write(db_session, dataset, params, file)
+    except Exception:
+        file.close()
+        raise
+    file.seek(0)
+    return file
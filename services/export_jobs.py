@@ -0,0 +1,124 @@
+"""
+Фонові задачі експорту.
+
+Задача рендериться в окремому потоці пулу у файл у EXPORT_JOBS_DIR; API лише ставить задачу в чергу,
+повертає її id, а потім віддає статус і готовий файл. Готові файли живуть EXPORT_JOB_TTL секунд,
+після чого задача і файл видаляються (перевірка — при кожному зверненні до реєстру).
+
+Реєстр задач — у пам'яті процесу: при кількох процесах gunicorn статус треба питати в того ж процесу,
+або тримати один процес для експорту.
+"""
+import logging
+import os
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+
+EXPORT_JOBS_DIR = os.getenv('EXPORT_JOBS_DIR', os.path.join(tempfile.gettempdir(), 'crm_exports'))
+EXPORT_JOB_WORKERS = int(os.getenv('EXPORT_JOB_WORKERS', 2))
+EXPORT_JOB_TTL = int(os.getenv('EXPORT_JOB_TTL', 3600))  # Скільки секунд зберігати готовий файл
+
+STATUS_QUEUED = 'queued'
+STATUS_RUNNING = 'running'
+STATUS_DONE = 'done'
+STATUS_FAILED = 'failed'
+
+
+class ExportJob:
+    def __init__(self, dataset_name, dataset, params, export_format):
+        self.id = uuid.uuid4().hex
+        self.dataset_name = dataset_name
+        self.dataset = dataset
+        self.params = params
+        self.export_format = export_format
+        self.status = STATUS_QUEUED
+        self.filename = dataset.filename(export_format.extension)
+        self.file_path = os.path.join(EXPORT_JOBS_DIR, f"{self.id}.{export_format.extension}")
+        self.error = None
+        self.created_at = time.time()
+        self.finished_at = None
+
+    @property
+    def finished(self):
+        return self.status in (STATUS_DONE, STATUS_FAILED)
+
+    def to_dict(self):
+        return {
+            'job_id': self.id,
+            'dataset': self.dataset_name,
+            'format': self.export_format.extension,
+            'status': self.status,
+            'filename': self.filename,
+            'error': self.error,
+            'created_at': self.created_at,
+            'finished_at': self.finished_at,
+            'expires_at': self.finished_at + EXPORT_JOB_TTL if self.finished else None,
+        }
+
+
+class ExportJobRegistry:
+    """Черга задач експорту: пул потоків-працівників і словник задач за id."""
+
+    def __init__(self, workers=EXPORT_JOB_WORKERS, ttl=EXPORT_JOB_TTL):
+        self.ttl = ttl
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='export-job')
+
+    def submit(self, dataset_name, dataset, params, export_format):
+        self.cleanup()
+        os.makedirs(EXPORT_JOBS_DIR, exist_ok=True)
+        job = ExportJob(dataset_name, dataset, params, export_format)
+        with self._lock:
+            self._jobs[job.id] = job
+        self._pool.submit(self._run, job)
+        return job
+
+    def get(self, job_id):
+        self.cleanup()
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cleanup(self, now=None):
+        """Видаляє задачі, завершені понад ttl секунд тому, разом з їхніми файлами."""
+        now = now or time.time()
+        with self._lock:
+            expired = [job for job in self._jobs.values() if job.finished and now - job.finished_at > self.ttl]
+            for job in expired:
+                del self._jobs[job.id]
+        for job in expired:
+            _remove_file(job.file_path)
+
+    def _run(self, job):
+        from postgreSQLConnect import db_session
+
+        job.status = STATUS_RUNNING
+        partial_path = f"{job.file_path}.part"
+        try:
+            job.export_format.write(db_session, job.dataset, job.params, partial_path)
+            os.replace(partial_path, job.file_path)  # Файл з'являється лише цілим
+            status = STATUS_DONE
+        except Exception as e:
+            logging.exception("Export job %s failed", job.id)
+            _remove_file(partial_path)
+            job.error = str(e)
+            status = STATUS_FAILED
+        finally:
+            # Потік пулу живе довше за задачу: повертаємо з'єднання в пул
+            db_session.remove()
+        # finished_at — раніше за статус, бо cleanup() рахує TTL для завершених задач
+        job.finished_at = time.time()
+        job.status = status
+
+
+def _remove_file(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+export_jobs = ExportJobRegistry()
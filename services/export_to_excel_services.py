@@ -1,65 +1,151 @@
-from flask import request, jsonify, send_file, Blueprint
-from sqlalchemy.orm import joinedload
-from io import BytesIO
-import pandas as pd
-from datetime import datetime
+from flask import request, jsonify, send_file, Blueprint, Response, stream_with_context
+from sqlalchemy.exc import SQLAlchemyError
+
+from services.export_engine import EXPORT_DATASETS, ExportParams, ExportFormatUnavailable, get_export_format, \
+    render_export, iter_csv
+from services.export_jobs import export_jobs, STATUS_DONE
 
-from models import Product
 export_to_excel_bp = Blueprint('export_to_excel', __name__)
 
 
-@export_to_excel_bp.route('/export-products-excel', methods=['POST'])
-def export_products():
+def parse_export_request(dataset_name, data):
+    """
+    (ExportParams, ExportFormat) з тіла запиту або (None, відповідь з помилкою).
+
+    Формат — поле format: xlsx (за замовчуванням), csv або parquet.
+    """
+    data = data or {}
+    dataset = EXPORT_DATASETS[dataset_name]
+    try:
+        return (ExportParams.from_json(data, ids_field=dataset.ids_field), get_export_format(data.get('format'))), None
+    except ValueError as e:
+        return None, (jsonify({"error": str(e)}), 400)
+    except ExportFormatUnavailable as e:
+        return None, (jsonify({"error": str(e)}), 501)
+
+
+def send_export(dataset_name, params, export_format):
+    """
+    Віддає набір даних у потрібному форматі.
+
+    CSV іде клієнту потоком по мірі читання курсора; xlsx і parquet рендеряться на диск
+    і віддаються з файлу.
+    """
     from postgreSQLConnect import db_session
 
+    dataset = EXPORT_DATASETS[dataset_name]
+    filename = dataset.filename(export_format.extension)
+
+    if export_format.extension == 'csv':
+        return Response(
+            stream_with_context(iter_csv(db_session, dataset, params)),
+            mimetype=export_format.mimetype,
+            headers={'Content-Disposition': f'attachment; filename={filename}'},
+        )
+
+    try:
+        file = render_export(db_session, dataset, params, export_format)
+    except SQLAlchemyError as e:
+        db_session.rollback()
+        return jsonify({'error': 'Database error', 'details': str(e)}), 500
+
+    return send_file(
+        file,
+        as_attachment=True,
+        download_name=filename,
+        mimetype=export_format.mimetype,
+    )
+
+
+@export_to_excel_bp.route('/export-products-excel', methods=['POST'])
+def export_products():
     # Отримання списку ID продуктів з фронтенду
-    data = request.get_json()
-    product_ids = data.get("product_ids", [])
+    parsed, error = parse_export_request('products', request.get_json(silent=True))
+    if error:
+        return error
+    params, export_format = parsed
 
-    if not product_ids:
+    if not params.ids:
         return jsonify({"error": "No product IDs provided"}), 400
 
-    # Запит до бази для отримання продуктів із деталями
-    products = (
-        db_session.query(Product)
-            .filter(Product.id.in_(product_ids))
-            .options(joinedload(Product.supplier), joinedload(Product.categories))
-            .all()
-    )
+    return send_export('products', params, export_format)
+
+
+@export_to_excel_bp.route('/export-sales-excel', methods=['POST'])
+def export_sales():
+    """Історія продажів; фільтри: product_ids, date_from, date_to (YYYY-MM-DD)."""
+    return export_dataset('sales')
+
+
+@export_to_excel_bp.route('/export-purchases-excel', methods=['POST'])
+def export_purchases():
+    """Історія закупівель; фільтри: product_ids, date_from, date_to (YYYY-MM-DD)."""
+    return export_dataset('purchases')
+
+
+@export_to_excel_bp.route('/export-packaging-excel', methods=['POST'])
+def export_packaging():
+    """Пакувальні матеріали; фільтр: packaging_ids (без нього — усі)."""
+    return export_dataset('packaging')
+
+
+@export_to_excel_bp.route('/export/<dataset_name>', methods=['POST'])
+def export_dataset(dataset_name):
+    """
+    Експорт будь-якого набору з EXPORT_DATASETS.
+
+    Тіло: {format?: xlsx|csv|parquet, <ids_field набору>?, date_from?, date_to?}
+    """
+    if dataset_name not in EXPORT_DATASETS:
+        return jsonify({"error": f"dataset must be one of: {', '.join(EXPORT_DATASETS)}"}), 404
+
+    parsed, error = parse_export_request(dataset_name, request.get_json(silent=True))
+    if error:
+        return error
+    params, export_format = parsed
+    return send_export(dataset_name, params, export_format)
+
+
+@export_to_excel_bp.route('/export-jobs', methods=['POST'])
+def submit_export_job():
+    """
+    Ставить експорт у чергу й одразу повертає id задачі (202).
+
+    Тіло: {dataset, format?, <ids_field набору>?, date_from?, date_to?}
+    """
+    data = request.get_json(silent=True) or {}
+    dataset_name = data.get('dataset')
+    if dataset_name not in EXPORT_DATASETS:
+        return jsonify({"error": f"dataset must be one of: {', '.join(EXPORT_DATASETS)}"}), 400
+
+    parsed, error = parse_export_request(dataset_name, data)
+    if error:
+        return error
+    params, export_format = parsed
+
+    job = export_jobs.submit(dataset_name, EXPORT_DATASETS[dataset_name], params, export_format)
+    return jsonify(job.to_dict()), 202
+
+
+@export_to_excel_bp.route('/export-jobs/<job_id>', methods=['GET'])
+def get_export_job(job_id):
+    job = export_jobs.get(job_id)
+    if job is None:
+        return jsonify({"error": "Export job not found or expired"}), 404
+    return jsonify(job.to_dict()), 200
+
+
+@export_to_excel_bp.route('/export-jobs/<job_id>/download', methods=['GET'])
+def download_export_job(job_id):
+    job = export_jobs.get(job_id)
+    if job is None:
+        return jsonify({"error": "Export job not found or expired"}), 404
+    if job.status != STATUS_DONE:
+        return jsonify({"error": "Export is not ready", "status": job.status}), 409
 
-    # Перетворення даних у формат списку словників
-    product_data = []
-    for product in products:
-        product_data.append({
-            "Назва товару": product.name,
-            "Постачальник": product.supplier.name if product.supplier else "Н/Д",
-            "Категорії": ", ".join([category.name for category in product.categories]),
-            "Загальна кількість": product.total_quantity,
-            "Доступна кількість": product.available_quantity,
-            "Продана кількість": product.sold_quantity,
-            "Ціна закупівлі за одиницю": float(product.purchase_price_per_item),
-            "Ціна продажу за одиницю": float(product.selling_price_per_item),
-            "Дата створення": product.created_date.strftime("%Y-%m-%d"),
-        })
-
-    # Створення Excel-файлу
-    df = pd.DataFrame(product_data)
-    output = BytesIO()
-
-    timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-    filename = f"Products_{timestamp}.xlsx"
-
-    # Запис даних у BytesIO
-    with pd.ExcelWriter(output, engine="openpyxl") as writer:
-        df.to_excel(writer, index=False, sheet_name="Products")
-
-    # Перемістити покажчик на початок файлу
-    output.seek(0)
-
-    # Повернення файлу як відповіді
     return send_file(
-        output,
+        job.file_path,
         as_attachment=True,
-        download_name=filename,
-        mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        download_name=job.filename,
+        mimetype=job.export_format.mimetype,
     )
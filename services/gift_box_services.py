@@ -1,10 +1,72 @@
 from flask import request, jsonify, Blueprint
+from sqlalchemy import delete, select
+from sqlalchemy.exc import SQLAlchemyError
+
 from models import GiftSet, GiftSetProduct, GiftSetPackaging, Product, PackagingMaterial, GiftSetSalesHistory, \
     GiftSetSalesHistoryProduct, GiftSetSalesHistoryPackaging, Customer
+from services.inventory_service import change_product_stock, change_packaging_stock, lock_order, \
+    InsufficientStockError, StockItemNotFoundError, CHANGE_GIFT_SET_RESERVE, CHANGE_GIFT_SET_RELEASE, \
+    CHANGE_GIFT_SET_SALE
+from services.serializers import list_gift_sets, parse_fields, GIFT_SET_FIELDS
+from services.table_versions import conditional_get
 
 gift_box_services_bp = Blueprint('gift_box_services', __name__)
 
 
+def reserve_gift_set_items(db_session, gift_set, items):
+    """
+    Резервує товари та пакування набору (available -> reserved) і додає їх до набору.
+
+    Позиції обробляються в порядку блокування; нестача будь-якої з них кидає InsufficientStockError,
+    і обробник відкочує весь набір.
+
+    :param items: Список (item_type, item_id, quantity, price); price=None — брати закупівельну ціну.
+    :return: Загальна вартість набору.
+    """
+    total_price = 0
+    for item_type, item_id, quantity, price in lock_order(items):
+        if item_type == "product":
+            product = change_product_stock(
+                db_session, item_id, CHANGE_GIFT_SET_RESERVE, available=-quantity, reserved=quantity
+            )
+            total_price += float(product.purchase_price_per_item if price is None else price) * quantity
+            gift_set.gift_set_products.append(GiftSetProduct(product_id=item_id, quantity=quantity))
+
+        elif item_type == "packaging":
+            packaging = change_packaging_stock(
+                db_session, item_id, CHANGE_GIFT_SET_RESERVE, available=-quantity, reserved=quantity
+            )
+            total_price += float(packaging.purchase_price_per_unit) * quantity
+            gift_set.gift_set_packagings.append(GiftSetPackaging(packaging_id=item_id, quantity=quantity))
+    return total_price
+
+
+def release_gift_set_items(db_session, gift_set):
+    """Повертає зарезервовані товари та пакування набору на склад і видаляє їх із набору."""
+    items = [("product", item.product_id, item) for item in gift_set.gift_set_products] + \
+            [("packaging", item.packaging_id, item) for item in gift_set.gift_set_packagings]
+    for item_type, item_id, item in lock_order(items):
+        if item_type == "product":
+            change_product_stock(
+                db_session, item_id, CHANGE_GIFT_SET_RELEASE, available=item.quantity, reserved=-item.quantity
+            )
+        else:
+            change_packaging_stock(
+                db_session, item_id, CHANGE_GIFT_SET_RELEASE, available=item.quantity, reserved=-item.quantity
+            )
+        db_session.delete(item)
+    gift_set.gift_set_products = []
+    gift_set.gift_set_packagings = []
+
+
+def delete_gift_set_sales_history(db_session, gift_set_id):
+    """Видаляє історію продажів набору разом з її рядками товарів і пакувань (вони посилаються на позиції набору)."""
+    sales_ids = select(GiftSetSalesHistory.id).where(GiftSetSalesHistory.gift_set_id == gift_set_id)
+    for model in (GiftSetSalesHistoryProduct, GiftSetSalesHistoryPackaging):
+        db_session.execute(delete(model).where(model.sales_history_id.in_(sales_ids)))
+    db_session.execute(delete(GiftSetSalesHistory).where(GiftSetSalesHistory.gift_set_id == gift_set_id))
+
+
 @gift_box_services_bp.route('/create_gift_set', methods=['POST'])
 def create_gift_set():
     data = request.json
@@ -28,57 +90,24 @@ def create_gift_set():
     if not any(item['item_type'] in ['product', 'packaging'] for item in items):
         return jsonify({"error": "At least one product or packaging must be included in the gift set"}), 400
 
-    gift_set = GiftSet(
-        name=name,
-        description=description,
-        gift_selling_price=gift_selling_price
-    )
-    db_session.add(gift_set)
-    db_session.commit()  # Отримуємо gift_set.id
-
-    total_price = 0
-
-    for item in items:
-        item_id = item.get('item_id')
-        item_type = item.get('item_type')  # "product" або "packaging"
-        quantity = item.get('quantity', 1)
-
-        if item_type == "product":
-            product = db_session.query(Product).filter(Product.id == item_id).one_or_none()
-            if not product:
-                return jsonify({"error": f"Product {item_id} not found"}), 400
-            if product.available_quantity < quantity:
-                return jsonify({"error": f"Product {item_id} not available in required quantity"}), 400
-            product.available_quantity -= quantity
-            product.reserved_quantity += quantity  # Резервуємо товар
-            total_price += product.purchase_price_per_item * quantity
-            gift_set_product = GiftSetProduct(
-                gift_set_id=gift_set.id,
-                product_id=product.id,
-                quantity=quantity
-            )
-            db_session.add(gift_set_product)
-
-        elif item_type == "packaging":
-            packaging = db_session.query(PackagingMaterial).filter(PackagingMaterial.id == item_id).one_or_none()
-            if not packaging:
-                return jsonify({"error": f"Packaging {item_id} not found"}), 400
-            if packaging.available_quantity < quantity:
-                return jsonify({"error": f"Packaging {item_id} not available in required quantity"}), 400
-            packaging.available_quantity -= quantity  # Оновлюємо кількість доступного пакування та відзначаємо як використане
-            packaging.reserved_quantity += quantity  # Резервуємо пакування
-            total_price += packaging.purchase_price_per_unit * quantity
-            gift_set_packaging = GiftSetPackaging(
-                gift_set_id=gift_set.id,
-                packaging_id=packaging.id,
-                quantity=quantity
-            )
-            db_session.add(gift_set_packaging)
+    try:
+        gift_set = GiftSet(
+            name=name,
+            description=description,
+            gift_selling_price=gift_selling_price
+        )
+        db_session.add(gift_set)
 
-    gift_set.total_price = total_price
-    db_session.commit()
+        gift_set.total_price = reserve_gift_set_items(db_session, gift_set, [
+            (item.get('item_type'), item.get('item_id'), item.get('quantity', 1), None)
+            for item in items
+        ])
+        db_session.commit()
 
-    return jsonify({"message": "Gift set created successfully", "id": gift_set.id}), 201
+        return jsonify({"message": "Gift set created successfully", "id": gift_set.id}), 201
+    except (StockItemNotFoundError, InsufficientStockError) as e:
+        db_session.rollback()
+        return jsonify({"error": str(e)}), 400
 
 
 @gift_box_services_bp.route('/gift_set_show_details/<int:gift_set_id>', methods=['GET'])
@@ -122,10 +151,15 @@ def update_gift_set(gift_set_id):
         data = request.json
         from postgreSQLConnect import db_session
 
-        # Отримуємо набір з бази даних
-        gift_set = db_session.query(GiftSet).filter(GiftSet.id == gift_set_id).one_or_none()
+        # Блокуємо набір до кінця транзакції: склад не можна міняти паралельно з продажем
+        gift_set = db_session.query(GiftSet).filter(GiftSet.id == gift_set_id).with_for_update().one_or_none()
         if not gift_set:
+            db_session.rollback()
             return jsonify({"error": "Gift set not found"}), 404
+        if gift_set.is_sold:
+            # Товари проданого набору вже списані, а на його позиції посилається історія продажів
+            db_session.rollback()
+            return jsonify({"error": "Gift set already sold"}), 400
 
         # Оновлення назви, опису та ціни
         name = data.get('name')
@@ -137,6 +171,7 @@ def update_gift_set(gift_set_id):
             existing_gift_set = db_session.query(GiftSet).filter(GiftSet.name == name,
                                                                  GiftSet.id != gift_set_id).first()
             if existing_gift_set:
+                db_session.rollback()
                 return jsonify({"error": f"Gift set with name '{name}' already exists"}), 400
             gift_set.name = name
 
@@ -149,74 +184,22 @@ def update_gift_set(gift_set_id):
         # Оновлюємо склад набору: продукти та пакування
         new_items = data.get('items', [])  # Список нових елементів: {item_id, quantity, price}
 
-        total_price = 0
-        # Очищуємо попередні записи, але перед цим повертаємо зарезервовані кількості
-        for item in gift_set.gift_set_products:
-            existing_product = db_session.query(Product).filter(Product.id == item.product_id).one_or_none()
-            if existing_product:
-                existing_product.available_quantity += item.quantity
-                existing_product.reserved_quantity -= item.quantity
-            db_session.delete(item)
-
-        for item in gift_set.gift_set_packagings:
-            existing_packaging = db_session.query(PackagingMaterial).filter(
-                PackagingMaterial.id == item.packaging_id).one_or_none()
-            if existing_packaging:
-                existing_packaging.available_quantity += item.quantity
-                existing_packaging.reserved_quantity -= item.quantity
-            db_session.delete(item)
-
-        db_session.commit()  # Фіксуємо видалення старих записів перед додаванням нових
-
-        # Додаємо нові елементи до набору
-        for item in new_items:
-            item_id = item.get('product_id') or item.get('packaging_id')
-            quantity = item.get('quantity', 1)
-            price = float(item.get('price', 0))
-            item_type = item.get('type', 'product')
-
-            # Додаємо продукти
-            if item_type == "product" and item_id:
-                product = db_session.query(Product).filter(Product.id == item_id).one_or_none()
-                if not product:
-                    return jsonify({"error": f"Product {item_id} not found"}), 400
-                if product.available_quantity < quantity:
-                    return jsonify({"error": f"Product {item_id} not available in required quantity"}), 400
-                product.available_quantity -= quantity
-                product.reserved_quantity += quantity
-                total_price += price * quantity
-
-                gift_set_product = GiftSetProduct(
-                    gift_set_id=gift_set.id,
-                    product_id=product.id,
-                    quantity=quantity
-                )
-                db_session.add(gift_set_product)
-
-            # Додаємо пакування
-            elif item_type == "packaging" and item_id:
-                packaging = db_session.query(PackagingMaterial).filter(PackagingMaterial.id == item_id).one_or_none()
-                if not packaging:
-                    return jsonify({"error": f"Packaging {item_id} not found"}), 400
-                if packaging.available_quantity < quantity:
-                    return jsonify({"error": f"Packaging {item_id} not available in required quantity"}), 400
-                packaging.available_quantity -= quantity
-                packaging.reserved_quantity += quantity
-                total_price += float(packaging.purchase_price_per_unit) * quantity
-
-                gift_set_packaging = GiftSetPackaging(
-                    gift_set_id=gift_set.id,
-                    packaging_id=packaging.id,
-                    quantity=quantity
-                )
-                db_session.add(gift_set_packaging)
+        # Повертаємо зарезервовані кількості і резервуємо новий склад в одній транзакції
+        release_gift_set_items(db_session, gift_set)
 
-        # Оновлюємо загальну ціну набору
-        gift_set.total_price = total_price
+        gift_set.total_price = reserve_gift_set_items(db_session, gift_set, [
+            (item.get('type', 'product'), item.get('product_id') or item.get('packaging_id'), item.get('quantity', 1),
+             float(item.get('price', 0)))
+            for item in new_items
+            if item.get('product_id') or item.get('packaging_id')
+        ])
         db_session.commit()
 
         return jsonify({"message": "Gift set updated successfully", "id": gift_set.id}), 200
 
+    except (StockItemNotFoundError, InsufficientStockError) as e:
+        db_session.rollback()
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         db_session.rollback()
         return jsonify({"error": str(e)}), 500
@@ -227,39 +210,30 @@ def dismantle_gift_set(gift_set_id):
     # Знаходимо подарунковий набір
     from postgreSQLConnect import db_session
 
-    gift_set = db_session.query(GiftSet).get(gift_set_id)
+    gift_set = db_session.query(GiftSet).filter(GiftSet.id == gift_set_id).with_for_update().one_or_none()
     if not gift_set:
         return jsonify({"error": "Gift set not found"}), 404
 
-    # Повертаємо кількість товарів та пакувань на склад
-    gift_set_products = db_session.query(GiftSetProduct).filter_by(gift_set_id=gift_set.id).all()
-    for item in gift_set_products:
-        product = db_session.query(Product).get(item.product_id)
-        if product:
-            product.available_quantity += item.quantity
-            product.reserved_quantity -= item.quantity
-        db_session.delete(item)  # Видаляємо запис про товари в наборі
-
-    gift_set_packagings = db_session.query(GiftSetPackaging).filter_by(gift_set_id=gift_set.id).all()
-    for item in gift_set_packagings:
-        packaging = db_session.query(PackagingMaterial).get(item.packaging_id)
-        if packaging:
-            packaging.available_quantity += item.quantity
-            packaging.reserved_quantity -= item.quantity
-        db_session.delete(item)  # Видаляємо запис про пакування в наборі
-
-        db_session.commit()
-
-    # Видаляємо історію продажів для цього подарункового набору
-    gift_set_sales_history = db_session.query(GiftSetSalesHistory).filter_by(gift_set_id=gift_set.id).all()
-    for record in gift_set_sales_history:
-        db_session.delete(record)
-
+    try:
+        # Спершу історія продажів: її рядки посилаються на позиції набору, які видаляються нижче
+        delete_gift_set_sales_history(db_session, gift_set.id)
+
+        # Повертаємо кількість товарів та пакувань на склад (у проданого набору резерву вже немає)
+        if gift_set.is_sold:
+            for item in gift_set.gift_set_products + gift_set.gift_set_packagings:
+                db_session.delete(item)
+        else:
+            release_gift_set_items(db_session, gift_set)
+
+        # Видаляємо сам подарунковий набір
+        db_session.delete(gift_set)
         db_session.commit()
-
-    # Видаляємо сам подарунковий набір
-    db_session.delete(gift_set)
-    db_session.commit()
+    except (StockItemNotFoundError, InsufficientStockError) as e:
+        db_session.rollback()
+        return jsonify({"error": str(e)}), 400
+    except SQLAlchemyError as e:
+        db_session.rollback()
+        return jsonify({"error": "Database error", "details": str(e)}), 500
 
     return jsonify({"message": "Gift set and all related data dismantled successfully"}), 200
 
@@ -268,67 +242,76 @@ def dismantle_gift_set(gift_set_id):
 def sell_gift_set(gift_set_id):
     from postgreSQLConnect import db_session
 
-    gift_set = db_session.query(GiftSet).get(gift_set_id)
+    # Тіло перевіряємо до блокування набору
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({"error": "Invalid data"}), 400
+    missing = [field for field in ('customer_id', 'selling_price') if data.get(field) is None]
+    if missing:
+        return jsonify({"error": f"Missing required fields: {', '.join(missing)}"}), 400
+    if not isinstance(data['customer_id'], int):
+        return jsonify({"error": "customer_id must be an integer"}), 400
+    try:
+        float(data['selling_price'])
+    except (TypeError, ValueError):
+        return jsonify({"error": "selling_price must be a number"}), 400
+
+    # Блокуємо набір, щоб його не продали двічі паралельними запитами
+    gift_set = db_session.query(GiftSet).filter(GiftSet.id == gift_set_id).with_for_update().one_or_none()
 
     if not gift_set:
         return jsonify({"error": "Gift set not found"}), 404
+    if gift_set.is_sold:
+        db_session.rollback()
+        return jsonify({"error": "Gift set already sold"}), 400
 
-    data = request.json
-
-    customer = db_session.query(Customer).filter(Customer.id == data['customer_id']).one()
-
-    # Створення запису в історії продажів
-    sales_record = GiftSetSalesHistory(
-        gift_set_id=gift_set.id,
-        sold_price=data['selling_price'],
-        quantity=1,  # Ми продаємо один набір (можна додати можливість продавати більше)
-        customer_id=customer.id,
-    )
-    db_session.add(sales_record)
-
-    # Зміна кількості зарезервованих і проданих товарів та пакувань
-    for gift_set_product in gift_set.gift_set_products:
-        product = gift_set_product.product
-        # Перевіряємо чи об'єкт прив'язаний до поточної сесії
-        if not db_session.is_modified(product, False):
-            # Зливаємо об'єкт із поточною сесією
-            product = db_session.merge(product)
-        # Перевірка чи об'єкт прив'язаний до іншої сесії
-        product.reserved_quantity -= gift_set_product.quantity  # Зменшуємо кількість зарезервовану
-        product.sold_quantity += gift_set_product.quantity  # Збільшуємо кількість продану
-        # product.available_quantity -= gift_set_product.quantity  # Зменшуємо кількість в наявності
-
-        # Додаємо запис про цей товар у історію продажів через зворотний зв'язок
-        sales_product = GiftSetSalesHistoryProduct(
-            gift_set_product=gift_set_product,
-            quantity=gift_set_product.quantity
-        )
+    customer = db_session.query(Customer).filter(Customer.id == data['customer_id']).one_or_none()
+    if not customer:
+        db_session.rollback()
+        return jsonify({"error": "Customer not found"}), 404
 
-        # Додаємо цей товар до списку sales_history_products
-        sales_record.sales_history_products.append(sales_product)
-
-    db_session.commit()
-
-    # Записуємо історію продажів пакувань
-    for gift_set_packaging in gift_set.gift_set_packagings:
-        packaging = gift_set_packaging.packaging
-        packaging.reserved_quantity -= gift_set_packaging.quantity  # Зменшуємо кількість зарезервовану
-        # Перевіряємо, чи є значення в полях і, якщо вони None, ініціалізуємо їх.
-        if packaging.sold_quantity is None:
-            packaging.sold_quantity = 0  # Якщо sold_quantity дорівнює None, ініціалізуємо його як 0
-        packaging.sold_quantity += gift_set_packaging.quantity  # Збільшуємо кількість продану
-        packaging.available_quantity -= gift_set_packaging.quantity  # Зменшуємо кількість в наявності
-
-        # Додаємо запис про це пакування в історію продажів
-        sales_packaging = GiftSetSalesHistoryPackaging(
-            gift_set_packaging=gift_set_packaging,
-            quantity=gift_set_packaging.quantity
+    try:
+        # Створення запису в історії продажів
+        sales_record = GiftSetSalesHistory(
+            gift_set_id=gift_set.id,
+            sold_price=data['selling_price'],
+            quantity=1,  # Ми продаємо один набір (можна додати можливість продавати більше)
+            customer_id=customer.id,
         )
-        sales_record.sales_history_packagings.append(sales_packaging)
+        db_session.add(sales_record)
+
+        # Зарезервовані товари та пакування переходять у продані; в наявності їх уже немає з моменту резерву
+        items = [("product", item.product_id, item) for item in gift_set.gift_set_products] + \
+                [("packaging", item.packaging_id, item) for item in gift_set.gift_set_packagings]
+        for item_type, item_id, item in lock_order(items):
+            if item_type == "product":
+                change_product_stock(
+                    db_session, item_id, CHANGE_GIFT_SET_SALE,
+                    reserved=-item.quantity, sold=item.quantity, change_amount=-item.quantity
+                )
+                sales_record.sales_history_products.append(GiftSetSalesHistoryProduct(
+                    gift_set_product=item,
+                    quantity=item.quantity
+                ))
+            else:
+                change_packaging_stock(
+                    db_session, item_id, CHANGE_GIFT_SET_SALE,
+                    reserved=-item.quantity, sold=item.quantity, change_amount=-item.quantity
+                )
+                sales_record.sales_history_packagings.append(GiftSetSalesHistoryPackaging(
+                    gift_set_packaging=item,
+                    quantity=item.quantity
+                ))
 
-    # Записуємо зміни в базу даних
-    gift_set.is_sold = True
-    db_session.commit()
+        # Записуємо зміни в базу даних
+        gift_set.is_sold = True
+        db_session.commit()
+    except (StockItemNotFoundError, InsufficientStockError) as e:
+        db_session.rollback()
+        return jsonify({"error": str(e)}), 400
+    except SQLAlchemyError as e:
+        db_session.rollback()
+        return jsonify({"error": "Database error", "details": str(e)}), 500
 
     return jsonify({
         "message": "Gift set sold successfully",
@@ -337,6 +320,7 @@ def sell_gift_set(gift_set_id):
 
 
 @gift_box_services_bp.route('/get_all_gift_sets', methods=['GET'])
+@conditional_get(GiftSet, GiftSetProduct, GiftSetPackaging, Product, PackagingMaterial)
 def get_gift_sets():
     # Отримуємо параметри для фільтрації (за потреби)
     name_filter = request.args.get('name', '').lower()
@@ -344,21 +328,23 @@ def get_gift_sets():
     max_price = request.args.get('max_price', type=float, default=float('inf'))
     from postgreSQLConnect import db_session
 
-    # Пошук наборів подарунків за заданими фільтрами
-    gift_sets_query = db_session.query(GiftSet).filter(
+    try:
+        fields = parse_fields(request.args.get('fields'), GIFT_SET_FIELDS)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    # Фільтри пошуку наборів подарунків
+    filters = [
         GiftSet.total_price >= min_price,
         GiftSet.total_price <= max_price,
-        GiftSet.is_sold == False  # ��ише не продані набори подарунків
-    )
+        GiftSet.is_sold == False  # Лише не продані набори подарунків
+    ]
 
     if name_filter:
-        gift_sets_query = gift_sets_query.filter(GiftSet.name.ilike(f'%{name_filter}%'))
-
-    # Отримуємо всі набори
-    gift_sets = gift_sets_query.all()
+        filters.append(GiftSet.name.ilike(f'%{name_filter}%'))
 
-    # Перетворюємо кожен gift_set на словник для відповіді
-    gift_sets_data = [gift_set.to_dict() for gift_set in gift_sets]
+    # Набори разом зі складом (якщо його не відкинуто через fields)
+    gift_sets_data = list_gift_sets(db_session, filters, fields)
 
     return jsonify(gift_sets_data), 200
 
@@ -395,7 +381,7 @@ def get_gift_set_sales_history():
         sale_data = {
             "id": sale.id,
             "gift_set_id": sale.gift_set_id,
-            "sold_at": sale.sold_at.isoformat(),
+            "sold_at": sale.sold_at,
             "sold_price": sale.sold_price,
             "quantity": sale.quantity,
             "customer_name": sale.customer_name,
@@ -0,0 +1,141 @@
+from datetime import datetime
+
+from sqlalchemy import update, case, func, exists
+
+from models import Product, PackagingMaterial, StockHistory, PackagingStockHistory
+
+# Типи змін у stock_history / packaging_stock_history
+CHANGE_PURCHASE = 'purchase'
+CHANGE_SALE = 'sale'
+CHANGE_USED = 'used'
+CHANGE_GIFT_SET_RESERVE = 'gift_set_reserve'
+CHANGE_GIFT_SET_RELEASE = 'gift_set_release'
+CHANGE_GIFT_SET_SALE = 'gift_set_sale'
+
+
+class StockItemNotFoundError(Exception):
+    """Товар або пакування не знайдено."""
+
+    def __init__(self, item_type, item_id):
+        self.item_type = item_type
+        self.item_id = item_id
+        super().__init__(f"{item_type.capitalize()} {item_id} not found")
+
+
+class InsufficientStockError(Exception):
+    """Зміна залишку зробила б available_quantity або reserved_quantity від'ємним."""
+
+    def __init__(self, item_type, item_id):
+        self.item_type = item_type
+        self.item_id = item_id
+        super().__init__(f"{item_type.capitalize()} {item_id} not available in required quantity")
+
+
+def _apply_stock_change(db_session, model, item_id, item_type, available, reserved, sold, total, values):
+    """
+    Один умовний UPDATE ... WHERE залишок не стане від'ємним ... RETURNING.
+
+    Рядок блокується до кінця транзакції, тож паралельні зміни того ж товару чекають одна на одну
+    і перевіряють умову вже по оновленому значенню — перепродаж неможливий.
+    """
+    new_available = model.available_quantity + available
+    new_reserved = model.reserved_quantity + reserved
+    stmt = (
+        update(model)
+            .where(model.id == item_id, new_available >= 0, new_reserved >= 0)
+            .values(
+                available_quantity=new_available,
+                reserved_quantity=new_reserved,
+                sold_quantity=func.coalesce(model.sold_quantity, 0) + sold,
+                total_quantity=model.total_quantity + total,
+                **values
+            )
+            .returning(model)
+            .execution_options(synchronize_session='fetch')
+    )
+    item = db_session.execute(stmt).scalar_one_or_none()
+    if item is None:
+        if not db_session.query(exists().where(model.id == item_id)).scalar():
+            raise StockItemNotFoundError(item_type, item_id)
+        raise InsufficientStockError(item_type, item_id)
+    return item
+
+
+def change_product_stock(db_session, product_id, change_type, available=0, reserved=0, sold=0, total=0,
+                         change_amount=None, timestamp=None, **values):
+    """
+    Атомарно змінює залишки товару та пише запис у stock_history.
+
+    Не комітить: зміну фіксує (або відкочує) обробник разом з рештою операції.
+
+    :param available: Зміна available_quantity.
+    :param reserved: Зміна reserved_quantity.
+    :param sold: Зміна sold_quantity.
+    :param total: Зміна total_quantity.
+    :param change_amount: Що записати в історію (за замовчуванням — зміна available_quantity).
+    :param values: Додаткові колонки для того ж UPDATE (ціни, постачальник тощо).
+    :return: Оновлений Product.
+    """
+    product = _apply_stock_change(db_session, Product, product_id, 'product', available, reserved, sold, total, values)
+    db_session.add(StockHistory(
+        product_id=product_id,
+        change_amount=available if change_amount is None else change_amount,
+        change_type=change_type,
+        timestamp=timestamp or datetime.now()
+    ))
+    return product
+
+
+def change_packaging_stock(db_session, material_id, change_type, available=0, reserved=0, sold=0, total=0,
+                           change_amount=None, timestamp=None, **values):
+    """
+    Те саме, що change_product_stock, для пакування (історія — packaging_stock_history).
+
+    Статус 'used'/'available' оновлюється разом із залишком.
+    """
+    if available:
+        new_available = PackagingMaterial.available_quantity + available
+        values.setdefault('status', case(
+            (new_available <= 0, 'used'),
+            (PackagingMaterial.status == 'used', 'available'),
+            else_=PackagingMaterial.status
+        ))
+    material = _apply_stock_change(db_session, PackagingMaterial, material_id, 'packaging', available, reserved, sold,
+                                   total, values)
+    db_session.add(PackagingStockHistory(
+        material_id=material_id,
+        change_amount=available if change_amount is None else change_amount,
+        change_type=change_type,
+        timestamp=timestamp or datetime.now()
+    ))
+    return material
+
+
+def lock_order(items):
+    """
+    Сортує позиції (item_type, item_id, ...) так, щоб рядки блокувались в одному порядку.
+
+    Інакше два запити з тими самими товарами в різному порядку можуть заблокувати один одного.
+    """
+    return sorted(items, key=lambda item: (item[0], item[1]))
+
+
+def lock_rows(db_session, model, ids, *options):
+    """
+    SELECT ... FOR UPDATE рядків model з ids у порядку id.
+
+    Повертає {id: об'єкт} зі свіжими значеннями (populate_existing); поки транзакцію не завершено,
+    ці рядки можна змінювати в Python без ризику перепродажу.
+    """
+    if not ids:
+        return {}
+    rows = (
+        db_session.query(model)
+            .options(*options)
+            .filter(model.id.in_(ids))
+            .order_by(model.id)
+            .with_for_update(of=model)
+            .populate_existing()
+            .all()
+    )
+    return {row.id: row for row in rows}
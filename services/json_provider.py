@@ -0,0 +1,76 @@
+"""
+JSON-провайдер застосунку на orjson.
+
+Decimal віддається числом, date/datetime — рядком ISO 8601, тож to_dict() і сервіси можуть
+класти значення з бази у відповідь як є. Той самий провайдер обслуговує jsonify, NDJSON-стріми
+і відповіді flask-restx (див. output_json).
+
+Якщо orjson не встановлено, працює стандартний json з тими самими правилами — лише повільніше.
+"""
+import datetime
+import decimal
+import json
+
+from flask import current_app
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _default(o):
+    """Типи, яких кодувальник не знає сам."""
+    if isinstance(o, decimal.Decimal):
+        return float(o)
+    if isinstance(o, (datetime.date, datetime.time)):  # Сюди доходить лише стандартний json
+        return o.isoformat()
+    return DefaultJSONProvider.default(o)
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """
+    DefaultJSONProvider з orjson замість json.
+
+    sort_keys і compact поводяться як у Flask; ensure_ascii з orjson не діє — вихід завжди UTF-8.
+    """
+
+    def _options(self, indent=False):
+        option = orjson.OPT_NON_STR_KEYS  # Як json.dumps: ключі-числа стають рядками
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return option
+
+    def dumps(self, obj, **kwargs):
+        if orjson is None or kwargs:
+            kwargs.setdefault('default', _default)
+            kwargs.setdefault('ensure_ascii', self.ensure_ascii)
+            kwargs.setdefault('sort_keys', self.sort_keys)
+            return json.dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=_default, option=self._options()).decode()
+
+    def loads(self, s, **kwargs):
+        if orjson is None or kwargs:
+            return json.loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        if orjson is None:
+            return super().response(*args, **kwargs)
+
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = self.compact is False or (self.compact is None and self._app.debug)
+        # Байти одразу в тіло відповіді, без проміжного str
+        body = orjson.dumps(obj, default=_default, option=self._options(indent)) + b'\n'
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+
+def output_json(data, code, headers=None):
+    """Представлення application/json для flask-restx через провайдер застосунку (замість json.dumps)."""
+    response = current_app.json.response(data)
+    response.status_code = code
+    response.headers.extend(headers or {})
+    return response
@@ -0,0 +1,191 @@
+"""
+Метрики запитів у форматі Prometheus (/metrics).
+
+Для кожного запиту записуються тривалість, статус, кількість SQL-запитів і сумарний час у базі.
+Мітки — метод, шаблон маршруту (/api/product/<int:product_id>, не конкретний URL) і blueprint;
+для ресурсів flask-restx і маршрутів з app.py, які не належать blueprint, замість нього береться
+модуль обробника (api.products_api, app).
+
+Тривалість потокових відповідей (NDJSON, CSV-експорт) рахується до кінця потоку: teardown_request
+для них викликається, коли stream_with_context закінчує генератор.
+
+Лічильники живуть у пам'яті процесу: кожен воркер gunicorn віддає свої, Prometheus збирає їх окремо.
+SQL-запити поза запитом Flask (скрипти імпорту, фонові задачі експорту) не враховуються.
+"""
+import threading
+import time
+from bisect import bisect_left
+
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+
+from postgreSQLConnect import engine
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Межі кошиків гістограм
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250, 500, 1000)
+
+REQUEST_LABELS = ('method', 'route', 'blueprint')
+
+
+def _escape(value):
+    return str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [*zip(names, values), *extra]
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Лічильник з мітками; значення лише зростає."""
+
+    type_name = 'counter'
+
+    def __init__(self, name, documentation, labelnames):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values = {}  # значення міток -> лічильник
+        self._lock = threading.Lock()
+
+    def inc(self, labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+        for labels, value in sorted(values.items()):
+            yield self.name, _format_labels(self.labelnames, labels), value
+
+
+class Histogram:
+    """Гістограма з мітками: кошики le, сума та кількість спостережень, як у prometheus_client."""
+
+    type_name = 'histogram'
+
+    def __init__(self, name, documentation, labelnames, buckets):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+        self._values = {}  # значення міток -> [кількості по кошиках (+Inf останній), сума]
+        self._lock = threading.Lock()
+
+    def observe(self, labels, value):
+        index = bisect_left(self.buckets, value)  # Перший кошик, де value <= le
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                entry = self._values[labels] = [[0] * (len(self.buckets) + 1), 0]
+            entry[0][index] += 1
+            entry[1] += value
+
+    def samples(self):
+        with self._lock:
+            values = {labels: (list(counts), total) for labels, (counts, total) in self._values.items()}
+        for labels, (counts, total) in sorted(values.items()):
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float('inf')), counts):
+                cumulative += count
+                yield (f'{self.name}_bucket',
+                       _format_labels(self.labelnames, labels, [('le', _format_value(bound))]), cumulative)
+            yield f'{self.name}_sum', _format_labels(self.labelnames, labels), total
+            yield f'{self.name}_count', _format_labels(self.labelnames, labels), cumulative
+
+
+REQUESTS_TOTAL = Counter(
+    'crm_http_requests_total', 'HTTP requests by route and status code.', (*REQUEST_LABELS, 'status')
+)
+REQUEST_DURATION = Histogram(
+    'crm_http_request_duration_seconds', 'Time from the start of the request to the end of the response body.',
+    REQUEST_LABELS, LATENCY_BUCKETS
+)
+REQUEST_DB_QUERIES = Histogram(
+    'crm_http_request_db_queries', 'SQL statements executed per request.', REQUEST_LABELS, QUERY_COUNT_BUCKETS
+)
+REQUEST_DB_DURATION = Histogram(
+    'crm_http_request_db_duration_seconds', 'Time spent in SQL statements per request.',
+    REQUEST_LABELS, LATENCY_BUCKETS
+)
+
+METRICS = [REQUESTS_TOTAL, REQUEST_DURATION, REQUEST_DB_QUERIES, REQUEST_DB_DURATION]
+
+
+def render_metrics():
+    """Усі метрики в текстовому форматі Prometheus."""
+    lines = []
+    for metric in METRICS:
+        lines.append(f'# HELP {metric.name} {metric.documentation}')
+        lines.append(f'# TYPE {metric.name} {metric.type_name}')
+        lines.extend(f'{name}{labels} {_format_value(value)}' for name, labels, value in metric.samples())
+    return '\n'.join(lines) + '\n'
+
+
+@event.listens_for(engine, 'before_cursor_execute')
+def _start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context() and 'metrics_started' in g:
+        g.metrics_db_queries += 1
+        if context is not None:
+            context.metrics_query_started = time.perf_counter()
+
+
+@event.listens_for(engine, 'after_cursor_execute')
+def _stop_query_timer(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, 'metrics_query_started', None)
+    if started is not None and has_request_context() and 'metrics_started' in g:
+        g.metrics_db_seconds += time.perf_counter() - started
+
+
+def _request_labels():
+    rule = request.url_rule
+    if rule is None:
+        return request.method, '<unmatched>', ''
+    blueprint = request.blueprint
+    if blueprint is None:
+        view = current_app.view_functions.get(request.endpoint)
+        blueprint = getattr(view, '__module__', '')
+    return request.method, rule.rule, blueprint
+
+
+def start_request_metrics():
+    g.metrics_started = time.perf_counter()
+    g.metrics_db_queries = 0
+    g.metrics_db_seconds = 0.0
+
+
+def record_response_status(response):
+    g.metrics_status = response.status_code
+    return response
+
+
+def observe_request(exception=None):
+    """teardown_request: записує метрики запиту (для потокових відповідей — після останнього фрагмента)."""
+    started = g.pop('metrics_started', None)
+    if started is None:
+        return
+    labels = _request_labels()
+    status = 500 if exception is not None else g.get('metrics_status', 500)
+
+    REQUESTS_TOTAL.inc((*labels, str(status)))
+    REQUEST_DURATION.observe(labels, time.perf_counter() - started)
+    REQUEST_DB_QUERIES.observe(labels, g.metrics_db_queries)
+    REQUEST_DB_DURATION.observe(labels, g.metrics_db_seconds)
+
+
+def init_app(app):
+    """Підключає збір метрик до застосунку (маршрут /metrics реєструється окремо)."""
+    app.before_request(start_request_metrics)
+    app.after_request(record_response_status)
+    app.teardown_request(observe_request)
@@ -0,0 +1,315 @@
+from collections import defaultdict
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+from flask import Blueprint, request, jsonify
+from sqlalchemy import insert
+from sqlalchemy.orm import selectinload
+
+from models import Product, PackagingMaterial, Customer, SaleHistory, PackagingSaleHistory, StockHistory, \
+    PackagingStockHistory, GiftSet, GiftSetSalesHistory, GiftSetSalesHistoryProduct, GiftSetSalesHistoryPackaging
+from services.inventory_service import lock_rows, CHANGE_SALE, CHANGE_GIFT_SET_SALE
+from services.rollup_service import collect_row_deltas, apply_rollup_deltas
+
+order_bp = Blueprint('orders', __name__)
+
+
+def _positive_decimal(value):
+    try:
+        number = Decimal(str(value))
+    except (InvalidOperation, TypeError, ValueError):
+        return None
+    return number if number > 0 else None
+
+
+def _non_negative_decimal(value):
+    try:
+        number = Decimal(str(value))
+    except (InvalidOperation, TypeError, ValueError):
+        return None
+    return number if number >= 0 else None
+
+
+def parse_order(data):
+    """
+    Перевіряє замовлення цілком до будь-яких змін у базі.
+
+    :return: (order, errors) — нормалізовані рядки замовлення або словник помилок за шляхом поля.
+    """
+    errors = {}
+    if not isinstance(data, dict):
+        return None, {'order': 'Invalid data'}
+
+    products = data.get('products') or []
+    packagings = data.get('packaging') or []
+    gift_sets = data.get('gift_sets') or []
+
+    if 'customer_id' not in data:
+        errors['customer_id'] = 'Missing field: customer_id'
+    if not (products or packagings or gift_sets):
+        errors['order'] = 'Order must contain at least one product, packaging or gift set line'
+
+    sale_date = datetime.now()
+    if data.get('sale_date'):
+        try:
+            sale_date = datetime.strptime(data['sale_date'], '%Y-%m-%d')
+        except (TypeError, ValueError):
+            errors['sale_date'] = 'Date must be in YYYY-MM-DD format.'
+
+    product_lines = []
+    for i, line in enumerate(products):
+        prefix = f'products[{i}]'
+        quantity = line.get('quantity')
+        price = _positive_decimal(line.get('selling_price_per_item'))
+        if not isinstance(line.get('product_id'), int):
+            errors[f'{prefix}.product_id'] = 'Product ID is required.'
+        if not isinstance(quantity, int) or quantity <= 0:
+            errors[f'{prefix}.quantity'] = 'Quantity must be greater than 0.'
+        if price is None:
+            errors[f'{prefix}.selling_price_per_item'] = 'Selling price must be greater than 0.'
+        total = line.get('selling_total_price')
+        total = _positive_decimal(total) if total is not None else (price * quantity if price and isinstance(quantity, int) else None)
+        if total is None:
+            errors[f'{prefix}.selling_total_price'] = 'Total price must be greater than 0.'
+
+        packaging_id = line.get('packaging_id') or None
+        packaging_quantity = line.get('packaging_quantity', 0) or 0
+        packaging_cost = _non_negative_decimal(line.get('total_packaging_cost', 0) or 0)
+        if packaging_id is not None:
+            if not isinstance(packaging_id, int):
+                errors[f'{prefix}.packaging_id'] = 'Packaging ID must be an integer.'
+            if not isinstance(packaging_quantity, (int, float)) or packaging_quantity <= 0:
+                errors[f'{prefix}.packaging_quantity'] = 'Packaging quantity must be greater than 0.'
+        if packaging_cost is None:
+            errors[f'{prefix}.total_packaging_cost'] = 'Packaging cost must not be negative.'
+
+        product_lines.append({
+            'product_id': line.get('product_id'),
+            'quantity': quantity,
+            'selling_price_per_item': price,
+            'selling_total_price': total,
+            'packaging_id': packaging_id,
+            'packaging_quantity': packaging_quantity if packaging_id else 0,
+            'total_packaging_cost': packaging_cost if packaging_id else Decimal(0),
+        })
+
+    packaging_lines = []
+    for i, line in enumerate(packagings):
+        prefix = f'packaging[{i}]'
+        quantity = line.get('quantity')
+        cost = _non_negative_decimal(line.get('total_packaging_cost', 0) or 0)
+        if not isinstance(line.get('packaging_id'), int):
+            errors[f'{prefix}.packaging_id'] = 'Packaging ID is required.'
+        if not isinstance(quantity, (int, float)) or quantity <= 0:
+            errors[f'{prefix}.quantity'] = 'Quantity must be greater than 0.'
+        if cost is None:
+            errors[f'{prefix}.total_packaging_cost'] = 'Packaging cost must not be negative.'
+        packaging_lines.append({'packaging_id': line.get('packaging_id'), 'quantity': quantity, 'total_packaging_cost': cost})
+
+    gift_set_lines = []
+    for i, line in enumerate(gift_sets):
+        prefix = f'gift_sets[{i}]'
+        price = _positive_decimal(line.get('selling_price'))
+        if not isinstance(line.get('gift_set_id'), int):
+            errors[f'{prefix}.gift_set_id'] = 'Gift set ID is required.'
+        if price is None:
+            errors[f'{prefix}.selling_price'] = 'Selling price must be greater than 0.'
+        gift_set_lines.append({'gift_set_id': line.get('gift_set_id'), 'selling_price': price})
+
+    gift_set_ids = [line['gift_set_id'] for line in gift_set_lines]
+    if len(set(gift_set_ids)) != len(gift_set_ids):
+        errors['gift_sets'] = 'Each gift set can be sold only once.'
+
+    order = {
+        'customer_id': data.get('customer_id'),
+        'sale_date': sale_date,
+        'products': product_lines,
+        'packaging': packaging_lines,
+        'gift_sets': gift_set_lines,
+    }
+    return order, errors
+
+
+@order_bp.route('/orders', methods=['POST'])
+def create_order():
+    """
+    Продаж кількох товарів, пакувань і подарункових наборів одному клієнту в одній транзакції.
+
+    Тіло: {customer_id, sale_date?, products: [{product_id, quantity, selling_price_per_item,
+    selling_total_price?, packaging_id?, packaging_quantity?, total_packaging_cost?}],
+    packaging: [{packaging_id, quantity, total_packaging_cost?}], gift_sets: [{gift_set_id, selling_price}]}
+    """
+    from postgreSQLConnect import db_session
+
+    order, errors = parse_order(request.get_json(silent=True))
+    if errors:
+        return jsonify({'errors': errors}), 400
+
+    sale_date = order['sale_date']
+    customer = db_session.query(Customer).filter(Customer.id == order['customer_id']).one_or_none()
+    if not customer:
+        return jsonify({'error': 'Customer not found'}), 404
+
+    try:
+        # Блокуємо рядки в сталому порядку: набори, пакування, товари (кожні — за id)
+        gift_sets = lock_rows(db_session, GiftSet, [line['gift_set_id'] for line in order['gift_sets']],
+                              selectinload(GiftSet.gift_set_products), selectinload(GiftSet.gift_set_packagings))
+
+        packaging_ids = {line['packaging_id'] for line in order['products'] if line['packaging_id']}
+        packaging_ids |= {line['packaging_id'] for line in order['packaging']}
+        product_ids = {line['product_id'] for line in order['products']}
+        for gift_set in gift_sets.values():
+            packaging_ids |= {item.packaging_id for item in gift_set.gift_set_packagings}
+            product_ids |= {item.product_id for item in gift_set.gift_set_products}
+
+        packagings = lock_rows(db_session, PackagingMaterial, sorted(packaging_ids))
+        products = lock_rows(db_session, Product, sorted(product_ids))
+
+        # Перевірки після блокування: усе існує і залишків вистачає на все замовлення
+        not_found = {
+            'gift_sets': sorted({line['gift_set_id'] for line in order['gift_sets']} - gift_sets.keys()),
+            'packaging': sorted(packaging_ids - packagings.keys()),
+            'products': sorted(product_ids - products.keys()),
+        }
+        not_found = {key: ids for key, ids in not_found.items() if ids}
+        if not_found:
+            db_session.rollback()
+            return jsonify({'error': 'Some items were not found', 'not_found': not_found}), 404
+
+        product_demand = defaultdict(int)
+        packaging_demand = defaultdict(float)
+        for line in order['products']:
+            product_demand[line['product_id']] += line['quantity']
+            if line['packaging_id']:
+                packaging_demand[line['packaging_id']] += line['packaging_quantity']
+        for line in order['packaging']:
+            packaging_demand[line['packaging_id']] += line['quantity']
+
+        shortages = {}
+        for product_id, quantity in product_demand.items():
+            if products[product_id].available_quantity < quantity:
+                shortages[f'product:{product_id}'] = {'requested': quantity,
+                                                      'available': products[product_id].available_quantity}
+        for packaging_id, quantity in packaging_demand.items():
+            if packagings[packaging_id].available_quantity < quantity:
+                shortages[f'packaging:{packaging_id}'] = {'requested': quantity,
+                                                          'available': packagings[packaging_id].available_quantity}
+        for gift_set_id, gift_set in gift_sets.items():
+            if gift_set.is_sold:
+                shortages[f'gift_set:{gift_set_id}'] = 'Gift set already sold'
+        if shortages:
+            db_session.rollback()
+            return jsonify({'error': 'Not enough stock for the order', 'shortages': shortages}), 400
+
+        # Зміни залишків на заблокованих рядках; flush запише їх executemany-UPDATE на таблицю
+        stock_rows = []
+        packaging_stock_rows = []
+        sale_rows = []
+        for line in order['products']:
+            product = products[line['product_id']]
+            quantity = line['quantity']
+            product.available_quantity -= quantity
+            product.selling_quantity = (product.selling_quantity or 0) + quantity
+            product.sold_quantity = (product.sold_quantity or 0) + quantity
+            product.selling_price_per_item = line['selling_price_per_item']
+            product.selling_total_price = (product.selling_total_price or 0) + line['selling_total_price']
+            stock_rows.append({'product_id': product.id, 'change_amount': -quantity, 'change_type': CHANGE_SALE,
+                               'timestamp': sale_date})
+            sale_rows.append({
+                'product_id': product.id,
+                'customer_id': customer.id,
+                'quantity_sold': quantity,
+                'selling_price_per_item': line['selling_price_per_item'],
+                'selling_total_price': line['selling_total_price'],
+                'sale_date': sale_date,
+                'packaging_material_id': line['packaging_id'],
+                'packaging_quantity': line['packaging_quantity'],
+                'total_packaging_cost': line['total_packaging_cost'],
+                'profit': (line['selling_price_per_item'] - product.purchase_price_per_item) * quantity
+                          - line['total_packaging_cost'],
+            })
+
+        def use_packaging(packaging_id, quantity, cost):
+            packaging = packagings[packaging_id]
+            packaging.available_quantity -= quantity
+            packaging.available_stock_cost -= cost
+            if packaging.available_quantity <= 0:
+                packaging.status = 'used'
+            packaging_stock_rows.append({'material_id': packaging_id, 'change_amount': -quantity,
+                                         'change_type': CHANGE_SALE, 'timestamp': sale_date})
+
+        for line in order['products']:
+            if line['packaging_id']:
+                use_packaging(line['packaging_id'], line['packaging_quantity'], line['total_packaging_cost'])
+        for line in order['packaging']:
+            use_packaging(line['packaging_id'], line['quantity'], line['total_packaging_cost'])
+
+        # Подарункові набори: резерв переходить у продані
+        gift_set_sales = []
+        for line in order['gift_sets']:
+            gift_set = gift_sets[line['gift_set_id']]
+            sales_record = GiftSetSalesHistory(
+                gift_set_id=gift_set.id,
+                sold_price=line['selling_price'],
+                quantity=1,
+                customer_id=customer.id,
+                sold_at=sale_date
+            )
+            for item in gift_set.gift_set_products:
+                product = products[item.product_id]
+                product.reserved_quantity -= item.quantity
+                product.sold_quantity = (product.sold_quantity or 0) + item.quantity
+                stock_rows.append({'product_id': product.id, 'change_amount': -item.quantity,
+                                   'change_type': CHANGE_GIFT_SET_SALE, 'timestamp': sale_date})
+                sales_record.sales_history_products.append(
+                    GiftSetSalesHistoryProduct(gift_set_product=item, quantity=item.quantity))
+            for item in gift_set.gift_set_packagings:
+                packaging = packagings[item.packaging_id]
+                packaging.reserved_quantity -= item.quantity
+                packaging.sold_quantity = (packaging.sold_quantity or 0) + item.quantity
+                packaging_stock_rows.append({'material_id': packaging.id, 'change_amount': -item.quantity,
+                                             'change_type': CHANGE_GIFT_SET_SALE, 'timestamp': sale_date})
+                sales_record.sales_history_packagings.append(
+                    GiftSetSalesHistoryPackaging(gift_set_packaging=item, quantity=item.quantity))
+            gift_set.is_sold = True
+            db_session.add(sales_record)
+            gift_set_sales.append(sales_record)
+        db_session.flush()
+
+        # Масові вставки історії (Core insert -> один INSERT ... VALUES на таблицю); id продажів потрібні для packaging_sale_history
+        sale_ids = []
+        if sale_rows:
+            sale_ids = db_session.execute(
+                insert(SaleHistory.__table__).returning(SaleHistory.id, sort_by_parameter_order=True), sale_rows
+            ).scalars().all()
+            apply_rollup_deltas(db_session, collect_row_deltas(SaleHistory, sale_rows))
+
+        packaging_sale_rows = [
+            {'sale_id': sale_id, 'packaging_material_id': line['packaging_id'],
+             'packaging_quantity': line['packaging_quantity'], 'total_packaging_cost': line['total_packaging_cost'],
+             'sale_date': sale_date}
+            for sale_id, line in zip(sale_ids, order['products'])
+            if line['packaging_id']
+        ]
+        packaging_sale_rows += [
+            {'sale_id': None, 'packaging_material_id': line['packaging_id'], 'packaging_quantity': line['quantity'],
+             'total_packaging_cost': line['total_packaging_cost'], 'sale_date': sale_date}
+            for line in order['packaging']
+        ]
+        if packaging_sale_rows:
+            db_session.execute(insert(PackagingSaleHistory.__table__), packaging_sale_rows)
+        if stock_rows:
+            db_session.execute(insert(StockHistory.__table__), stock_rows)
+        if packaging_stock_rows:
+            db_session.execute(insert(PackagingStockHistory.__table__), packaging_stock_rows)
+
+        db_session.commit()
+    except Exception as e:
+        db_session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+    return jsonify({
+        'message': 'Order recorded successfully',
+        'sale_ids': sale_ids,
+        'gift_set_sale_ids': [record.id for record in gift_set_sales]
+    }), 201
@@ -4,6 +4,7 @@ from sqlalchemy.exc import SQLAlchemyError
 
 from api.investment_api import investments_ns, investment_model
 from models import OtherInvestment
+from services.serializers import iter_investments
 from datetime import datetime
 
 
@@ -44,15 +45,7 @@ class InvestmentList(Resource):
     def get(self):
         from postgreSQLConnect import db_session
 
-        investments = db_session.query(OtherInvestment).all()
-
-        return [{
-            "id": inv.id,
-            "type_name": inv.type_name,
-            "cost": float(inv.cost),
-            "supplier": inv.supplier,
-            "date": inv.date.strftime('%Y-%m-%d')
-        } for inv in investments], 200
+        return list(iter_investments(db_session)), 200
 
 # Видалити вкладення
 @investments_bp.route('/delete_investments/<int:investments_id>', methods=['DELETE'])
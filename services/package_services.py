@@ -2,12 +2,18 @@ from decimal import Decimal
 
 from flask import Blueprint, request
 from flask_restx import Resource
+from sqlalchemy import func
 from sqlalchemy.exc import SQLAlchemyError, IntegrityError
 from flask import jsonify
 
 from api.packaging_routes import packaging_ns
+from services.cache import reference_cache, PACKAGING_SUPPLIERS_KEY, SUPPLIERS_LIST_KEY
 from models import PackagingMaterial, PackagingPurchaseHistory, PackagingMaterialSupplier, PackagingStockHistory, \
     PackagingSaleHistory
+from services.inventory_service import change_packaging_stock, InsufficientStockError, StockItemNotFoundError, \
+    CHANGE_PURCHASE, CHANGE_USED
+from services.serializers import iter_packaging_materials, parse_fields, PACKAGING_MATERIAL_FIELDS
+from services.table_versions import conditional_get
 
 package_bp = Blueprint('packages', __name__)
 
@@ -19,11 +25,17 @@ class PackagingMaterialList(Resource):
         summary="Отримати всі матеріали пакування",
         description="Повертає список усіх матеріалів пакування"
     )
+    @conditional_get(PackagingMaterial, PackagingMaterialSupplier)
     def get(self):
+        """?fields=id,name,... — лише вказані поля."""
         from postgreSQLConnect import db_session
 
-        materials = db_session.query(PackagingMaterial).all()
-        return [material.to_dict() for material in materials], 200
+        try:
+            fields = parse_fields(request.args.get('fields'), PACKAGING_MATERIAL_FIELDS)
+        except ValueError as e:
+            return {'error': str(e)}, 400
+
+        return list(iter_packaging_materials(db_session, fields=fields)), 200
 
 # @package_bp.route('/packaging_materials/purchase', methods=['POST'])
 # def purchase_packaging_material():
@@ -85,9 +97,10 @@ def get_all_suppliers():
     from postgreSQLConnect import db_session
 
     # Fetch all suppliers
-    suppliers = db_session.query(PackagingMaterialSupplier).all()
-    suppliers_data = [supplier.to_dict() for supplier in suppliers]
-    return jsonify(suppliers_data), 200
+    def load():
+        return [supplier.to_dict() for supplier in db_session.query(PackagingMaterialSupplier).all()]
+
+    return jsonify(reference_cache.get_or_load(PACKAGING_SUPPLIERS_KEY, load)), 200
 
 
 @package_bp.route('/add_new_packaging_suppliers', methods=['POST'])
@@ -103,6 +116,7 @@ def add_supplier():
     new_supplier = PackagingMaterialSupplier(name=name, contact_info=contact_info)
     db_session.add(new_supplier)
     db_session.commit()
+    reference_cache.invalidate(PACKAGING_SUPPLIERS_KEY, SUPPLIERS_LIST_KEY)
     return jsonify(new_supplier.to_dict()), 201
 
 
@@ -120,19 +134,17 @@ def purchase_current_packaging_material():
         return jsonify({'error': 'Required fields are missing'}), 400
 
     try:
-        # Find material by ID
-        material = db_session.query(PackagingMaterial).get(material_id)
-        if not material:
-            return jsonify({'error': 'Packaging material not found'}), 404
-
-        # Update available quantity and total quantity
-        material.available_quantity += quantity
-        material.total_quantity += quantity
-
-        # Update total purchase cost and available stock cost
-        material.total_purchase_cost += total_purchase_cost
-        material.available_stock_cost += total_purchase_cost
-        material.purchase_price_per_unit = purchase_price_per_unit
+        total_purchase_cost = Decimal(str(total_purchase_cost or 0))
+
+        # Update available quantity, total quantity and costs in one statement
+        material = change_packaging_stock(
+            db_session, material_id, CHANGE_PURCHASE,
+            available=quantity,
+            total=quantity,
+            total_purchase_cost=PackagingMaterial.total_purchase_cost + total_purchase_cost,
+            available_stock_cost=PackagingMaterial.available_stock_cost + total_purchase_cost,
+            purchase_price_per_unit=purchase_price_per_unit
+        )
 
         # Create purchase history record
         purchase_total_price = total_purchase_cost
@@ -147,6 +159,9 @@ def purchase_current_packaging_material():
         db_session.commit()
 
         return jsonify({'message': 'Purchase successful', 'material': material.to_dict()}), 200
+    except StockItemNotFoundError:
+        db_session.rollback()
+        return jsonify({'error': 'Packaging material not found'}), 404
     except SQLAlchemyError as e:
         db_session.rollback()
         return jsonify({'error': 'Database error', 'details': str(e)}), 500
@@ -165,28 +180,23 @@ def update_packaging_status():
         return jsonify({'error': 'Required fields are missing'}), 400
 
     try:
-        # Знайти матеріал
-        material = db_session.query(PackagingMaterial).get(material_id)
-        if not material:
-            return jsonify({'error': 'Packaging material not found'}), 404
-
-        # Оновити кількість доступного пакування та відзначити як використане
-        if material.available_quantity < quantity_used:
-            return jsonify({'error': 'Insufficient quantity available'}), 400
-
-        # Віднімаємо використану кількість
-        material.available_quantity -= quantity_used
-        material.available_stock_cost -= Decimal(str(quantity_used)) * (
-                    material.purchase_price_per_unit or Decimal("0"))
-
-        # Встановлюємо статус "used"
-        if material.available_quantity == quantity_used:
-            material.status = 'used'
-
+        # Віднімаємо використану кількість; статус "used" ставиться, коли залишок вичерпано
+        material = change_packaging_stock(
+            db_session, material_id, CHANGE_USED,
+            available=-quantity_used,
+            available_stock_cost=PackagingMaterial.available_stock_cost - quantity_used * func.coalesce(
+                PackagingMaterial.purchase_price_per_unit, 0)
+        )
         db_session.commit()
 
         return jsonify({'message': 'Packaging material marked as used', 'material': material.to_dict()}), 200
 
+    except StockItemNotFoundError:
+        db_session.rollback()
+        return jsonify({'error': 'Packaging material not found'}), 404
+    except InsufficientStockError:
+        db_session.rollback()
+        return jsonify({'error': 'Insufficient quantity available'}), 400
     except SQLAlchemyError as e:
         db_session.rollback()
         return jsonify({'error': 'Database error', 'details': str(e)}), 500
@@ -264,8 +274,8 @@ def get_packaging_supplier_purchase_history_api(supplier_id):
             "material": purchase.material.name if purchase.material else None,
             "quantity_purchased": purchase.quantity_purchased,
             "purchase_date": purchase.purchase_date.strftime('%Y-%m-%d'),
-            "purchase_price_per_unit": float(purchase.purchase_price_per_unit),
-            "purchase_total_price": float(purchase.purchase_total_price)
+            "purchase_price_per_unit": purchase.purchase_price_per_unit,
+            "purchase_total_price": purchase.purchase_total_price
         } for purchase in purchase_history],
         "materials": [
             {"id": material.id, "name": material.name}
@@ -300,6 +310,7 @@ def update_packaging_supplier(supplier_id):
 
     try:
         db_session.commit()
+        reference_cache.invalidate(PACKAGING_SUPPLIERS_KEY, SUPPLIERS_LIST_KEY)
         return jsonify({'message': 'Packaging supplier updated successfully'}), 200
     except IntegrityError as e:
         db_session.rollback()
@@ -323,6 +334,7 @@ def delete_packaging_supplier(supplier_id):
     try:
         db_session.delete(supplier)
         db_session.commit()
+        reference_cache.invalidate(PACKAGING_SUPPLIERS_KEY, SUPPLIERS_LIST_KEY)
         return jsonify({'message': 'Packaging supplier deleted successfully'}), 200
     except Exception as e:
         db_session.rollback()
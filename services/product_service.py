@@ -1,14 +1,21 @@
-from sqlalchemy import insert, delete
+from sqlalchemy import insert, delete, func
 
 from models import Product, product_categories_table, Supplier, PurchaseHistory, StockHistory, Category, SaleHistory, \
     Customer, ReturnHistory, PackagingMaterial, PackagingSaleHistory
 from flask import Blueprint, request
-from sqlalchemy.orm import joinedload
 from sqlalchemy.exc import NoResultFound, SQLAlchemyError
 from flask import jsonify
 from decimal import Decimal
 from datetime import datetime
 
+from services.article_allocator import next_article
+from services.inventory_service import change_product_stock, change_packaging_stock, InsufficientStockError, \
+    StockItemNotFoundError, CHANGE_PURCHASE, CHANGE_SALE
+from services.rollup_service import subtract_product_history, clear_monthly_rollup
+from services.serializers import iter_products
+from services.streaming import STREAM_BATCH_SIZE
+import services.table_versions  # noqa: F401 — лічильники версій таблиць і для скриптів поза Flask
+
 # Створюємо Blueprint для продуктів
 
 product_bp = Blueprint('products', __name__)
@@ -17,13 +24,7 @@ product_bp = Blueprint('products', __name__)
 def generate_article_for_new_prod():
     from postgreSQLConnect import db_session
 
-    last_product = db_session.query(Product).order_by(Product.id.desc()).first()
-    if last_product and last_product.article.startswith("PRD-"):
-        last_number = int(last_product.article.split("-")[1])
-        new_number = last_number + 1
-    else:
-        new_number = 1
-    return f"PRD-{new_number:04d}"
+    return next_article(db_session)
 
 
 class ProductService:
@@ -43,31 +44,18 @@ class ProductService:
             return {'error': 'Product not found'}, 404
 
     @staticmethod
-    def get_all_products():
+    def get_all_products(fields=None):
+        """Отримати всі товари з категоріями (проєкція колонок, без ORM-об'єктів)"""
         from postgreSQLConnect import db_session
 
-        """Отримати всі товари з категоріями"""
-        products = db_session.query(Product).options(joinedload(Product.categories), joinedload(Product.supplier)).all()
-        product_list = []
-        for product in products:
-            product_dict = product.to_dict()  # Assuming you have a method for dict conversion
-            product_dict['purchase_total_price'] = float(product.purchase_total_price)
-            product_dict['purchase_price_per_item'] = float(product.purchase_price_per_item)
-            product_dict['selling_total_price'] = float(product.selling_total_price or 0)
-            product_dict['selling_price_per_item'] = float(product.selling_price_per_item or 0)
-
-            # Отримуємо категорії продукту
-            product_dict['category_ids'] = [category.id for category in product.categories]
-
-            # Додаємо постачальника продукту
-            if product.supplier:
-                product_dict['supplier'] = product.supplier.to_dict()
+        return list(iter_products(db_session, fields=fields)), 200
 
-            else:
-                product_dict['supplier'] = None
+    @staticmethod
+    def iter_all_products(fields=None):
+        """Ті самі товари, що й get_all_products, але порціями з серверного курсора."""
+        from postgreSQLConnect import db_session
 
-            product_list.append(product_dict)
-        return product_list, 200
+        return iter_products(db_session, batch_size=STREAM_BATCH_SIZE, fields=fields)
 
     @staticmethod
     def create_product(data):
@@ -320,6 +308,7 @@ def delete_all_products():
         db_session.execute(delete(StockHistory))
         db_session.execute(delete(PurchaseHistory))
         db_session.execute(delete(Product))
+        clear_monthly_rollup(db_session)
 
         # Коміт транзакції
         db_session.commit()
@@ -347,6 +336,9 @@ def delete_product(product_id):
         # Fetch the product
         product = db_session.query(Product).filter(Product.id == product_id).one()
 
+        # Масове видалення нижче минає flush, тож прибираємо історію товару з monthly_rollup окремо
+        subtract_product_history(db_session, product.id)
+
         # Delete related records
         # Ensure the column name in the filter is correct (e.g., product_id or product_fk)
         db_session.query(product_categories_table).filter(product_categories_table.c.product_id == product.id).delete()
@@ -389,14 +381,7 @@ def get_product_history(product_id):
         sale_history = db_session.query(SaleHistory).filter(SaleHistory.product_id == product.id).all()
 
         # Prepare a list of dictionaries with the required details
-        sale_history_list = [
-            {
-                **record.to_dict(include_customer=True),  # Include customer details in the response
-                'selling_price_per_item': float(record.selling_price_per_item),
-                'selling_total_price': float(record.selling_total_price)
-            }
-            for record in sale_history
-        ]
+        sale_history_list = [record.to_dict(include_customer=True) for record in sale_history]
 
         combined_history = {
             'stock_history': stock_history_list,
@@ -421,8 +406,6 @@ def purchase_product(product_id):
         return jsonify({'errors': errors}), 400
 
     try:
-        product = db_session.query(Product).filter(Product.id == product_id).one()
-
         quantity = data['quantity']
         purchase_price_per_item = Decimal(data['purchase_price_per_item'])
         purchase_total_price = Decimal(data['purchase_total_price'])
@@ -432,26 +415,30 @@ def purchase_product(product_id):
         purchase_date_str = data.get('purchase_date', datetime.now().strftime('%Y-%m-%d'))
         purchase_date = datetime.strptime(purchase_date_str, '%Y-%m-%d').date()
 
+        values = {}
         if supplier_id:
             supplier = db_session.query(Supplier).filter(Supplier.id == supplier_id).one_or_none()
             if supplier is None:
                 return jsonify({'error': 'Supplier not found'}), 404
-            product.supplier = supplier
-
-        product.total_quantity += quantity
-        product.available_quantity += quantity
-        product.selling_total_price += purchase_total_price
-        product.purchase_total_price += purchase_total_price
-        product.purchase_price_per_item = purchase_price_per_item  # Update to new price per item
-
-        db_session.commit()
+            values['supplier_id'] = supplier.id
+
+        # Залишок і ціни оновлюються одним UPDATE, історія — в тій самій транзакції
+        change_product_stock(
+            db_session, product_id, CHANGE_PURCHASE,
+            available=quantity,
+            total=quantity,
+            selling_total_price=func.coalesce(Product.selling_total_price, 0) + purchase_total_price,
+            purchase_total_price=Product.purchase_total_price + purchase_total_price,
+            purchase_price_per_item=purchase_price_per_item,  # Update to new price per item
+            **values
+        )
 
         # Create PurchaseHistory record
         purchase_history = PurchaseHistory(
-            product_id=product.id,
+            product_id=product_id,
             purchase_price_per_item=purchase_price_per_item,
             purchase_total_price=purchase_total_price,
-            supplier_id=supplier.id if supplier else None,
+            supplier_id=values.get('supplier_id'),
             purchase_date=purchase_date,
             quantity_purchase=quantity
         )
@@ -459,9 +446,11 @@ def purchase_product(product_id):
         db_session.commit()
 
         return jsonify({'message': 'Purchase recorded successfully'}), 201
-    except NoResultFound:
+    except StockItemNotFoundError:
+        db_session.rollback()
         return jsonify({'error': 'Product not found'}), 404
     except KeyError as e:
+        db_session.rollback()
         return jsonify({'error': f'Missing field: {str(e)}'}), 400
 
 
@@ -477,8 +466,6 @@ def record_sale(product_id):
         return jsonify({'errors': errors}), 400
 
     try:
-        product = db_session.query(Product).filter(Product.id == product_id).one()
-
         quantity_sold = data['quantity']
         selling_price_per_item = Decimal(data['selling_price_per_item'])
         selling_total_price = Decimal(data['selling_total_price'])
@@ -488,15 +475,9 @@ def record_sale(product_id):
         packaging_material_id = data.get('packaging_id', None)  # Optional packaging material
         packaging_quantity = data.get('packaging_quantity', 0)  # Default to 0 if not provided
 
-        if product.available_quantity < quantity_sold:
-            return jsonify({'error': 'Not enough quantity in stock'}), 400
-
-        product.available_quantity -= quantity_sold
-        product.selling_quantity += quantity_sold
-        product.sold_quantity += quantity_sold
-        product.selling_price_per_item = selling_price_per_item
-        product.selling_total_price += selling_total_price
-        db_session.commit()
+        # Конвертуємо порожній рядок у None
+        if packaging_material_id == "":
+            packaging_material_id = None
 
         customer = db_session.query(Customer).filter(Customer.id == data['customer']).one()
 
@@ -507,20 +488,16 @@ def record_sale(product_id):
         else:
             sale_date = datetime.now()
 
-        if not product.id or not customer.id:
-            return jsonify({'error': 'Missing product or customer information'}), 400
-        if quantity_sold <= 0:
-            return jsonify({'error': 'Quantity sold must be greater than zero'}), 400
-        if selling_price_per_item <= 0:
-            return jsonify({'error': 'Selling price must be greater than zero'}), 400
-
-        # Конвертуємо порожній рядок у None
-        if packaging_material_id == "":
-            packaging_material_id = None
-
-        print(f"packaging_material_id: {packaging_material_id}")
-        if packaging_material_id is None:
-            print("No packaging material provided, setting as None.")
+        # Списання товару: UPDATE ... WHERE available_quantity >= quantity_sold
+        product = change_product_stock(
+            db_session, product_id, CHANGE_SALE,
+            available=-quantity_sold,
+            sold=quantity_sold,
+            timestamp=sale_date,
+            selling_quantity=func.coalesce(Product.selling_quantity, 0) + quantity_sold,
+            selling_price_per_item=selling_price_per_item,
+            selling_total_price=func.coalesce(Product.selling_total_price, 0) + selling_total_price
+        )
 
         # Create SaleHistory entry
         sale_history = SaleHistory(
@@ -536,46 +513,38 @@ def record_sale(product_id):
             packaging_quantity=packaging_quantity,
             total_packaging_cost=total_packaging_cost
         )
-
-        print(f"Sale history object: {sale_history}")
         db_session.add(sale_history)
-        db_session.commit()
 
         # Record packaging material sale if packaging is provided
         if packaging_material_id:
-            packaging_material = db_session.query(PackagingMaterial).filter(
-                PackagingMaterial.id == packaging_material_id).one()
-            if packaging_material:
-
-                # Check if the packaging material exists and has sufficient quantity
-                if packaging_material.available_quantity < packaging_quantity:
-                    return jsonify({'error': 'Not enough packaging material available'}), 400
-
-                packaging_material.available_quantity -= packaging_quantity  # Deduct the packaging material
-                packaging_material.available_stock_cost -= total_packaging_cost
-
-                # Mark the packaging as 'used' if no stock left
-                if packaging_material.available_quantity == 0:
-                    packaging_material.status = 'used'
-
-                db_session.add(packaging_material)
-
-                # Add record to PackagingSaleHistory
-                packaging_sale_history = PackagingSaleHistory(
-                    sale_id=sale_history.id,
-                    packaging_material_id=packaging_material_id,
-                    packaging_quantity=packaging_quantity,
-                    total_packaging_cost=total_packaging_cost,
-                    sale_date=sale_date
-                )
-                db_session.add(packaging_sale_history)
+            change_packaging_stock(
+                db_session, packaging_material_id, CHANGE_SALE,
+                available=-packaging_quantity,
+                timestamp=sale_date,
+                available_stock_cost=PackagingMaterial.available_stock_cost - total_packaging_cost
+            )
 
-                db_session.commit()
+            # Add record to PackagingSaleHistory
+            sale_history.packaging_sale_history.append(PackagingSaleHistory(
+                packaging_material_id=packaging_material_id,
+                packaging_quantity=packaging_quantity,
+                total_packaging_cost=total_packaging_cost,
+                sale_date=sale_date
+            ))
+
+        db_session.commit()
 
         return jsonify({'message': 'Sale recorded successfully'}), 201
-    except NoResultFound:
+    except InsufficientStockError as e:
+        db_session.rollback()
+        if e.item_type == 'packaging':
+            return jsonify({'error': 'Not enough packaging material available'}), 400
+        return jsonify({'error': 'Not enough quantity in stock'}), 400
+    except (NoResultFound, StockItemNotFoundError):
+        db_session.rollback()
         return jsonify({'error': 'Product or Customer not found'}), 404
     except KeyError as e:
+        db_session.rollback()
         return jsonify({'error': f'Missing field: {str(e)}'}), 400
 
 
@@ -654,7 +623,7 @@ def delete_sale_history(product_id, history_id):
     product = history.product
     product.available_quantity += history.quantity_sold
     product.sold_quantity -= history.quantity_sold
-    product.selling_total_price -= history.selling_total_price
+    product.selling_total_price = (product.selling_total_price or 0) - history.selling_total_price
     product.selling_price_per_item = (
         product.selling_total_price / product.sold_quantity
         if product.sold_quantity > 0 else 0
@@ -1,3 +1,4 @@
+import heapq
 from datetime import datetime
 
 from flask import Blueprint
@@ -6,19 +7,17 @@ from sqlalchemy import String
 
 from models import PurchaseHistory, Supplier, Product, Category, product_categories_table, PackagingMaterial, \
     OtherInvestment, PackagingPurchaseHistory, PackagingMaterialSupplier
+from services.streaming import wants_ndjson, ndjson_response, STREAM_BATCH_SIZE
 
 purchase_history_bp = Blueprint('purchase_history', __name__)
 
 
-@purchase_history_bp.route('/get_all_purchase_history', methods=['GET'])
-def get_purchase_history_data():
+def build_purchase_history_queries():
     """
-    Отримує дані про історію закупівель для сторінки.
-    :param session: Поточна сесія бази даних.
-    :return: Список словників із даними про історію закупівель.
-    """
-    from postgreSQLConnect import db_session
+    Запити для трьох джерел історії закупівель: товари, пакування та інші витрати.
 
+    Кожен запит відсортований від новіших дат до старіших.
+    """
     product_purchase_history_query = (
         select(
             PurchaseHistory.id.label('purchase_id'),
@@ -43,6 +42,7 @@ def get_purchase_history_data():
             Product.id,
             Supplier.id
         )
+            .order_by(PurchaseHistory.purchase_date.desc())
     )
     # 2. Історія всіх закупівель пакування
     packaging_purchase_history_query = (
@@ -65,6 +65,7 @@ def get_purchase_history_data():
             PackagingMaterial.id,
             PackagingMaterialSupplier.id
         )  # Групування для уникнення дублювання
+            .order_by(PackagingPurchaseHistory.purchase_date.desc())
     )
     # 3. Інші витрати (OtherInvestments table)
     other_investments_query = (
@@ -76,7 +77,101 @@ def get_purchase_history_data():
             OtherInvestment.date.label('expense_date')
         )
             .group_by(OtherInvestment.id)
+            .order_by(OtherInvestment.date.desc())
     )
+    return product_purchase_history_query, packaging_purchase_history_query, other_investments_query
+
+
+def unify_date(date):
+    if isinstance(date, datetime):
+        return date.date()  # Повертає тільки дату
+    elif isinstance(date, str):
+        return datetime.fromisoformat(date).date()  # Перетворює ISO-строку в дату
+    return date  # Якщо це вже дата, повертаємо її без змін
+
+
+# Обробка продуктів
+def format_product_purchase(item):
+    return {
+        "id": item["purchase_id"],
+        "name": item["product_name"],
+        "categories": [int(cat_id) for cat_id in item["product_categories"].split(', ')] if item[
+            "product_categories"] else [],
+        "supplier_id": item["supplier_id"],
+        "supplier_name": item["supplier_name"],
+        "supplier_is_active": item["supplier_is_active"],
+        "quantity": item["quantity"],
+        "price_per_item": item["price_per_item"],
+        "total_price": item["total_price"],
+        "date": unify_date(item["date"]),
+        "type": "Product",
+    }
+
+
+# Обробка пакування
+def format_packaging_purchase(item):
+    return {
+        "id": item["purchase_history_id"],
+        "name": item['packaging_material_name'],
+        "categories": [],
+        "supplier_name": item["supplier_name"],
+        "supplier_is_active": item["supplier_is_active"],
+        "quantity": item["quantity"],
+        "price_per_item": item["price_per_unit"],
+        "total_price": item["total_price"],
+        "date": unify_date(item["purchase_date"]),
+        "type": "Packaging",
+    }
+
+
+# Обробка інших витрат
+def format_other_investment(item):
+    return {
+        "id": item["expense_id"],
+        "name": item["expense_name"],
+        "categories": [],
+        "supplier_id": None,
+        "supplier_name": item["supplier"],
+        "supplier_is_active": True,
+        "quantity": None,
+        "price_per_item": None,
+        "total_price": item["expense_amount"],
+        "date": unify_date(item["expense_date"]),
+        "type": "Other Investment",
+    }
+
+
+def iter_purchase_history(db_session):
+    """
+    Історія закупівель потоком: три відсортовані курсори зливаються за датою,
+    тож порядок такий самий, як у get_purchase_history_data, без сортування в пам'яті.
+    """
+    queries = build_purchase_history_queries()
+    formatters = (format_product_purchase, format_packaging_purchase, format_other_investment)
+
+    streams = [
+        map(formatter, db_session.execute(query, execution_options={'yield_per': STREAM_BATCH_SIZE}).mappings())
+        for query, formatter in zip(queries, formatters)
+    ]
+    for item in heapq.merge(*streams, key=lambda x: x["date"], reverse=True):
+        item["date"] = item["date"].strftime("%Y-%m-%d")
+        yield item
+
+
+@purchase_history_bp.route('/get_all_purchase_history', methods=['GET'])
+def get_purchase_history_data():
+    """
+    Отримує дані про історію закупівель для сторінки.
+    :param session: Поточна сесія бази даних.
+    :return: Список словників із даними про історію закупівель.
+    """
+    from postgreSQLConnect import db_session
+
+    if wants_ndjson():
+        return ndjson_response(iter_purchase_history(db_session))
+
+    product_purchase_history_query, packaging_purchase_history_query, other_investments_query = \
+        build_purchase_history_queries()
 
     # Виконання запитів
     product_results = db_session.execute(product_purchase_history_query).mappings().fetchall()
@@ -85,62 +180,9 @@ def get_purchase_history_data():
 
     # Форматування даних для продуктів
     # Перетворення масивів в один уніфікований масив
-    combined_data = []
-
-    def unify_date(date):
-        if isinstance(date, datetime):
-            return date.date()  # Повертає тільки дату
-        elif isinstance(date, str):
-            return datetime.fromisoformat(date).date()  # Перетворює ISO-строку в дату
-        return date  # Якщо це вже дата, повертаємо її без змін
-
-    # Обробка продуктів
-    for item in product_results:
-        combined_data.append({
-            "id": item["purchase_id"],
-            "name": item["product_name"],
-            "categories": [int(cat_id) for cat_id in item["product_categories"].split(', ')] if item[
-                "product_categories"] else [],
-            "supplier_id": item["supplier_id"],
-            "supplier_name": item["supplier_name"],
-            "supplier_is_active": item["supplier_is_active"],
-            "quantity": item["quantity"],
-            "price_per_item": item["price_per_item"],
-            "total_price": item["total_price"],
-            "date": unify_date(item["date"]),
-            "type": "Product",
-        })
-
-    # Обробка пакування
-    for item in packaging_results:
-        combined_data.append({
-            "id": item["purchase_history_id"],
-            "name": item['packaging_material_name'],
-            "categories": [],
-            "supplier_name": item["supplier_name"],
-            "supplier_is_active": item["supplier_is_active"],
-            "quantity": item["quantity"],
-            "price_per_item": item["price_per_unit"],
-            "total_price": item["total_price"],
-            "date": unify_date(item["purchase_date"]),
-            "type": "Packaging",
-        })
-
-    # Обробка інших витрат
-    for item in other_investments_results:
-        combined_data.append({
-            "id": item["expense_id"],
-            "name": item["expense_name"],
-            "categories": [],
-            "supplier_id": None,
-            "supplier_name": item["supplier"],
-            "supplier_is_active": True,
-            "quantity": None,
-            "price_per_item": None,
-            "total_price": item["expense_amount"],
-            "date": unify_date(item["expense_date"]),
-            "type": "Other Investment",
-        })
+    combined_data = [format_product_purchase(item) for item in product_results] + \
+                    [format_packaging_purchase(item) for item in packaging_results] + \
+                    [format_other_investment(item) for item in other_investments_results]
 
     # Повернення комбінованого масиву з сортуванням за датою
     combined_data_sorted = sorted(
@@ -0,0 +1,206 @@
+from collections import OrderedDict
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+from flask import Blueprint, request, jsonify
+from sqlalchemy import update, insert, values, column, case, func, Integer, Float, Numeric
+from sqlalchemy.exc import SQLAlchemyError
+
+from models import Product, PackagingMaterial, Supplier, PackagingMaterialSupplier, PurchaseHistory, \
+    PackagingPurchaseHistory, StockHistory, PackagingStockHistory
+from services.inventory_service import CHANGE_PURCHASE
+from services.rollup_service import collect_row_deltas, apply_rollup_deltas
+
+receiving_bp = Blueprint('receiving', __name__)
+
+
+def _positive_decimal(value):
+    try:
+        number = Decimal(str(value))
+    except (InvalidOperation, TypeError, ValueError):
+        return None
+    return number if number > 0 else None
+
+
+def parse_delivery_lines(lines, prefix, id_field, price_field, total_field, integer_quantity, errors):
+    """
+    Перевіряє рядки накладної і зводить повтори однієї позиції в один рядок.
+
+    :return: OrderedDict {id: {'quantity', 'price', 'total', 'lines'}}; ціна — з останнього рядка позиції.
+    """
+    merged = OrderedDict()
+    for i, line in enumerate(lines):
+        path = f'{prefix}[{i}]'
+        item_id = line.get(id_field)
+        quantity = line.get('quantity')
+        price = _positive_decimal(line.get(price_field))
+        quantity_types = (int,) if integer_quantity else (int, float)
+        if not isinstance(item_id, int):
+            errors[f'{path}.{id_field}'] = f'{id_field} is required.'
+        if not isinstance(quantity, quantity_types) or isinstance(quantity, bool) or quantity <= 0:
+            errors[f'{path}.quantity'] = 'Quantity must be greater than 0.'
+            continue
+        if price is None:
+            errors[f'{path}.{price_field}'] = 'Price per item must be greater than 0.'
+            continue
+        total = line.get(total_field)
+        total = _positive_decimal(total) if total is not None else price * Decimal(str(quantity))
+        if total is None:
+            errors[f'{path}.{total_field}'] = 'Total price must be greater than 0.'
+            continue
+        if not isinstance(item_id, int):
+            continue
+
+        entry = merged.setdefault(item_id, {'quantity': 0, 'price': price, 'total': Decimal(0), 'lines': []})
+        entry['quantity'] += quantity
+        entry['price'] = price
+        entry['total'] += total
+        entry['lines'].append({'quantity': quantity, 'price': price, 'total': total})
+    return merged
+
+
+@receiving_bp.route('/receive_delivery', methods=['POST'])
+def receive_delivery():
+    """
+    Оприбуткування однієї накладної постачальника: N товарів і M пакувань за сталу кількість запитів.
+
+    Тіло: {supplier_id?, packaging_supplier_id?, purchase_date?,
+    products: [{product_id, quantity, purchase_price_per_item, purchase_total_price?}],
+    packaging: [{packaging_id, quantity, purchase_price_per_unit, total_purchase_cost?}]}
+
+    Або застосовуються всі рядки, або жоден.
+    """
+    from postgreSQLConnect import db_session
+
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({'error': 'Invalid data'}), 400
+
+    errors = {}
+    product_lines = parse_delivery_lines(data.get('products') or [], 'products', 'product_id',
+                                         'purchase_price_per_item', 'purchase_total_price', True, errors)
+    packaging_lines = parse_delivery_lines(data.get('packaging') or [], 'packaging', 'packaging_id',
+                                           'purchase_price_per_unit', 'total_purchase_cost', False, errors)
+    if not (data.get('products') or data.get('packaging')):
+        errors['delivery'] = 'Delivery must contain at least one product or packaging line'
+    if product_lines and not data.get('supplier_id'):
+        errors['supplier_id'] = 'Supplier ID is required.'
+
+    purchase_date = datetime.now()
+    if data.get('purchase_date'):
+        try:
+            purchase_date = datetime.strptime(data['purchase_date'], '%Y-%m-%d')
+        except (TypeError, ValueError):
+            errors['purchase_date'] = 'Date must be in YYYY-MM-DD format.'
+    if errors:
+        return jsonify({'errors': errors}), 400
+
+    supplier_id = data.get('supplier_id')
+    packaging_supplier_id = data.get('packaging_supplier_id')
+
+    try:
+        if product_lines and not db_session.get(Supplier, supplier_id):
+            return jsonify({'error': 'Supplier not found'}), 404
+        if packaging_supplier_id and not db_session.get(PackagingMaterialSupplier, packaging_supplier_id):
+            return jsonify({'error': 'Packaging supplier not found'}), 404
+
+        not_found = {}
+
+        if product_lines:
+            # UPDATE products ... FROM (VALUES ...) — одним запитом для всіх товарів накладної
+            delivery = values(
+                column('id', Integer), column('quantity', Integer), column('price', Numeric(10, 2)),
+                column('total', Numeric(12, 2)),
+                name='delivery'
+            ).data([(item_id, line['quantity'], line['price'], line['total'])
+                    for item_id, line in sorted(product_lines.items())])
+            updated = db_session.execute(
+                update(Product)
+                    .where(Product.id == delivery.c.id)
+                    .values(
+                        total_quantity=Product.total_quantity + delivery.c.quantity,
+                        available_quantity=Product.available_quantity + delivery.c.quantity,
+                        # Ті самі поля, що й у purchase_product, включно з selling_total_price
+                        selling_total_price=func.coalesce(Product.selling_total_price, 0) + delivery.c.total,
+                        purchase_total_price=Product.purchase_total_price + delivery.c.total,
+                        purchase_price_per_item=delivery.c.price,
+                        supplier_id=supplier_id
+                    )
+                    .returning(Product.id)
+                    .execution_options(synchronize_session=False)
+            ).scalars().all()
+            missing = sorted(product_lines.keys() - set(updated))
+            if missing:
+                not_found['products'] = missing
+
+        if packaging_lines:
+            delivery = values(
+                column('id', Integer), column('quantity', Float), column('price', Numeric(10, 2)),
+                column('total', Numeric(12, 2)),
+                name='delivery'
+            ).data([(item_id, float(line['quantity']), line['price'], line['total'])
+                    for item_id, line in sorted(packaging_lines.items())])
+            updated = db_session.execute(
+                update(PackagingMaterial)
+                    .where(PackagingMaterial.id == delivery.c.id)
+                    .values(
+                        total_quantity=PackagingMaterial.total_quantity + delivery.c.quantity,
+                        available_quantity=PackagingMaterial.available_quantity + delivery.c.quantity,
+                        total_purchase_cost=PackagingMaterial.total_purchase_cost + delivery.c.total,
+                        available_stock_cost=PackagingMaterial.available_stock_cost + delivery.c.total,
+                        purchase_price_per_unit=delivery.c.price,
+                        status=case((PackagingMaterial.status == 'used', 'available'), else_=PackagingMaterial.status)
+                    )
+                    .returning(PackagingMaterial.id)
+                    .execution_options(synchronize_session=False)
+            ).scalars().all()
+            missing = sorted(packaging_lines.keys() - set(updated))
+            if missing:
+                not_found['packaging'] = missing
+
+        if not_found:
+            db_session.rollback()
+            return jsonify({'error': 'Some items were not found', 'not_found': not_found}), 404
+
+        # Історія — по рядку накладної, один INSERT на таблицю
+        purchase_rows = [
+            {'product_id': item_id, 'supplier_id': supplier_id, 'purchase_price_per_item': line['price'],
+             'purchase_total_price': line['total'], 'purchase_date': purchase_date.date(),
+             'quantity_purchase': line['quantity']}
+            for item_id, entry in product_lines.items() for line in entry['lines']
+        ]
+        stock_rows = [
+            {'product_id': item_id, 'change_amount': entry['quantity'], 'change_type': CHANGE_PURCHASE,
+             'timestamp': purchase_date}
+            for item_id, entry in product_lines.items()
+        ]
+        packaging_purchase_rows = [
+            {'material_id': item_id, 'supplier_id': packaging_supplier_id, 'quantity_purchased': line['quantity'],
+             'purchase_price_per_unit': line['price'], 'purchase_total_price': line['total'],
+             'purchase_date': purchase_date}
+            for item_id, entry in packaging_lines.items() for line in entry['lines']
+        ]
+        packaging_stock_rows = [
+            {'material_id': item_id, 'change_amount': entry['quantity'], 'change_type': CHANGE_PURCHASE,
+             'timestamp': purchase_date}
+            for item_id, entry in packaging_lines.items()
+        ]
+
+        if purchase_rows:
+            db_session.execute(insert(PurchaseHistory.__table__), purchase_rows)
+            db_session.execute(insert(StockHistory.__table__), stock_rows)
+            apply_rollup_deltas(db_session, collect_row_deltas(PurchaseHistory, purchase_rows))
+        if packaging_purchase_rows:
+            db_session.execute(insert(PackagingPurchaseHistory.__table__), packaging_purchase_rows)
+            db_session.execute(insert(PackagingStockHistory.__table__), packaging_stock_rows)
+
+        db_session.commit()
+    except SQLAlchemyError as e:
+        db_session.rollback()
+        return jsonify({'error': 'Database error', 'details': str(e)}), 500
+
+    return jsonify({
+        'message': 'Delivery received successfully',
+        'products': len(product_lines),
+        'packaging': len(packaging_lines)
+    }), 201
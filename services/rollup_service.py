@@ -0,0 +1,208 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from sqlalchemy import event, extract, func, literal, delete, inspect, select
+from sqlalchemy.dialects.postgresql import insert
+
+from models import MonthlyRollup, SaleHistory, PurchaseHistory
+from postgreSQLConnect import Session
+
+# Метрики таблиці monthly_rollup
+SALES_TOTAL = 'sales_total'
+SALES_QUANTITY = 'sales_quantity'
+SALES_PROFIT = 'sales_profit'
+SALES_COUNT = 'sales_count'
+PURCHASES_TOTAL = 'purchases_total'
+PURCHASES_QUANTITY = 'purchases_quantity'
+PURCHASES_PRICE_SUM = 'purchases_price_per_item_sum'  # Для середньої ціни: сума / кількість записів
+PURCHASES_COUNT = 'purchases_count'
+
+# Метрика -> колонка-джерело (None означає підрахунок записів)
+SALE_METRICS = {
+    SALES_TOTAL: 'selling_total_price',
+    SALES_QUANTITY: 'quantity_sold',
+    SALES_PROFIT: 'profit',
+    SALES_COUNT: None,
+}
+PURCHASE_METRICS = {
+    PURCHASES_TOTAL: 'purchase_total_price',
+    PURCHASES_QUANTITY: 'quantity_purchase',
+    PURCHASES_PRICE_SUM: 'purchase_price_per_item',
+    PURCHASES_COUNT: None,
+}
+
+# Модель -> (колонка дати, метрики)
+TRACKED_MODELS = {
+    SaleHistory: ('sale_date', SALE_METRICS),
+    PurchaseHistory: ('purchase_date', PURCHASE_METRICS),
+}
+
+
+def apply_rollup_deltas(connection, deltas):
+    """
+    Додає зміни до monthly_rollup одним INSERT ... ON CONFLICT DO UPDATE.
+
+    :param connection: Сесія або з'єднання, у транзакції якого треба записати зміни.
+    :param deltas: Словник {(year, month, metric): зміна значення}.
+    """
+    rows = [
+        {'year': year, 'month': month, 'metric': metric, 'value': value}
+        for (year, month, metric), value in deltas.items()
+        if value
+    ]
+    if not rows:
+        return
+
+    stmt = insert(MonthlyRollup.__table__).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['year', 'month', 'metric'],
+        set_={'value': MonthlyRollup.__table__.c.value + stmt.excluded.value}
+    )
+    connection.execute(stmt)
+
+
+def _contribution(values, date, metrics, sign):
+    """Внесок одного запису історії в метрики його місяця."""
+    if date is None:
+        return {}
+    result = {}
+    for metric, attr in metrics.items():
+        value = Decimal(1) if attr is None else Decimal(str(values(attr) or 0))
+        result[(date.year, date.month, metric)] = value * sign
+    return result
+
+
+def collect_deltas(new=(), deleted=(), dirty=()):
+    """Рахує зміни метрик для нових, видалених і змінених записів SaleHistory/PurchaseHistory."""
+    deltas = defaultdict(Decimal)
+
+    def add(contribution):
+        for key, value in contribution.items():
+            deltas[key] += value
+
+    def current(obj):
+        return lambda attr: getattr(obj, attr)
+
+    def committed(obj):
+        state = inspect(obj)
+
+        def value(attr):
+            history = state.attrs[attr].history
+            return history.deleted[0] if history.deleted else getattr(obj, attr)
+
+        return value
+
+    for obj in new:
+        date_attr, metrics = TRACKED_MODELS[type(obj)]
+        add(_contribution(current(obj), getattr(obj, date_attr), metrics, 1))
+
+    for obj in deleted:
+        date_attr, metrics = TRACKED_MODELS[type(obj)]
+        old = committed(obj)
+        add(_contribution(old, old(date_attr), metrics, -1))
+
+    for obj in dirty:
+        date_attr, metrics = TRACKED_MODELS[type(obj)]
+        state = inspect(obj)
+        if not any(state.attrs[attr].history.has_changes() for attr in [date_attr, *filter(None, metrics.values())]):
+            continue
+        old = committed(obj)
+        add(_contribution(old, old(date_attr), metrics, -1))
+        add(_contribution(current(obj), getattr(obj, date_attr), metrics, 1))
+
+    return deltas
+
+
+def collect_row_deltas(model, rows, sign=1):
+    """
+    Те саме, що collect_deltas, але для словників рядків.
+
+    Масові insert(model) через session.execute() не проходять через flush, тож обробник
+    має сам передати їх у apply_rollup_deltas.
+    """
+    date_attr, metrics = TRACKED_MODELS[model]
+    deltas = defaultdict(Decimal)
+    for row in rows:
+        for key, value in _contribution(row.get, row.get(date_attr), metrics, sign).items():
+            deltas[key] += value
+    return deltas
+
+
+@event.listens_for(Session, 'after_flush')
+def update_rollup_after_flush(session, flush_context):
+    """Тримає monthly_rollup узгодженим з sale_history/purchase_history у тій самій транзакції."""
+
+    def tracked(objects):
+        return [obj for obj in objects if type(obj) in TRACKED_MODELS]
+
+    deltas = collect_deltas(
+        new=tracked(session.new),
+        deleted=tracked(session.deleted),
+        dirty=tracked(session.dirty)
+    )
+    apply_rollup_deltas(session.connection(), deltas)
+
+
+def subtract_product_history(db_session, product_id):
+    """
+    Віднімає з rollup усі продажі та закупівлі товару.
+
+    Потрібно перед масовим видаленням історії через query.delete(), яке не проходить через flush.
+    """
+    deltas = defaultdict(Decimal)
+    for model, (date_attr, metrics) in TRACKED_MODELS.items():
+        date_column = getattr(model, date_attr)
+        columns = [
+            (func.count(model.id) if attr is None else func.coalesce(func.sum(getattr(model, attr)), 0)).label(metric)
+            for metric, attr in metrics.items()
+        ]
+        rows = (
+            db_session.query(extract('year', date_column).label('year'),
+                             extract('month', date_column).label('month'), *columns)
+                .filter(model.product_id == product_id)
+                .group_by(extract('year', date_column), extract('month', date_column))
+                .all()
+        )
+        for row in rows:
+            for metric in metrics:
+                deltas[(int(row.year), int(row.month), metric)] -= Decimal(str(getattr(row, metric)))
+    apply_rollup_deltas(db_session, deltas)
+
+
+def clear_monthly_rollup(db_session):
+    db_session.execute(delete(MonthlyRollup))
+
+
+def rebuild_monthly_rollup(db_session):
+    """Повністю перераховує monthly_rollup з sale_history та purchase_history (бекфіл)."""
+    clear_monthly_rollup(db_session)
+    for model, (date_attr, metrics) in TRACKED_MODELS.items():
+        date_column = getattr(model, date_attr)
+        year = extract('year', date_column)
+        month = extract('month', date_column)
+        for metric, attr in metrics.items():
+            aggregate = func.count(model.id) if attr is None else func.coalesce(func.sum(getattr(model, attr)), 0)
+            source = (
+                select(year, month, literal(metric), aggregate)
+                    .where(date_column.isnot(None))
+                    .group_by(year, month)
+            )
+            db_session.execute(
+                insert(MonthlyRollup).from_select(['year', 'month', 'metric', 'value'], source)
+            )
+
+
+def get_monthly_metrics(db_session, metrics):
+    """
+    Повертає {(year, month): {metric: float}} для вибраних метрик, впорядковано за місяцями.
+    """
+    rows = (
+        db_session.query(MonthlyRollup.year, MonthlyRollup.month, MonthlyRollup.metric, MonthlyRollup.value)
+            .filter(MonthlyRollup.metric.in_(metrics))
+            .order_by(MonthlyRollup.year, MonthlyRollup.month)
+            .all()
+    )
+    result = {}
+    for row in rows:
+        result.setdefault((row.year, row.month), dict.fromkeys(metrics, 0.0))[row.metric] = float(row.value)
+    return result
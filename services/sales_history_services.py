@@ -1,166 +1,363 @@
-from uuid import uuid4
+import base64
+import json
+from datetime import datetime, timedelta
 
-from flask import jsonify, Blueprint
+from flask import jsonify, Blueprint, request
+from sqlalchemy import tuple_, exists
+from sqlalchemy.orm import joinedload, selectinload, contains_eager
 
 from decimal import Decimal
 
-from models import SaleHistory, Product, Customer, PackagingSaleHistory, GiftSetSalesHistory
+from models import SaleHistory, Product, PackagingSaleHistory, GiftSetSalesHistory, PackagingMaterial, \
+    GiftSetSalesHistoryProduct, GiftSetSalesHistoryPackaging, GiftSetProduct, GiftSetPackaging, \
+    product_categories_table
+from services.streaming import wants_ndjson, ndjson_response, STREAM_BATCH_SIZE
 
 sales_history_services_bp = Blueprint('sales_history', __name__)
 
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
 
-# Функція для додавання унікального sale_history_id
-def add_sale_history_id(sales_data):
-    for sale in sales_data:
-        # Додаємо унікальний sale_history_id для кожного елемента
-        sale['sale_history_id'] = str(uuid4())
-    return sales_data
+# Ранг джерела усередині однієї дати. Стрічка впорядкована за спаданням (дата, ранг, id),
+# тож за однакової дати подарункові набори йдуть перед товарами
+SALE_KIND_RANK = {'sale': 0, 'gift_set': 1}
 
 
-@sales_history_services_bp.route('/get_all_sales_history', methods=['GET'])
-def get_sales_history():
-    from postgreSQLConnect import db_session
+def query_product_sales(db_session):
+    """
+    Запит історії продажів одиничних товарів з усіма звʼязками, потрібними для відповіді.
 
-    # Отримуємо всі записи історії продажів одиничних товарів
-    query = db_session.query(SaleHistory).join(Product).join(Customer)
-    sales_history = query.all()
-
-    # Отримуємо всі записи історії продажів подарункових наборів
-    gift_set_sales_history = db_session.query(GiftSetSalesHistory).all()
-
-    # Функція для обчислення собівартості товару
-    def calculate_product_cost(item):
-        return Decimal(item.gift_set_product.product.purchase_price_per_item) * Decimal(item.quantity)
-
-    # Функція для обчислення собівартості пакування
-    def calculate_packaging_cost(item):
-        return Decimal(item.gift_set_packaging.packaging.purchase_price_per_unit) * Decimal(item.quantity)
-
-    # Функція для створення даних про товар
-    def create_product_data(item):
-        return {
-            "product_id": item.gift_set_product.product_id,
-            "name": item.gift_set_product.product.name,
-            "quantity": item.quantity,
-            "unit_price": str(item.gift_set_product.product.purchase_price_per_item),
-            "total_price": str(calculate_product_cost(item)),
-            "supplier": {
-                "id": item.gift_set_product.product.supplier.id if item.gift_set_product.product.supplier else None,
-                "name": item.gift_set_product.product.supplier.name if item.gift_set_product.product.supplier else ''
-            }
+    Товар, постачальник і клієнт підтягуються через JOIN, категорії та пакування —
+    окремими selectin-запитами, тому кількість запитів не залежить від кількості продажів.
+    """
+    return (
+        db_session.query(SaleHistory)
+            .join(SaleHistory.product)
+            .join(SaleHistory.customer)
+            .options(
+            contains_eager(SaleHistory.product).joinedload(Product.supplier),
+            contains_eager(SaleHistory.product).selectinload(Product.categories),
+            contains_eager(SaleHistory.customer),
+            selectinload(SaleHistory.packaging_sale_history)
+                .joinedload(PackagingSaleHistory.packaging_material)
+                .joinedload(PackagingMaterial.packaging_material_supplier)
+        )
+    )
+
+
+def query_gift_set_sales(db_session):
+    """Запит історії продажів подарункових наборів з товарами, пакуванням і постачальниками."""
+    return (
+        db_session.query(GiftSetSalesHistory)
+            .options(
+            joinedload(GiftSetSalesHistory.gift_set),
+            joinedload(GiftSetSalesHistory.customer),
+            selectinload(GiftSetSalesHistory.sales_history_products)
+                .joinedload(GiftSetSalesHistoryProduct.gift_set_product)
+                .joinedload(GiftSetProduct.product)
+                .joinedload(Product.supplier),
+            selectinload(GiftSetSalesHistory.sales_history_packagings)
+                .joinedload(GiftSetSalesHistoryPackaging.gift_set_packaging)
+                .joinedload(GiftSetPackaging.packaging)
+                .joinedload(PackagingMaterial.packaging_material_supplier)
+        )
+    )
+
+
+# Функція для обчислення собівартості товару
+def calculate_product_cost(item):
+    return Decimal(item.gift_set_product.product.purchase_price_per_item) * Decimal(item.quantity)
+
+
+# Функція для обчислення собівартості пакування
+def calculate_packaging_cost(item):
+    return Decimal(item.gift_set_packaging.packaging.purchase_price_per_unit) * Decimal(item.quantity)
+
+
+# Функція для створення даних про товар
+def create_product_data(item):
+    supplier = item.gift_set_product.product.supplier
+    return {
+        "product_id": item.gift_set_product.product_id,
+        "name": item.gift_set_product.product.name,
+        "quantity": item.quantity,
+        "unit_price": str(item.gift_set_product.product.purchase_price_per_item),
+        "total_price": str(calculate_product_cost(item)),
+        "supplier": {
+            "id": supplier.id if supplier else None,
+            "name": supplier.name if supplier else ''
         }
+    }
 
-    # Функція для створення даних про пакування
-    def create_packaging_data(item):
-        return {
-            "packaging_id": item.gift_set_packaging.packaging_id,
-            "packaging_name": item.gift_set_packaging.packaging.name,
-            "quantity": item.quantity,
-            "unit_price": str(item.gift_set_packaging.packaging.purchase_price_per_unit),
-            "total_price": str(calculate_packaging_cost(item)),
-            "supplier": {
-                "id": item.gift_set_packaging.packaging.packaging_material_supplier.id if item.gift_set_packaging.packaging.packaging_material_supplier else None,
-                "name": item.gift_set_packaging.packaging.packaging_material_supplier.name if item.gift_set_packaging.packaging.packaging_material_supplier else ''
-            }
+
+# Функція для створення даних про пакування
+def create_packaging_data(item):
+    supplier = item.gift_set_packaging.packaging.packaging_material_supplier
+    return {
+        "packaging_id": item.gift_set_packaging.packaging_id,
+        "packaging_name": item.gift_set_packaging.packaging.name,
+        "quantity": item.quantity,
+        "unit_price": str(item.gift_set_packaging.packaging.purchase_price_per_unit),
+        "total_price": str(calculate_packaging_cost(item)),
+        "supplier": {
+            "id": supplier.id if supplier else None,
+            "name": supplier.name if supplier else ''
         }
+    }
+
+
+def serialize_product_sale(sale):
+    """Підготовка даних для одиничного товару (разом із пакуванням, якщо воно є)."""
+    # Знаходимо відповідне пакування серед уже завантажених записів
+    packaging_sale = next(
+        (ps for ps in sale.packaging_sale_history if ps.packaging_material_id == sale.packaging_material_id),
+        None
+    )
+
+    # Собівартість товару (ціна закупівлі)
+    product_cost = sale.product.purchase_price_per_item * sale.quantity_sold
 
-    # Підготовка даних для одиничних товарів
-    sales_data = []
-    for sale in sales_history:
-        # Знаходимо відповідне пакування для кожного запису в історії продажу
-        packaging_sale = db_session.query(PackagingSaleHistory).filter(
-            PackagingSaleHistory.sale_id == sale.id,
-            PackagingSaleHistory.packaging_material_id == sale.packaging_material_id
-        ).first()
-
-        # Собівартість товару (ціна закупівлі)
-        product_cost = sale.product.purchase_price_per_item * sale.quantity_sold
-
-        # Собівартість пакування (якщо є)
-        packaging_cost = 0
-        if packaging_sale:
-            packaging_cost = packaging_sale.packaging_material.purchase_price_per_unit * Decimal(
-                packaging_sale.packaging_quantity)
-
-        # Загальна собівартість (товар + пакування)
-        total_cost = product_cost + packaging_cost
-
-        # Вигода (прибуток)
-        profit = sale.selling_total_price - total_cost
-
-        # Підготовка інформації про пакування (якщо воно є)
-        packaging_details = {}
-        if packaging_sale:
-            packaging_details = {
-                'package_id': packaging_sale.packaging_material_id,
-                'packaging_name': packaging_sale.packaging_material.name,
-                'quantity_sold': packaging_sale.packaging_quantity,
-                'unit_price': str(packaging_sale.packaging_material.purchase_price_per_unit),
-                'total_price': str(packaging_sale.total_packaging_cost),
-                'supplier': {
-                    'id': packaging_sale.packaging_material.packaging_material_supplier.id if packaging_sale.packaging_material.packaging_material_supplier else None,
-                    'name': packaging_sale.packaging_material.packaging_material_supplier.name if packaging_sale.packaging_material.packaging_material_supplier else ''
-                }  # Додаємо постачальника пакування
-            }
-
-        product_data = {
-            'sale_history_id': sale.id,
-            'product_name': sale.product.name,
-            'categories': [{
-                'id': category.id,
-                'name': category.name
-            } for category in sale.product.categories],  # Повертати категорії як об'єкти
-            "supplier": sale.product.supplier.to_dict() if sale.product.supplier else None,  # Повертати постачальника як об'єкт
-            'customer': {
-                'id': sale.customer.id,
-                'name': sale.customer.name
-            },  # Повертати клієнта як об'єкт
-            'quantity_sold': sale.quantity_sold,
-            'unit_price': str(sale.selling_price_per_item),
-            'total_price': str(sale.selling_total_price),
-            'sale_date': sale.sale_date.strftime('%Y-%m-%d'),
-            'packaging_details': [packaging_details] if packaging_sale else [],  # Повертаємо один запис про пакування
-            'type': 'product_with_packaging' if packaging_sale else 'product',  # Зміна типу, якщо є пакування
-            'cost_price': str(total_cost),  # Собівартість
-            'profit': str(profit),  # Вигода
+    # Собівартість пакування (якщо є)
+    packaging_cost = 0
+    if packaging_sale:
+        packaging_cost = packaging_sale.packaging_material.purchase_price_per_unit * Decimal(
+            packaging_sale.packaging_quantity)
+
+    # Загальна собівартість (товар + пакування)
+    total_cost = product_cost + packaging_cost
+
+    # Вигода (прибуток)
+    profit = sale.selling_total_price - total_cost
+
+    # Підготовка інформації про пакування (якщо воно є)
+    packaging_details = {}
+    if packaging_sale:
+        packaging_supplier = packaging_sale.packaging_material.packaging_material_supplier
+        packaging_details = {
+            'package_id': packaging_sale.packaging_material_id,
+            'packaging_name': packaging_sale.packaging_material.name,
+            'quantity_sold': packaging_sale.packaging_quantity,
+            'unit_price': str(packaging_sale.packaging_material.purchase_price_per_unit),
+            'total_price': str(packaging_sale.total_packaging_cost),
+            'supplier': {
+                'id': packaging_supplier.id if packaging_supplier else None,
+                'name': packaging_supplier.name if packaging_supplier else ''
+            }  # Додаємо постачальника пакування
         }
-        sales_data.append(product_data)
+
+    return {
+        'id': sale.id,
+        'sale_history_id': f"sale-{sale.id}",  # Стабільний ідентифікатор рядка у спільній стрічці
+        'product_name': sale.product.name,
+        'categories': [{
+            'id': category.id,
+            'name': category.name
+        } for category in sale.product.categories],  # Повертати категорії як об'єкти
+        "supplier": sale.product.supplier.to_dict() if sale.product.supplier else None,
+        # Повертати постачальника як об'єкт
+        'customer': {
+            'id': sale.customer.id,
+            'name': sale.customer.name
+        },  # Повертати клієнта як об'єкт
+        'quantity_sold': sale.quantity_sold,
+        'unit_price': str(sale.selling_price_per_item),
+        'total_price': str(sale.selling_total_price),
+        'sale_date': sale.sale_date.strftime('%Y-%m-%d'),
+        'packaging_details': [packaging_details] if packaging_sale else [],  # Повертаємо один запис про пакування
+        'type': 'product_with_packaging' if packaging_sale else 'product',  # Зміна типу, якщо є пакування
+        'cost_price': str(total_cost),  # Собівартість
+        'profit': str(profit),  # Вигода
+    }
+
+
+def serialize_gift_set_sale(sale):
+    """Підготовка даних про продаж подарункового набору."""
+    gift_set_name = sale.gift_set.name if sale.gift_set else 'Unknown'
+
+    # Обчислення собівартості подарункового набору
+    cost_price = sum(calculate_product_cost(item) for item in sale.sales_history_products) + \
+                 sum(calculate_packaging_cost(item) for item in sale.sales_history_packagings)
+
+    products_data = [create_product_data(item) for item in sale.sales_history_products]
+    packagings_data = [create_packaging_data(item) for item in sale.sales_history_packagings]
+
+    # Розрахунок вигоди
+    profit = Decimal(sale.sold_price) - cost_price
+
+    return {
+        "id": sale.id,
+        "sale_history_id": f"gift_set-{sale.id}",
+        "gift_set_id": sale.gift_set_id,
+        "product_name": gift_set_name,
+        "sale_date": sale.sold_at.strftime('%Y-%m-%d'),
+        "total_price": str(sale.sold_price),
+        "cost_price": str(cost_price),
+        "profit": str(profit),
+        "quantity": sale.quantity,
+        "customer": {
+            'id': sale.customer.id,
+            'name': sale.customer.name
+        },
+        "products": products_data,
+        "packagings": packagings_data,
+        'type': 'gift_set'
+    }
+
+
+def iter_sales_history(db_session):
+    """Уся стрічка продажів порціями з серверного курсора (для потокової відповіді)."""
+    for sale in query_product_sales(db_session).order_by(SaleHistory.id).yield_per(STREAM_BATCH_SIZE):
+        yield serialize_product_sale(sale)
+    for sale in query_gift_set_sales(db_session).order_by(GiftSetSalesHistory.id).yield_per(STREAM_BATCH_SIZE):
+        yield serialize_gift_set_sale(sale)
+
+
+@sales_history_services_bp.route('/get_all_sales_history', methods=['GET'])
+def get_sales_history():
+    from postgreSQLConnect import db_session
+
+    if wants_ndjson():
+        return ndjson_response(iter_sales_history(db_session))
+
+    # Отримуємо всі записи історії продажів одиничних товарів
+    sales_data = [serialize_product_sale(sale) for sale in query_product_sales(db_session).all()]
 
     # Додавання даних про продажі подарункових наборів
-    for sale in gift_set_sales_history:
-        gift_set_name = sale.gift_set.name if sale.gift_set else 'Unknown'
-
-        # Обчислення собівартості подарункового набору
-        cost_price = sum(calculate_product_cost(item) for item in sale.sales_history_products) + \
-                     sum(calculate_packaging_cost(item) for item in sale.sales_history_packagings)
-
-        products_data = [create_product_data(item) for item in sale.sales_history_products]
-        packagings_data = [create_packaging_data(item) for item in sale.sales_history_packagings]
-
-        # Розрахунок вигоди
-        profit = Decimal(sale.sold_price) - cost_price
-
-        # Підготовка даних про продаж подарункового набору
-        gift_set_sale_data = {
-            "id": sale.id,
-            "gift_set_id": sale.gift_set_id,
-            "product_name": gift_set_name,
-            "sale_date": sale.sold_at.strftime('%Y-%m-%d'),
-            "total_price": str(sale.sold_price),
-            "cost_price": str(cost_price),
-            "profit": str(profit),
-            "quantity": sale.quantity,
-            "customer": {
-                'id': sale.customer.id,
-                'name': sale.customer.name
-            },
-            "products": products_data,
-            "packagings": packagings_data,
-            'type': 'gift_set'
-        }
-        sales_data.append(gift_set_sale_data)
+    sales_data.extend(serialize_gift_set_sale(sale) for sale in query_gift_set_sales(db_session).all())
+
+    return jsonify(sales_data)
+
+
+def encode_sales_cursor(sale_date, kind, row_id):
+    payload = json.dumps({'d': sale_date.isoformat(), 'k': SALE_KIND_RANK[kind], 'i': row_id})
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+
+def decode_sales_cursor(cursor):
+    """Повертає (sale_date, kind_rank, id) з курсора або піднімає ValueError."""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.fromisoformat(payload['d']), int(payload['k']), int(payload['i'])
+    except (KeyError, TypeError, ValueError, UnicodeDecodeError, json.JSONDecodeError):
+        raise ValueError('Invalid cursor')
+
+
+def keyset_before(date_column, id_column, kind, cursor):
+    """
+    Умова "рядок іде після курсора" для сортування (дата, джерело, id) за спаданням.
+
+    Джерело для кожної таблиці стале, тому порівняння зводиться до дати та id,
+    а для власного джерела — до порівняння кортежу (дата, id), яке покриває індекс.
+    """
+    cursor_date, cursor_rank, cursor_id = cursor
+    rank = SALE_KIND_RANK[kind]
+    if rank < cursor_rank:
+        return date_column <= cursor_date
+    if rank > cursor_rank:
+        return date_column < cursor_date
+    return tuple_(date_column, id_column) < tuple_(cursor_date, cursor_id)
+
+
+def parse_sales_page_args(args):
+    """Розбирає параметри сторінки; повертає (params, error)."""
+    params = {}
+    try:
+        params['limit'] = min(max(int(args.get('limit', DEFAULT_PAGE_SIZE)), 1), MAX_PAGE_SIZE)
+        for key in ('customer_id', 'product_id', 'category_id'):
+            params[key] = int(args[key]) if args.get(key) else None
+        params['date_from'] = datetime.strptime(args['date_from'], '%Y-%m-%d') if args.get('date_from') else None
+        params['date_to'] = datetime.strptime(args['date_to'], '%Y-%m-%d') + timedelta(days=1) \
+            if args.get('date_to') else None
+    except ValueError:
+        return None, 'Invalid pagination or filter parameters'
+
+    try:
+        params['cursor'] = decode_sales_cursor(args['cursor']) if args.get('cursor') else None
+    except ValueError as e:
+        return None, str(e)
+    return params, None
+
+
+def filter_product_sales(query, params):
+    if params['date_from']:
+        query = query.filter(SaleHistory.sale_date >= params['date_from'])
+    if params['date_to']:
+        query = query.filter(SaleHistory.sale_date < params['date_to'])
+    if params['customer_id']:
+        query = query.filter(SaleHistory.customer_id == params['customer_id'])
+    if params['product_id']:
+        query = query.filter(SaleHistory.product_id == params['product_id'])
+    if params['category_id']:
+        query = query.filter(exists().where(
+            product_categories_table.c.product_id == SaleHistory.product_id,
+            product_categories_table.c.category_id == params['category_id']
+        ))
+    if params['cursor']:
+        query = query.filter(keyset_before(SaleHistory.sale_date, SaleHistory.id, 'sale', params['cursor']))
+    return query.order_by(SaleHistory.sale_date.desc(), SaleHistory.id.desc())
+
+
+def filter_gift_set_sales(query, params):
+    if params['date_from']:
+        query = query.filter(GiftSetSalesHistory.sold_at >= params['date_from'])
+    if params['date_to']:
+        query = query.filter(GiftSetSalesHistory.sold_at < params['date_to'])
+    if params['customer_id']:
+        query = query.filter(GiftSetSalesHistory.customer_id == params['customer_id'])
+
+    # Набір підходить під фільтр товару/категорії, якщо містить такий товар
+    if params['product_id'] or params['category_id']:
+        contains_product = exists().where(
+            GiftSetSalesHistoryProduct.sales_history_id == GiftSetSalesHistory.id,
+            GiftSetSalesHistoryProduct.gift_set_product_id == GiftSetProduct.id
+        )
+        if params['product_id']:
+            contains_product = contains_product.where(GiftSetProduct.product_id == params['product_id'])
+        if params['category_id']:
+            contains_product = contains_product.where(
+                product_categories_table.c.product_id == GiftSetProduct.product_id,
+                product_categories_table.c.category_id == params['category_id']
+            )
+        query = query.filter(contains_product)
+
+    if params['cursor']:
+        query = query.filter(
+            keyset_before(GiftSetSalesHistory.sold_at, GiftSetSalesHistory.id, 'gift_set', params['cursor']))
+    return query.order_by(GiftSetSalesHistory.sold_at.desc(), GiftSetSalesHistory.id.desc())
+
+
+@sales_history_services_bp.route('/get_sales_history_page', methods=['GET'])
+def get_sales_history_page():
+    """
+    Сторінка спільної стрічки продажів (товари + подарункові набори), від новіших до старіших.
+
+    Параметри: limit, cursor (з попередньої відповіді), date_from, date_to (YYYY-MM-DD),
+    customer_id, product_id, category_id.
+    """
+    from postgreSQLConnect import db_session
+
+    params, error = parse_sales_page_args(request.args)
+    if error:
+        return jsonify({'error': error}), 400
+    limit = params['limit']
+
+    # З кожного джерела беремо не більше limit + 1 рядків і зливаємо їх за ключем сортування
+    product_sales = filter_product_sales(query_product_sales(db_session), params).limit(limit + 1).all()
+    gift_set_sales = filter_gift_set_sales(query_gift_set_sales(db_session), params).limit(limit + 1).all()
+
+    rows = [(sale.sale_date, 'sale', sale) for sale in product_sales] + \
+           [(sale.sold_at, 'gift_set', sale) for sale in gift_set_sales]
+    rows.sort(key=lambda row: (row[0], SALE_KIND_RANK[row[1]], row[2].id), reverse=True)
+
+    page = rows[:limit]
+    items = [
+        serialize_product_sale(sale) if kind == 'sale' else serialize_gift_set_sale(sale)
+        for _, kind, sale in page
+    ]
 
-        # Додаємо унікальні sale_history_id до кожного елемента
-    combined_sales_data_with_id = add_sale_history_id(sales_data)
+    next_cursor = None
+    if len(rows) > limit:
+        last_date, last_kind, last_sale = page[-1]
+        next_cursor = encode_sales_cursor(last_date, last_kind, last_sale.id)
 
-    return jsonify(combined_sales_data_with_id)
+    return jsonify({'items': items, 'next_cursor': next_cursor})
@@ -0,0 +1,296 @@
+"""
+Серіалізатори списків на проєкціях колонок.
+
+Замість повних ORM-об'єктів (identity map, стан змін, ліниві зв'язки) запит вибирає лише колонки,
+потрібні у відповіді, а словник будується прямо з рядка select(). Набір ключів і формат значень —
+ті самі, що в to_dict() відповідних моделей, тож клієнти різниці не бачать. Дати й Decimal без
+NULL кодує JSON-провайдер (services/json_provider.py); тут лишаються лише перетворення,
+яких він зробити не може (NULL -> 0, дата без часу).
+
+Параметр fields (?fields=id,name) звужує і SELECT, і відповідь: непотрібні колонки не читаються,
+а вкладені частини (постачальник, категорії, склад набору) не джойняться й не дозапитуються.
+"""
+from collections import defaultdict
+
+from sqlalchemy import select, func, literal
+
+from models import Product, Supplier, PackagingMaterial, PackagingMaterialSupplier, Customer, OtherInvestment, \
+    GiftSet, GiftSetProduct, GiftSetPackaging, product_categories_table
+
+
+def to_float(value):
+    return float(value or 0)
+
+
+def to_date_string(value):
+    return value.strftime('%Y-%m-%d') if value else None
+
+
+class Projection:
+    """
+    Опис відповіді: [(ключ, колонка, перетворення або None)].
+
+    Рядок запиту розкладається на словник одним zip; перетворення застосовуються лише
+    до полів, яким вони потрібні.
+    """
+
+    def __init__(self, fields):
+        self.fields = fields
+        self.keys = [key for key, _, _ in fields]
+        self.columns = [column for _, column, _ in fields]
+        self.converters = [(key, convert) for key, _, convert in fields if convert is not None]
+
+    def to_dict(self, values):
+        result = dict(zip(self.keys, values))
+        for key, convert in self.converters:
+            result[key] = convert(result[key])
+        return result
+
+    def only(self, keys):
+        """Проєкція лише з полями keys (None — усі поля)."""
+        if keys is None:
+            return self
+        return Projection([field for field in self.fields if field[0] in keys])
+
+
+def parse_fields(value, allowed):
+    """
+    Розбирає ?fields=a,b,c.
+
+    :param allowed: Усі поля, які може віддати список.
+    :return: Множина полів або None, якщо параметр не задано (тоді віддаються всі поля).
+    :raises ValueError: Порожній список або невідоме поле.
+    """
+    if value is None:
+        return None
+    fields = {field.strip() for field in value.split(',') if field.strip()}
+    if not fields:
+        raise ValueError("fields must list at least one field")
+    unknown = fields.difference(allowed)
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}. Allowed: {', '.join(allowed)}")
+    return fields
+
+
+def _wants(fields, key):
+    return fields is None or key in fields
+
+
+PRODUCT_PROJECTION = Projection([
+    ('id', Product.id, None),
+    ('name', Product.name, None),
+    ('supplier_id', Product.supplier_id, None),
+    ('total_quantity', Product.total_quantity, None),
+    ('available_quantity', Product.available_quantity, None),
+    ('sold_quantity', Product.sold_quantity, None),
+    ('purchase_total_price', Product.purchase_total_price, to_float),
+    ('purchase_price_per_item', Product.purchase_price_per_item, to_float),
+    ('selling_total_price', Product.selling_total_price, to_float),
+    ('selling_price_per_item', Product.selling_price_per_item, to_float),
+    ('created_date', Product.created_date, None),
+    ('article', Product.article, None),
+    ('product_description', Product.product_description, None),
+])
+
+SUPPLIER_PROJECTION = Projection([
+    ('id', Supplier.id, None),
+    ('name', Supplier.name, None),
+    ('contact_info', Supplier.contact_info, None),
+    ('email', Supplier.email, None),
+    ('phone_number', Supplier.phone_number, None),
+    ('address', Supplier.address, None),
+    ('is_active', Supplier.is_active, None),
+])
+
+PACKAGING_MATERIAL_PROJECTION = Projection([
+    ('id', PackagingMaterial.id, None),
+    ('name', PackagingMaterial.name, None),
+    ('packaging_material_supplier_id', PackagingMaterial.packaging_material_supplier_id, None),
+    ('total_quantity', PackagingMaterial.total_quantity, None),
+    ('available_quantity', PackagingMaterial.available_quantity, None),
+    ('purchase_price_per_unit', PackagingMaterial.purchase_price_per_unit, to_float),
+    ('reorder_level', PackagingMaterial.reorder_level, None),
+    ('total_purchase_cost', PackagingMaterial.total_purchase_cost, to_float),
+    ('available_stock_cost', PackagingMaterial.available_stock_cost, to_float),
+    ('created_date', PackagingMaterial.created_date, None),
+])
+
+PACKAGING_SUPPLIER_PROJECTION = Projection([
+    ('id', PackagingMaterialSupplier.id, None),
+    ('name', PackagingMaterialSupplier.name, None),
+    ('contact_info', PackagingMaterialSupplier.contact_info, None),
+    ('email', PackagingMaterialSupplier.email, None),
+    ('phone_number', PackagingMaterialSupplier.phone_number, None),
+    ('address', PackagingMaterialSupplier.address, None),
+    ('is_active', PackagingMaterialSupplier.is_active, None),
+])
+
+CUSTOMER_PROJECTION = Projection([
+    ('id', Customer.id, None),
+    ('name', Customer.name, None),
+    ('email', Customer.email, None),
+    ('address', Customer.address, None),
+    ('phone_number', Customer.phone_number, None),
+])
+
+GIFT_SET_PROJECTION = Projection([
+    ('id', GiftSet.id, None),
+    ('name', GiftSet.name, None),
+    ('description', GiftSet.description, None),
+    ('total_price', GiftSet.total_price, None),
+    ('gift_selling_price', GiftSet.gift_selling_price, None),
+])
+
+INVESTMENT_PROJECTION = Projection([
+    ('id', OtherInvestment.id, None),
+    ('type_name', OtherInvestment.type_name, None),
+    ('cost', OtherInvestment.cost, to_float),
+    ('supplier', OtherInvestment.supplier, None),
+    ('date', OtherInvestment.date, to_date_string),
+])
+
+
+# Поля, доступні у fields= для кожного списку
+PRODUCT_FIELDS = (*PRODUCT_PROJECTION.keys, 'category_ids', 'supplier')
+PACKAGING_MATERIAL_FIELDS = (*PACKAGING_MATERIAL_PROJECTION.keys, 'supplier')
+CUSTOMER_FIELDS = tuple(CUSTOMER_PROJECTION.keys)
+SUPPLIER_FIELDS = (*SUPPLIER_PROJECTION.keys, 'type')
+GIFT_SET_FIELDS = (*GIFT_SET_PROJECTION.keys, 'products', 'packagings')
+
+
+def _execute(db_session, stmt, batch_size=None):
+    """Рядки запиту; з batch_size — порціями з серверного курсора (для NDJSON)."""
+    if batch_size:
+        stmt = stmt.execution_options(yield_per=batch_size)
+    return db_session.execute(stmt)
+
+
+def iter_products(db_session, batch_size=None, fields=None):
+    """Товари для списку: поля to_dict(), category_ids і вкладений постачальник (або None)."""
+    projection = PRODUCT_PROJECTION.only(fields)
+    columns = list(projection.columns)
+    stmt = select().select_from(Product).order_by(Product.id)
+
+    with_supplier = _wants(fields, 'supplier')
+    if with_supplier:
+        supplier_at = len(columns)
+        columns += SUPPLIER_PROJECTION.columns
+        stmt = stmt.outerjoin(Supplier, Supplier.id == Product.supplier_id)
+
+    with_categories = _wants(fields, 'category_ids')
+    if with_categories:
+        category_ids = (
+            select(product_categories_table.c.product_id,
+                   func.array_agg(product_categories_table.c.category_id).label('category_ids'))
+                .group_by(product_categories_table.c.product_id)
+                .subquery()
+        )
+        columns.append(category_ids.c.category_ids)
+        stmt = stmt.outerjoin(category_ids, category_ids.c.product_id == Product.id)
+
+    own = len(projection.columns)
+    for row in _execute(db_session, stmt.add_columns(*columns), batch_size):
+        product = projection.to_dict(row[:own])
+        if with_supplier:
+            supplier = row[supplier_at:supplier_at + len(SUPPLIER_PROJECTION.columns)]
+            product['supplier'] = SUPPLIER_PROJECTION.to_dict(supplier) if supplier[0] is not None else None
+        if with_categories:
+            product['category_ids'] = row[-1] or []
+        yield product
+
+
+def iter_packaging_materials(db_session, batch_size=None, fields=None):
+    """Матеріали пакування з вкладеним постачальником (або None)."""
+    projection = PACKAGING_MATERIAL_PROJECTION.only(fields)
+    columns = list(projection.columns)
+    stmt = select().select_from(PackagingMaterial).order_by(PackagingMaterial.id)
+
+    with_supplier = _wants(fields, 'supplier')
+    if with_supplier:
+        columns += PACKAGING_SUPPLIER_PROJECTION.columns
+        stmt = stmt.outerjoin(PackagingMaterialSupplier,
+                              PackagingMaterialSupplier.id == PackagingMaterial.packaging_material_supplier_id)
+
+    own = len(projection.columns)
+    for row in _execute(db_session, stmt.add_columns(*columns), batch_size):
+        material = projection.to_dict(row[:own])
+        if with_supplier:
+            material['supplier'] = (
+                PACKAGING_SUPPLIER_PROJECTION.to_dict(row[own:]) if row[own] is not None else None
+            )
+        yield material
+
+
+def iter_customers(db_session, batch_size=None, fields=None):
+    projection = CUSTOMER_PROJECTION.only(fields)
+    stmt = select(*projection.columns).order_by(Customer.id)
+    return map(projection.to_dict, _execute(db_session, stmt, batch_size))
+
+
+def list_suppliers(db_session, fields=None):
+    """Постачальники товарів, потім пакування (кожні за назвою), з полем type: product | packaging."""
+    result = []
+    for model, projection, supplier_type in (
+        (Supplier, SUPPLIER_PROJECTION, 'product'),
+        (PackagingMaterialSupplier, PACKAGING_SUPPLIER_PROJECTION, 'packaging'),
+    ):
+        projection = projection.only(fields)
+        if _wants(fields, 'type'):
+            projection = Projection([*projection.fields, ('type', literal(supplier_type), None)])
+        stmt = select(*projection.columns).select_from(model).order_by(model.name)
+        result.extend(map(projection.to_dict, db_session.execute(stmt)))
+    return result
+
+
+def _gift_set_items(db_session, link, item_column, item_model, name_column, price_column, item_type, gift_set_ids):
+    """Склад наборів одним запитом: {gift_set_id: [позиції у форматі GiftSet.to_dict()]}."""
+    id_key = 'product_id' if item_type == 'product' else 'packaging_id'
+    rows = db_session.execute(
+        select(link.gift_set_id, item_column, name_column, link.quantity, price_column)
+            .join(item_model, item_model.id == item_column)
+            .where(link.gift_set_id.in_(gift_set_ids))
+            .order_by(link.id)
+    )
+    items = defaultdict(list)
+    for gift_set_id, item_id, name, quantity, price in rows:
+        items[gift_set_id].append(
+            {id_key: item_id, "name": name, "type": item_type, "quantity": quantity, "price": price}
+        )
+    return items
+
+
+def list_gift_sets(db_session, filters=(), fields=None):
+    """
+    Набори у форматі GiftSet.to_dict(); склад (products, packagings) — двома запитами на всі набори
+    замість лінивого завантаження по кожному набору, і лише якщо його просили у fields.
+    """
+    projection = GIFT_SET_PROJECTION.only(fields)
+    rows = db_session.execute(
+        select(GiftSet.id, *projection.columns).where(*filters).order_by(GiftSet.id)
+    ).all()
+    gift_set_ids = [row[0] for row in rows]
+
+    parts = {}
+    if rows and _wants(fields, 'products'):
+        parts['products'] = _gift_set_items(
+            db_session, GiftSetProduct, GiftSetProduct.product_id, Product, Product.name,
+            Product.purchase_price_per_item, 'product', gift_set_ids
+        )
+    if rows and _wants(fields, 'packagings'):
+        parts['packagings'] = _gift_set_items(
+            db_session, GiftSetPackaging, GiftSetPackaging.packaging_id, PackagingMaterial, PackagingMaterial.name,
+            PackagingMaterial.purchase_price_per_unit, 'packaging', gift_set_ids
+        )
+
+    result = []
+    for gift_set_id, *values in rows:
+        gift_set = projection.to_dict(values)
+        for key, items in parts.items():
+            gift_set[key] = items.get(gift_set_id, [])
+        result.append(gift_set)
+    return result
+
+
+def iter_investments(db_session, batch_size=None):
+    stmt = select(*INVESTMENT_PROJECTION.columns).order_by(OtherInvestment.id)
+    return map(INVESTMENT_PROJECTION.to_dict, _execute(db_session, stmt, batch_size))
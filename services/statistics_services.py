@@ -1,7 +1,11 @@
-from flask import Blueprint
-from sqlalchemy import func, extract
+from datetime import datetime
 
-from models import SaleHistory, PurchaseHistory, Product
+from flask import Blueprint, request
+from sqlalchemy import func, select, case, literal, literal_column, cast, union_all, Date
+
+from models import SaleHistory, Product, MonthlyRollup, PackagingPurchaseHistory, OtherInvestment
+from services.rollup_service import get_monthly_metrics, SALES_TOTAL, SALES_QUANTITY, SALES_PROFIT, SALES_COUNT, \
+    PURCHASES_TOTAL, PURCHASES_QUANTITY, PURCHASES_PRICE_SUM, PURCHASES_COUNT
 
 statistics_services_bp = Blueprint('statistics_services', __name__)
 
@@ -10,29 +14,19 @@ statistics_services_bp = Blueprint('statistics_services', __name__)
 def get_monthly_sales_statistics():
     from postgreSQLConnect import db_session
 
-    results = (
-        db_session.query(
-            extract('year', SaleHistory.sale_date).label("year"),
-            extract('month', SaleHistory.sale_date).label("month"),
-            func.sum(SaleHistory.selling_total_price).label("total_sales"),
-            func.sum(SaleHistory.quantity_sold).label("total_quantity"),
-            func.sum(SaleHistory.profit).label("total_profit")
-        )
-        .group_by(extract('year', SaleHistory.sale_date), extract('month', SaleHistory.sale_date))
-        .order_by(extract('year', SaleHistory.sale_date), extract('month', SaleHistory.sale_date))
-        .all()
-    )
+    months = get_monthly_metrics(db_session, [SALES_TOTAL, SALES_QUANTITY, SALES_PROFIT, SALES_COUNT])
 
     # Формуємо у зручний формат для фронтенду
     return [
         {
-            "year": int(r.year),
-            "month": int(r.month),
-            "total_sales": float(r.total_sales),
-            "total_quantity": int(r.total_quantity),
-            "total_profit": float(r.total_profit)
+            "year": year,
+            "month": month,
+            "total_sales": values[SALES_TOTAL],
+            "total_quantity": int(values[SALES_QUANTITY]),
+            "total_profit": values[SALES_PROFIT]
         }
-        for r in results
+        for (year, month), values in months.items()
+        if values[SALES_COUNT] > 0
     ]
 
 
@@ -40,29 +34,20 @@ def get_monthly_sales_statistics():
 def get_monthly_purchases_statistics():
     from postgreSQLConnect import db_session
 
-    results = (
-        db_session.query(
-            extract('year', PurchaseHistory.purchase_date).label("year"),
-            extract('month', PurchaseHistory.purchase_date).label("month"),
-            func.sum(PurchaseHistory.purchase_total_price).label("total_spent"),
-            func.sum(PurchaseHistory.quantity_purchase).label("total_quantity"),
-            func.avg(PurchaseHistory.purchase_price_per_item).label("avg_price")
-        )
-        .group_by(extract('year', PurchaseHistory.purchase_date), extract('month', PurchaseHistory.purchase_date))
-        .order_by(extract('year', PurchaseHistory.purchase_date), extract('month', PurchaseHistory.purchase_date))
-        .all()
-    )
+    months = get_monthly_metrics(db_session,
+                                 [PURCHASES_TOTAL, PURCHASES_QUANTITY, PURCHASES_PRICE_SUM, PURCHASES_COUNT])
 
     # Форматуємо результат для фронтенду
     return [
         {
-            "year": int(r.year),
-            "month": int(r.month),
-            "total_spent": float(r.total_spent),
-            "total_quantity": float(r.total_quantity),
-            "avg_price": float(r.avg_price)
+            "year": year,
+            "month": month,
+            "total_spent": values[PURCHASES_TOTAL],
+            "total_quantity": values[PURCHASES_QUANTITY],
+            "avg_price": values[PURCHASES_PRICE_SUM] / values[PURCHASES_COUNT]
         }
-        for r in results
+        for (year, month), values in months.items()
+        if values[PURCHASES_COUNT] > 0
     ]
 
 
@@ -82,47 +67,115 @@ def get_stock_levels():
     ]
 
 
-@statistics_services_bp.route("/profit-expense", methods=["GET"])
-def get_profit_expense_by_month():
-    # Продажі по місяцях
-    from postgreSQLConnect import db_session
+def parse_month(value):
+    """'YYYY-MM' або 'YYYY-MM-DD' -> перше число місяця."""
+    for fmt in ('%Y-%m', '%Y-%m-%d'):
+        try:
+            return datetime.strptime(value, fmt).date().replace(day=1)
+        except ValueError:
+            continue
+    raise ValueError(f"Invalid month: {value}")
+
+
+def build_profit_expense_query(date_from=None, date_to=None):
+    """
+    Один SQL-запит: помісячні продажі/прибуток і всі витрати (закупки товарів, пакування,
+    інші вкладення), приєднані до безперервного ряду місяців від date_from до date_to.
+
+    Якщо межі не задані, ряд охоплює місяці від найранішої до найпізнішої активності.
+    """
+    # Продажі та закупки товарів — з monthly_rollup
+    rollup_metric = lambda metric: func.sum(case((MonthlyRollup.metric == metric, MonthlyRollup.value), else_=0))
+    rollup = (
+        select(
+            func.make_date(MonthlyRollup.year, MonthlyRollup.month, 1).label('month'),
+            rollup_metric(SALES_TOTAL).label('sales'),
+            rollup_metric(SALES_PROFIT).label('profit'),
+            rollup_metric(PURCHASES_TOTAL).label('purchases'),
+            literal(0).label('packaging'),
+            literal(0).label('other')
+        )
+            .where(MonthlyRollup.metric.in_([SALES_TOTAL, SALES_PROFIT, PURCHASES_TOTAL]))
+            .group_by(MonthlyRollup.year, MonthlyRollup.month)
+    )
 
-    sales = (
-        db_session.query(
-            extract('year', SaleHistory.sale_date).label("year"),
-            extract('month', SaleHistory.sale_date).label("month"),
-            func.sum(SaleHistory.selling_total_price).label("total_sales"),
-            func.sum(SaleHistory.profit).label("total_profit")
+    # Закупки пакування
+    packaging_month = cast(func.date_trunc('month', PackagingPurchaseHistory.purchase_date), Date)
+    packaging = (
+        select(
+            packaging_month.label('month'),
+            literal(0), literal(0), literal(0),
+            func.sum(PackagingPurchaseHistory.purchase_total_price),
+            literal(0)
         )
-        .group_by(extract('year', SaleHistory.sale_date), extract('month', SaleHistory.sale_date))
-        .order_by(extract('year', SaleHistory.sale_date), extract('month', SaleHistory.sale_date))
-        .all()
+            .group_by(packaging_month)
     )
 
-    # Закупки по місяцях
-    purchases = (
-        db_session.query(
-            extract('year', PurchaseHistory.purchase_date).label("year"),
-            extract('month', PurchaseHistory.purchase_date).label("month"),
-            func.sum(PurchaseHistory.purchase_total_price).label("total_spent")
+    # Інші вкладення
+    other_month = cast(func.date_trunc('month', OtherInvestment.date), Date)
+    other = (
+        select(
+            other_month.label('month'),
+            literal(0), literal(0), literal(0), literal(0),
+            func.sum(OtherInvestment.cost)
         )
-        .group_by(extract('year', PurchaseHistory.purchase_date), extract('month', PurchaseHistory.purchase_date))
-        .all()
+            .group_by(other_month)
+    )
+
+    activity = union_all(rollup, packaging, other).cte('activity')
+
+    start = literal(date_from, Date) if date_from else select(func.min(activity.c.month)).scalar_subquery()
+    end = literal(date_to, Date) if date_to else select(func.max(activity.c.month)).scalar_subquery()
+    months = select(
+        cast(func.generate_series(start, end, literal_column("interval '1 month'")), Date).label('month')
+    ).cte('months')
+
+    total = lambda column: func.coalesce(func.sum(column), 0)
+    return (
+        select(
+            months.c.month,
+            total(activity.c.sales).label('sales'),
+            total(activity.c.profit).label('profit'),
+            total(activity.c.purchases).label('purchases'),
+            total(activity.c.packaging).label('packaging'),
+            total(activity.c.other).label('other')
+        )
+            .select_from(months.outerjoin(activity, activity.c.month == months.c.month))
+            .group_by(months.c.month)
+            .order_by(months.c.month)
     )
 
-    # Об’єднуємо дані по місяцях
-    stats = []
-    for s in sales:
-        month_purchase = next((p for p in purchases if int(p.year) == int(s.year) and int(p.month) == int(s.month)),
-                              None)
-        stats.append({
-            "year": int(s.year),
-            "month": int(s.month),
-            "sales": float(s.total_sales),
-            "profit": float(s.total_profit),
-            "expenses": float(month_purchase.total_spent) if month_purchase else 0
-        })
-    return stats
+
+@statistics_services_bp.route("/profit-expense", methods=["GET"])
+def get_profit_expense_by_month():
+    """
+    Продажі, прибуток і витрати по місяцях без пропусків.
+
+    Параметри: date_from, date_to у форматі YYYY-MM (або YYYY-MM-DD).
+    """
+    from postgreSQLConnect import db_session
+
+    try:
+        date_from = parse_month(request.args['date_from']) if request.args.get('date_from') else None
+        date_to = parse_month(request.args['date_to']) if request.args.get('date_to') else None
+    except ValueError as e:
+        return {"error": str(e)}, 400
+
+    results = db_session.execute(build_profit_expense_query(date_from, date_to)).all()
+
+    return [
+        {
+            "year": r.month.year,
+            "month": r.month.month,
+            "sales": float(r.sales),
+            "profit": float(r.profit),
+            "expenses": float(r.purchases) + float(r.packaging) + float(r.other),
+            "purchases": float(r.purchases),
+            "packaging_purchases": float(r.packaging),
+            "other_investments": float(r.other)
+        }
+        for r in results
+    ]
 
 
 @statistics_services_bp.route("/customer-activity", methods=["GET"])
@@ -0,0 +1,25 @@
+from flask import Response, current_app, request, stream_with_context
+
+NDJSON_MIMETYPE = 'application/x-ndjson'
+
+# Скільки рядків за раз забирати з серверного курсора під час стрімінгу
+STREAM_BATCH_SIZE = 1000
+
+
+def wants_ndjson():
+    """Чи просить клієнт потокову відповідь (Accept: application/x-ndjson)."""
+    return request.accept_mimetypes.best_match(['application/json', NDJSON_MIMETYPE]) == NDJSON_MIMETYPE
+
+
+def ndjson_response(rows):
+    """
+    Віддає рядки клієнту по одному JSON-об'єкту на рядок, не збираючи весь список у пам'яті.
+
+    :param rows: Ітератор словників; читається ліниво під час відправки відповіді.
+    """
+
+    def generate():
+        for row in rows:
+            yield current_app.json.dumps(row) + '\n'
+
+    return Response(stream_with_context(generate()), mimetype=NDJSON_MIMETYPE)
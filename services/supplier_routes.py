@@ -2,7 +2,9 @@ from flask import Blueprint, jsonify, request
 from flask_restx import Resource
 
 from api.supplier_routes import supplier_ns
-from models import Supplier, PurchaseHistory, Product, PackagingMaterialSupplier
+from models import Supplier, PurchaseHistory, Product
+from services.cache import reference_cache, SUPPLIERS_LIST_KEY
+from services.serializers import list_suppliers, parse_fields, SUPPLIER_FIELDS
 from sqlalchemy.exc import IntegrityError
 
 # Create Blueprint for suppliers
@@ -38,6 +40,7 @@ def create_supplier():
         )
         db_session.add(supplier)
         db_session.commit()
+        reference_cache.invalidate(SUPPLIERS_LIST_KEY)
 
         return jsonify({'message': 'Supplier created successfully', 'supplier_id': supplier.id}), 201
     except IntegrityError as e:
@@ -61,20 +64,19 @@ class SupplierList(Resource):
 
 
     def get(self):
+        """?fields=id,name,... — лише вказані поля."""
         from postgreSQLConnect import db_session
 
-        product_suppliers = db_session.query(Supplier).order_by(Supplier.name).all()
-        packaging_suppliers = db_session.query(PackagingMaterialSupplier).order_by(
-            PackagingMaterialSupplier.name
-        ).all()
+        try:
+            fields = parse_fields(request.args.get('fields'), SUPPLIER_FIELDS)
+        except ValueError as e:
+            return {'error': str(e)}, 400
 
-        result = [
-            {**s.to_dict(), "type": "product"} for s in product_suppliers
-        ] + [
-            {**s.to_dict(), "type": "packaging"} for s in packaging_suppliers
-        ]
+        if fields is not None:
+            # У кеші лише повний список; вузькі вибірки дешеві й так
+            return list_suppliers(db_session, fields), 200
 
-        return result, 200
+        return reference_cache.get_or_load(SUPPLIERS_LIST_KEY, lambda: list_suppliers(db_session)), 200
 
 
 
@@ -166,6 +168,7 @@ def delete_supplier(supplier_id):
     try:
         db_session.delete(supplier)
         db_session.commit()
+        reference_cache.invalidate(SUPPLIERS_LIST_KEY)
         return jsonify({'message': 'Supplier deleted successfully'}), 200
     except Exception as e:
         db_session.rollback()
@@ -197,6 +200,7 @@ def update_supplier(supplier_id):
 
     try:
         db_session.commit()
+        reference_cache.invalidate(SUPPLIERS_LIST_KEY)
         return jsonify({'message': 'Supplier updated successfully'}), 200
     except IntegrityError as e:
         db_session.rollback()
@@ -0,0 +1,156 @@
+"""
+Версії таблиць і умовні GET (ETag / Last-Modified) для списків.
+
+Кожна транзакція сесії, що виконала INSERT/UPDATE/DELETE у таблицю (flush ORM-об'єктів чи
+insert/update/delete через session.execute), при commit збільшує лічильник таблиці в table_versions. Список
+залежить від кількох таблиць; його ETag — хеш їхніх версій, тож перевірка If-None-Match коштує
+один запит по первинному ключу замість вибірки й серіалізації всього списку.
+
+Записи в обхід сесії (сирий SQL через text(), COPY) лічильник не бачать — такий код має
+викликати touch_tables сам.
+"""
+import hashlib
+from functools import wraps
+
+from flask import Response, request
+from sqlalchemy import event, func, select
+from sqlalchemy.dialects.postgresql import insert
+from werkzeug.http import http_date, is_resource_modified, quote_etag
+
+from models import Base, TableVersion
+from postgreSQLConnect import engine, Session
+from services.streaming import wants_ndjson
+
+_PENDING_KEY = 'table_versions_pending'
+
+
+def _table_name(source):
+    """Назва таблиці для моделі, об'єкта Table або рядка."""
+    table = getattr(source, '__table__', source)
+    return getattr(table, 'name', table)
+
+
+def _tracked(name):
+    return name in Base.metadata.tables and name != TableVersion.__tablename__
+
+
+def _pending(conn):
+    return conn.info.setdefault(_PENDING_KEY, set())
+
+
+def touch_tables(connection, tables):
+    """
+    Збільшує версії таблиць одним INSERT ... ON CONFLICT DO UPDATE.
+
+    :param connection: Сесія або з'єднання, у транзакції якого треба записати зміни.
+    :param tables: Назви таблиць (або моделі).
+    """
+    names = sorted({_table_name(table) for table in tables})  # Один порядок блокувань для всіх транзакцій
+    if not names:
+        return
+
+    table = TableVersion.__table__
+    stmt = insert(table).values([{'table_name': name, 'version': 1, 'updated_at': func.clock_timestamp()}
+                                 for name in names])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['table_name'],
+        set_={'version': table.c.version + 1, 'updated_at': stmt.excluded.updated_at}
+    )
+    connection.execute(stmt)
+
+
+@event.listens_for(engine, 'after_execute')
+def collect_written_tables(conn, clauseelement, multiparams, params, execution_options, result):
+    # Рівень з'єднання бачить і INSERT/UPDATE/DELETE з flush, і Core-запити через session.execute
+    if getattr(clauseelement, 'is_dml', False):
+        name = clauseelement.table.name
+        if _tracked(name):
+            _pending(conn).add(name)
+
+
+@event.listens_for(engine, 'rollback')
+def discard_pending_tables(conn):
+    conn.info.pop(_PENDING_KEY, None)
+
+
+@event.listens_for(Session, 'before_commit')
+def bump_table_versions(session):
+    # before_commit викликається до фінального flush — скидаємо зміни самі, щоб зібрати всі таблиці
+    session.flush()
+    connection = session.connection()
+    tables = connection.info.pop(_PENDING_KEY, None)
+    if tables:
+        touch_tables(connection, tables)
+
+
+def get_table_versions(db_session, tables):
+    """Повертає {назва таблиці: (version, updated_at)}; таблиці без записів у table_versions пропускає."""
+    rows = db_session.execute(
+        select(TableVersion.table_name, TableVersion.version, TableVersion.updated_at)
+            .where(TableVersion.table_name.in_(tables))
+    )
+    return {row.table_name: (row.version, row.updated_at) for row in rows}
+
+
+def _validators(tables):
+    """(etag, last_modified) списку в поточному запиті."""
+    from postgreSQLConnect import db_session
+
+    versions = get_table_versions(db_session, tables)
+    digest = hashlib.sha1(request.full_path.encode())
+    digest.update(b'ndjson' if wants_ndjson() else b'json')
+    for name in tables:
+        version, updated_at = versions.get(name, (0, None))
+        # Час зміни теж у хеші: після перестворення бази лічильники починаються спочатку
+        digest.update(f'{name}:{version}:{updated_at.isoformat() if updated_at else ""};'.encode())
+
+    modified = [updated_at for _, updated_at in versions.values()]
+    return digest.hexdigest()[:32], max(modified) if modified else None
+
+
+def _with_headers(rv, headers):
+    """Додає заголовки до відповіді обробника, якщо це успішна відповідь."""
+    if isinstance(rv, Response):
+        if rv.status_code == 200:
+            rv.headers.update(headers)
+        return rv
+
+    if not isinstance(rv, tuple):
+        rv = (rv, 200)
+    body, status, *rest = rv
+    if status != 200:
+        return rv
+    return body, status, {**(rest[0] if rest else {}), **headers}
+
+
+def conditional_get(*sources):
+    """
+    Декоратор GET-обробника списку: ETag і Last-Modified з версій таблиць, від яких залежить список.
+
+    Якщо If-None-Match / If-Modified-Since збігаються — одразу 304, без запиту списку та серіалізації.
+    Має стояти зовнішнім (найвищим) декоратором, над marshal_with тощо.
+
+    :param sources: Моделі або таблиці, з яких складається відповідь.
+    """
+    tables = sorted({_table_name(source) for source in sources})
+
+    def decorator(handler):
+        @wraps(handler)
+        def wrapper(*args, **kwargs):
+            etag, last_modified = _validators(tables)
+            headers = {
+                'ETag': quote_etag(etag, weak=True),
+                'Cache-Control': 'no-cache',  # Кешувати можна, але щоразу з перевіркою
+                'Vary': 'Accept',
+            }
+            if last_modified is not None:
+                headers['Last-Modified'] = http_date(last_modified)
+
+            if not is_resource_modified(request.environ, etag=etag, last_modified=last_modified):
+                return Response(status=304, headers=headers)
+
+            return _with_headers(handler(*args, **kwargs), headers)
+
+        return wrapper
+
+    return decorator
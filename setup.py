@@ -8,5 +8,10 @@ setup(
     license='',
     author='Aleksandr',
     author_email='aleksdark13@gmail.com',
-    description='crm back'
+    description='crm back',
+    # Необов'язкові можливості (див. requirements-optional.txt)
+    extras_require={
+        'parquet': ['pyarrow>=14'],
+        'brotli': ['brotli>=1.1'],
+    },
 )
@@ -0,0 +1,107 @@
+"""Мінімальні дані для тестів: постачальники, клієнти, товари, пакування та історія продажів."""
+from datetime import datetime, timedelta
+from decimal import Decimal
+from itertools import count
+
+from models import Product, Supplier, Customer, Category, SaleHistory, PackagingMaterial, PackagingMaterialSupplier, \
+    PackagingSaleHistory, GiftSet, GiftSetProduct, GiftSetPackaging, GiftSetSalesHistory, GiftSetSalesHistoryProduct, \
+    GiftSetSalesHistoryPackaging, PurchaseHistory
+
+_numbers = count(1)
+
+BASE_DATE = datetime(2024, 1, 1)
+
+
+def make_supplier(db_session, **values):
+    supplier = Supplier(name=f'Supplier {next(_numbers)}', **values)
+    db_session.add(supplier)
+    db_session.flush()
+    return supplier
+
+
+def make_customer(db_session, **values):
+    customer = Customer(name=f'Customer {next(_numbers)}', **values)
+    db_session.add(customer)
+    db_session.flush()
+    return customer
+
+
+def make_product(db_session, quantity=100, supplier=None, categories=(), **values):
+    number = next(_numbers)
+    fields = dict(
+        name=f'Product {number}', total_quantity=quantity, available_quantity=quantity, sold_quantity=0,
+        reserved_quantity=0, selling_quantity=0, purchase_price_per_item=Decimal('2.50'),
+        purchase_total_price=Decimal('2.50') * quantity, selling_price_per_item=Decimal('5.00'),
+        selling_total_price=Decimal('0'), article=f'TST-{number:06d}',
+    )
+    fields.update(values)
+    product = Product(supplier=supplier, **fields)
+    product.categories = list(categories)
+    db_session.add(product)
+    db_session.flush()
+    return product
+
+
+def make_packaging(db_session, quantity=100, supplier=None, **values):
+    fields = dict(
+        name=f'Box {next(_numbers)}', total_quantity=quantity, available_quantity=quantity, reserved_quantity=0,
+        sold_quantity=0, purchase_price_per_unit=Decimal('1.00'),
+    )
+    fields.update(values)
+    packaging = PackagingMaterial(packaging_material_supplier=supplier, **fields)
+    db_session.add(packaging)
+    db_session.flush()
+    return packaging
+
+
+def seed_sales_history(db_session, n_sales, n_gift_sets):
+    """
+    Продажі товарів (кожен другий — з пакуванням) і продані подарункові набори.
+
+    Довідники однакові за будь-якого n_sales, тож від кількості рядків залежать лише таблиці історії.
+    """
+    supplier = make_supplier(db_session)
+    packaging_supplier = PackagingMaterialSupplier(name=f'Packaging supplier {next(_numbers)}')
+    db_session.add(packaging_supplier)
+    categories = [Category(name=f'Category {next(_numbers)}') for _ in range(3)]
+    db_session.add_all(categories)
+    customers = [make_customer(db_session) for _ in range(3)]
+    products = [make_product(db_session, supplier=supplier, categories=categories[:i % 3 + 1]) for i in range(5)]
+    packaging = make_packaging(db_session, supplier=packaging_supplier)
+
+    for i in range(n_sales):
+        product = products[i % len(products)]
+        sale_date = BASE_DATE + timedelta(days=i)
+        with_packaging = bool(i % 2)
+        sale = SaleHistory(
+            product=product, customer_id=customers[i % 3].id, quantity_sold=1,
+            selling_price_per_item=Decimal('5'), selling_total_price=Decimal('5'), sale_date=sale_date,
+            profit=Decimal('2.5'), packaging_material_id=packaging.id if with_packaging else None,
+            packaging_quantity=1 if with_packaging else 0, total_packaging_cost=1 if with_packaging else 0,
+        )
+        db_session.add(sale)
+        db_session.flush()
+        if with_packaging:
+            db_session.add(PackagingSaleHistory(sale_id=sale.id, packaging_material_id=packaging.id,
+                                                packaging_quantity=1, total_packaging_cost=Decimal('1'),
+                                                sale_date=sale_date))
+        db_session.add(PurchaseHistory(product=product, supplier=supplier, purchase_price_per_item=Decimal('2.5'),
+                                       purchase_total_price=Decimal('25'), purchase_date=sale_date.date(),
+                                       quantity_purchase=10))
+
+    for j in range(n_gift_sets):
+        gift_set = GiftSet(name=f'Gift set {j}', description='', total_price=10, gift_selling_price=20, is_sold=True)
+        db_session.add(gift_set)
+        db_session.flush()
+        item = GiftSetProduct(gift_set_id=gift_set.id, product_id=products[j % len(products)].id, quantity=2)
+        box = GiftSetPackaging(gift_set_id=gift_set.id, packaging_id=packaging.id, quantity=1)
+        db_session.add_all([item, box])
+        db_session.flush()
+        record = GiftSetSalesHistory(gift_set_id=gift_set.id, sold_price=20, quantity=1,
+                                     customer_id=customers[j % 3].id,
+                                     sold_at=BASE_DATE + timedelta(days=j, hours=1))
+        record.sales_history_products.append(GiftSetSalesHistoryProduct(gift_set_product=item, quantity=2))
+        record.sales_history_packagings.append(GiftSetSalesHistoryPackaging(gift_set_packaging=box, quantity=1))
+        db_session.add(record)
+
+    db_session.commit()
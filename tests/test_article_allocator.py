@@ -0,0 +1,62 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import func, select
+
+from models import Product, Category
+from services.article_allocator import next_article, reserve_articles
+from services.product_service import ProductService
+from tests.factories import make_supplier
+
+CREATES = 200
+RESERVATIONS = 20
+RESERVATION_SIZE = 25
+WORKERS = 16
+
+
+def test_parallel_creates_and_reservations_get_unique_articles(db_session):
+    supplier = make_supplier(db_session)
+    category = Category(name='Parallel')
+    db_session.add(category)
+    db_session.commit()
+    product_data = {
+        'name': None, 'category_ids': [category.id], 'created_date': '2024-01-01', 'product_description': '',
+        'available_quantity': 5, 'purchase_price_per_item': '2.50', 'purchase_total_price': '12.50',
+        'supplier_id': supplier.id,
+    }
+    db_session.remove()
+
+    def create(i):
+        try:
+            result, status = ProductService.create_product({**product_data, 'name': f'Parallel product {i}'})
+            return status, [result.get('article')], result
+        finally:
+            db_session.remove()
+
+    def reserve(_):
+        try:
+            return 201, reserve_articles(db_session, RESERVATION_SIZE), None
+        finally:
+            db_session.remove()
+
+    def single(_):
+        try:
+            return 201, [next_article(db_session)], None
+        finally:
+            db_session.remove()
+
+    tasks = [(create, i) for i in range(CREATES)]
+    tasks += [(reserve, i) for i in range(RESERVATIONS)] + [(single, i) for i in range(RESERVATIONS)]
+    tasks.sort(key=lambda task: task[1])  # Перемішуємо типи викликів між собою
+
+    with ThreadPoolExecutor(max_workers=WORKERS) as pool:
+        results = list(pool.map(lambda task: task[0](task[1]), tasks))
+
+    failures = [result for status, _, result in results if status != 201]
+    assert not failures  # IntegrityError у create_product повернувся б як 500
+
+    articles = [article for _, batch, _ in results for article in batch]
+    assert len(articles) == CREATES + RESERVATIONS * RESERVATION_SIZE + RESERVATIONS
+    assert len(set(articles)) == len(articles)
+
+    stored = db_session.execute(select(func.count(Product.id), func.count(Product.article.distinct()))).one()
+    assert tuple(stored) == (CREATES, CREATES)
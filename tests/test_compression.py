@@ -0,0 +1,74 @@
+import json
+import zlib
+
+import pytest
+
+from services.compression import GzipEncoder, BrotliEncoder
+from tests.factories import make_product
+
+CHUNKS = [f'{{"row": {i}, "name": "Product {i}"}}\n'.encode() for i in range(50)]
+
+
+def _gzip_prefixes(parts):
+    """Скільки даних можна розпакувати після кожної частини стисненого потоку."""
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    prefix = b''
+    for part in parts:
+        prefix += decompressor.decompress(part)
+        yield prefix
+
+
+def test_gzip_stream_flushes_every_chunk():
+    parts = list(GzipEncoder(flush_size=0).stream(iter(CHUNKS)))
+
+    # Частина на кожен вхідний фрагмент і завершення gzip
+    assert len(parts) == len(CHUNKS) + 1
+    prefixes = list(_gzip_prefixes(parts))
+    for i, prefix in enumerate(prefixes[:-1]):
+        assert prefix == b''.join(CHUNKS[:i + 1])
+    assert prefixes[-1] == b''.join(CHUNKS)
+
+
+def test_gzip_stream_flushes_by_size():
+    chunk_size = len(CHUNKS[0])
+    parts = list(GzipEncoder(flush_size=chunk_size * 10).stream(iter(CHUNKS)))
+
+    # Фрагменти однакової довжини: flush після кожних десяти (останній збігається із завершенням)
+    assert len(parts) == len(CHUNKS) // 10 + 1
+    for i, prefix in enumerate(list(_gzip_prefixes(parts))[:-1]):
+        assert prefix == b''.join(CHUNKS[:(i + 1) * 10])
+
+
+def test_brotli_stream_flushes_every_chunk():
+    brotli = pytest.importorskip('brotli')
+
+    parts = list(BrotliEncoder(flush_size=0).stream(iter(CHUNKS)))
+
+    assert len(parts) == len(CHUNKS) + 1
+    decompressor = brotli.Decompressor()
+    prefix = b''
+    for i, part in enumerate(parts[:-1]):
+        prefix += decompressor.process(part)
+        assert prefix == b''.join(CHUNKS[:i + 1])
+
+
+def test_ndjson_response_arrives_in_parts(db_session, client):
+    for _ in range(300):
+        make_product(db_session, product_description='x' * 200)
+    db_session.commit()
+    db_session.remove()
+
+    response = client.get('/api/get_all_products/', buffered=False, headers={
+        'Accept': 'application/x-ndjson', 'Accept-Encoding': 'gzip',
+    })
+    assert response.headers['Content-Encoding'] == 'gzip'
+    parts = [part for part in response.response if part]
+    response.close()
+
+    # ~100 КіБ NDJSON приходить кількома частинами, і кожна розпаковується в цілі рядки
+    assert len(parts) > 3
+    prefixes = list(_gzip_prefixes(parts))
+    for prefix in prefixes[:-1]:
+        assert prefix and prefix.endswith(b'\n')
+    rows = [json.loads(line) for line in prefixes[-1].splitlines()]
+    assert len(rows) == 300
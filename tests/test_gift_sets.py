@@ -0,0 +1,179 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import func, select
+
+from models import GiftSet, GiftSetProduct, GiftSetPackaging, GiftSetSalesHistory, GiftSetSalesHistoryProduct, \
+    GiftSetSalesHistoryPackaging, Product, PackagingMaterial, StockHistory, PackagingStockHistory
+from services.inventory_service import change_product_stock, InsufficientStockError, CHANGE_SALE
+from tests.factories import make_customer, make_product, make_packaging, make_supplier
+
+PRODUCT_QUANTITY = 100
+PACKAGING_QUANTITY = 60
+DIRECT_SALES = 120
+GIFT_SETS = 50
+WORKERS = 16
+
+
+def _count(db_session, model):
+    return db_session.scalar(select(func.count()).select_from(model))
+
+
+def _create_gift_set(client, name, product_id, packaging_id):
+    return client.post('/api/create_gift_set', json={
+        'name': name, 'description': '',
+        'items': [
+            {'item_type': 'product', 'item_id': product_id, 'quantity': 1},
+            {'item_type': 'packaging', 'item_id': packaging_id, 'quantity': 1},
+        ],
+    })
+
+
+def test_remove_sold_gift_set_deletes_sales_history(db_session, client):
+    product = make_product(db_session, quantity=10)
+    packaging = make_packaging(db_session, quantity=10)
+    customer = make_customer(db_session)
+    db_session.commit()
+    product_id, packaging_id, customer_id = product.id, packaging.id, customer.id
+    db_session.remove()
+
+    gift_set_id = _create_gift_set(client, 'Sold set', product_id, packaging_id).get_json()['id']
+    response = client.post(f'/api/sell_gift_set/{gift_set_id}', json={'customer_id': customer_id, 'selling_price': 20})
+    assert response.status_code == 200
+
+    response = client.delete(f'/api/remove_gift_set/{gift_set_id}')
+    assert response.status_code == 200, response.get_json()
+
+    for model in (GiftSet, GiftSetProduct, GiftSetPackaging, GiftSetSalesHistory, GiftSetSalesHistoryProduct,
+                  GiftSetSalesHistoryPackaging):
+        assert _count(db_session, model) == 0, model.__name__
+    # Проданий товар на склад не повертається
+    product = db_session.get(Product, product_id)
+    assert (product.available_quantity, product.reserved_quantity, product.sold_quantity) == (9, 0, 1)
+
+
+def test_update_sold_gift_set_is_rejected(db_session, client):
+    product = make_product(db_session, quantity=10)
+    packaging = make_packaging(db_session, quantity=10)
+    customer = make_customer(db_session)
+    db_session.commit()
+    product_id, packaging_id, customer_id = product.id, packaging.id, customer.id
+    db_session.remove()
+
+    gift_set_id = _create_gift_set(client, 'Sold set', product_id, packaging_id).get_json()['id']
+    client.post(f'/api/sell_gift_set/{gift_set_id}', json={'customer_id': customer_id, 'selling_price': 20})
+    # Резерв іншого набору: без перевірки is_sold його вистачило б, щоб «повернути» проданий товар на склад
+    _create_gift_set(client, 'Reserved set', product_id, packaging_id)
+
+    response = client.put(f'/api/update_gift_set/{gift_set_id}', json={
+        'name': 'Renamed set',
+        'items': [{'type': 'product', 'product_id': product_id, 'quantity': 2, 'price': 10}],
+    })
+    assert response.status_code == 400
+    assert 'error' in response.get_json()
+
+    # Набір, його склад, історія продажу і залишки не змінились
+    gift_set = db_session.get(GiftSet, gift_set_id)
+    assert (gift_set.name, gift_set.is_sold) == ('Sold set', True)
+    assert _count(db_session, GiftSetProduct) == _count(db_session, GiftSetPackaging) == 2
+    assert _count(db_session, GiftSetSalesHistoryProduct) == _count(db_session, GiftSetSalesHistoryPackaging) == 1
+    product = db_session.get(Product, product_id)
+    assert (product.available_quantity, product.reserved_quantity, product.sold_quantity) == (8, 1, 1)
+    packaging = db_session.get(PackagingMaterial, packaging_id)
+    assert (packaging.available_quantity, packaging.reserved_quantity, packaging.sold_quantity) == (8, 1, 1)
+
+
+def test_sell_gift_set_validates_customer(db_session, client):
+    product = make_product(db_session, quantity=10)
+    db_session.commit()
+    product_id = product.id
+    db_session.remove()
+
+    gift_set_id = client.post('/api/create_gift_set', json={
+        'name': 'Unsold set', 'description': '',
+        'items': [{'item_type': 'product', 'item_id': product_id, 'quantity': 1}],
+    }).get_json()['id']
+
+    cases = [
+        ({'selling_price': 20}, 400),
+        ({'customer_id': 1, 'selling_price': None}, 400),
+        ({'customer_id': 'abc', 'selling_price': 20}, 400),
+        ({'customer_id': 999999, 'selling_price': 20}, 404),
+    ]
+    for body, status in cases:
+        response = client.post(f'/api/sell_gift_set/{gift_set_id}', json=body)
+        assert response.status_code == status, body
+        assert 'error' in response.get_json()
+
+    assert db_session.get(GiftSet, gift_set_id).is_sold is False
+    assert _count(db_session, GiftSetSalesHistory) == 0
+
+
+def test_concurrent_sales_and_gift_sets_keep_stock_consistent(app, db_session):
+    """
+    Прямі продажі товару і створення/продаж наборів з того ж залишку йдуть паралельно.
+
+    Попит більший за залишок, тож частина операцій має отримати відмову, але жоден залишок
+    не стає від'ємним, кожен набір продається рівно один раз, а історія збігається з кількостями.
+    """
+    supplier = make_supplier(db_session)
+    product = make_product(db_session, quantity=PRODUCT_QUANTITY, supplier=supplier)
+    packaging = make_packaging(db_session, quantity=PACKAGING_QUANTITY)
+    customer = make_customer(db_session)
+    db_session.commit()
+    product_id, packaging_id, customer_id = product.id, packaging.id, customer.id
+    db_session.remove()
+
+    def direct_sale(_):
+        try:
+            change_product_stock(db_session, product_id, CHANGE_SALE, available=-1, sold=1)
+            db_session.commit()
+            return 'sold'
+        except InsufficientStockError:
+            db_session.rollback()
+            return 'rejected'
+        finally:
+            db_session.remove()
+
+    def gift_set(i):
+        client = app.test_client()
+        response = _create_gift_set(client, f'Stress set {i}', product_id, packaging_id)
+        if response.status_code != 201:
+            assert response.status_code == 400, response.get_json()
+            return 'rejected', []
+        gift_set_id = response.get_json()['id']
+        # Два паралельні продажі одного набору: пройти має рівно один
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            statuses = list(pool.map(
+                lambda _: app.test_client().post(
+                    f'/api/sell_gift_set/{gift_set_id}', json={'customer_id': customer_id, 'selling_price': 20}
+                ).status_code,
+                range(2),
+            ))
+        return 'created', statuses
+
+    with ThreadPoolExecutor(max_workers=WORKERS) as pool:
+        sales = pool.map(direct_sale, range(DIRECT_SALES))
+        gift_sets = pool.map(gift_set, range(GIFT_SETS))
+        sales, gift_sets = list(sales), list(gift_sets)
+
+    sold = sales.count('sold')
+    created = [statuses for outcome, statuses in gift_sets if outcome == 'created']
+    assert all(sorted(statuses) == [200, 400] for statuses in created)
+    assert sold + len(created) == PRODUCT_QUANTITY  # Попит більший за залишок — товар розібрано повністю
+    assert len(created) <= PACKAGING_QUANTITY
+
+    product = db_session.get(Product, product_id)
+    assert (product.available_quantity, product.reserved_quantity, product.sold_quantity) == \
+           (0, 0, sold + len(created))
+    packaging = db_session.get(PackagingMaterial, packaging_id)
+    assert (packaging.available_quantity, packaging.reserved_quantity, packaging.sold_quantity) == \
+           (PACKAGING_QUANTITY - len(created), 0, len(created))
+
+    assert _count(db_session, GiftSet) == len(created)
+    assert db_session.scalar(select(func.count()).where(GiftSet.is_sold.is_(True))) == len(created)
+    assert _count(db_session, GiftSetSalesHistory) == len(created)
+    assert _count(db_session, GiftSetSalesHistoryProduct) == len(created)
+    assert _count(db_session, GiftSetSalesHistoryPackaging) == len(created)
+    # Продаж, резерв і продаж набору — по запису в історії складу
+    assert _count(db_session, StockHistory) == sold + 2 * len(created)
+    assert _count(db_session, PackagingStockHistory) == 2 * len(created)
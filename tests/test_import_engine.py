@@ -0,0 +1,113 @@
+import csv
+from datetime import datetime
+
+from sqlalchemy import select, text
+
+from import_data_func.import_engine import import_products_files
+from models import Base, Product, Supplier, PurchaseHistory, StockHistory, MonthlyRollup
+
+HEADER = ['Наименование', 'Поставщик', 'Количество', 'Стоимость за 1 шт', 'Стоимость за количество']
+
+# Назви повторюються і в межах файлу (ціна «з останнього рядка»), і між файлами (надходження)
+FILES = {
+    '15.02.2023.csv': [
+        ['Свічка', 'Віск і Ко', '10 шт', '2,50', '25,00'],
+        ['Листівка', '', '5 шт', '1,00', '5,00'],
+        ['Свічка', 'Віск і Ко', '4 шт', '3,00', '12,00'],
+        ['', 'Віск і Ко', '1 шт', '1,00', '1,00'],  # Порожня назва — помилка рядка
+    ],
+    '15.03.2023.csv': [
+        ['Листівка', 'Папір', '7 шт', '1,20', '8,40'],
+        ['Чашка', 'Кераміка', '3 шт', '40,00', '120,00'],
+    ],
+    '15.05.2023.csv': [
+        ['Свічка', 'Віск і Ко', '6 шт', '2,75', '16,50'],
+        ['Чашка', 'Кераміка', 'багато', '40,00', '40,00'],  # Некоректна кількість
+        ['Чашка', 'Кераміка', '2 шт', '42,00', '84,00'],
+    ],
+    '15.09.2024.csv': [
+        ['Листівка', 'Папір', '20 шт', '0,90', '18,00'],
+        ['Магніт', 'Папір', '8 шт', '1,50', '12,00'],
+    ],
+}
+
+
+def _write_folder(directory):
+    files = []
+    for filename, rows in FILES.items():
+        path = directory / filename
+        with open(path, 'w', encoding='utf-8', newline='') as file:
+            writer = csv.writer(file)
+            writer.writerow(HEADER)
+            writer.writerows(rows)
+        files.append((str(path), datetime.strptime(filename[:-4], '%d.%m.%Y')))
+    return files
+
+
+def _snapshot(db_session):
+    """Стан бази після імпорту без id і артикулів (вони залежать від послідовностей)."""
+    products = db_session.execute(
+        select(Product.name, Supplier.name, Product.created_date, Product.total_quantity, Product.available_quantity,
+               Product.purchase_total_price, Product.purchase_price_per_item)
+            .join(Supplier, Product.supplier_id == Supplier.id)
+            .order_by(Product.name)
+    ).all()
+    purchases = db_session.execute(
+        select(Product.name, PurchaseHistory.purchase_date, PurchaseHistory.quantity_purchase,
+               PurchaseHistory.purchase_total_price, PurchaseHistory.purchase_price_per_item)
+            .join(Product, PurchaseHistory.product_id == Product.id)
+            .order_by(PurchaseHistory.id)
+    ).all()
+    stock = db_session.execute(
+        select(Product.name, StockHistory.change_amount, StockHistory.timestamp)
+            .join(Product, StockHistory.product_id == Product.id)
+            .order_by(StockHistory.id)
+    ).all()
+    rollup = db_session.execute(
+        select(MonthlyRollup.__table__).order_by(*MonthlyRollup.__table__.primary_key.columns)
+    ).all()
+    return products, purchases, stock, rollup
+
+
+def _import(db_session, files, workers):
+    report = import_products_files(db_session, files, workers=workers, batch_size=2)
+    db_session.remove()
+    state = _snapshot(db_session)
+    db_session.remove()
+    return report, state
+
+
+def test_parallel_parsing_matches_sequential_import(db_session, tmp_path):
+    from postgreSQLConnect import engine
+
+    files = _write_folder(tmp_path)
+
+    sequential_report, sequential = _import(db_session, files, workers=1)
+
+    with engine.begin() as conn:
+        conn.execute(text('TRUNCATE {} RESTART IDENTITY CASCADE'.format(
+            ', '.join(table.name for table in Base.metadata.sorted_tables))))
+    parallel_report, parallel = _import(db_session, files, workers=3)
+
+    assert (parallel_report.rows, parallel_report.inserted, parallel_report.updated) == \
+           (sequential_report.rows, sequential_report.inserted, sequential_report.updated) == (11, 4, 5)
+    assert sorted(parallel_report.errors) == sorted(sequential_report.errors)
+    assert [line_no for _, line_no, _ in sequential_report.errors] == [5, 3]
+
+    products, purchases, stock, rollup = parallel
+    assert parallel == sequential
+    # Дати надходжень ідуть за файлами, підсумки — накопичувальні по всіх файлах
+    assert [(name, date.isoformat()) for name, date, *_ in purchases] == [
+        ('Свічка', '2023-02-15'), ('Листівка', '2023-02-15'), ('Свічка', '2023-02-15'),
+        ('Листівка', '2023-03-15'), ('Чашка', '2023-03-15'),
+        ('Свічка', '2023-05-15'), ('Чашка', '2023-05-15'),
+        ('Листівка', '2024-09-15'), ('Магніт', '2024-09-15'),
+    ]
+    totals = {name: (quantity, str(total), str(price)) for name, _, _, quantity, _, total, price in products}
+    assert totals == {
+        'Листівка': (32, '31.40', '0.90'),
+        'Магніт': (8, '12.00', '1.50'),
+        'Свічка': (20, '53.50', '2.75'),
+        'Чашка': (5, '204.00', '42.00'),
+    }
+    assert rollup
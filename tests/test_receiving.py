@@ -0,0 +1,58 @@
+from decimal import Decimal
+
+from models import Product, PackagingMaterial, PurchaseHistory, StockHistory
+from tests.factories import make_product, make_packaging, make_supplier
+
+PRODUCT_FIELDS = ('total_quantity', 'available_quantity', 'selling_total_price', 'purchase_total_price',
+                  'purchase_price_per_item', 'supplier_id')
+PACKAGING_FIELDS = ('total_quantity', 'available_quantity', 'total_purchase_cost', 'available_stock_cost',
+                    'purchase_price_per_unit', 'status')
+
+
+def _fields(obj, fields):
+    return {field: getattr(obj, field) for field in fields}
+
+
+def test_delivery_updates_the_same_fields_as_single_purchases(db_session, client):
+    """Та сама закупівля через /product/<id>/purchase і через /receive_delivery дає однакові товари й пакування."""
+    supplier = make_supplier(db_session)
+    # Перша пара товарів уже мала продажі, у другої selling_total_price — NULL
+    products = [make_product(db_session, quantity=5, selling_total_price=Decimal('12.50')) for _ in range(2)] + \
+               [make_product(db_session, quantity=5, selling_total_price=None) for _ in range(2)]
+    packagings = [make_packaging(db_session, quantity=3, status='used') for _ in range(2)]
+    db_session.commit()
+    product_ids = [product.id for product in products]
+    packaging_ids = [packaging.id for packaging in packagings]
+    supplier_id = supplier.id
+    db_session.remove()
+
+    single, delivered = product_ids[0::2], product_ids[1::2]
+    for product_id in single:
+        response = client.post(f'/api/product/{product_id}/purchase', json={
+            'quantity': 4, 'purchase_price_per_item': '3.00', 'purchase_total_price': '12.00',
+            'supplier_id': supplier_id, 'purchase_date': '2024-03-01',
+        })
+        assert response.status_code == 201, response.get_json()
+    response = client.post('/api/purchase_current_packaging', json={
+        'material_id': packaging_ids[0], 'quantity': 4, 'purchase_price_per_unit': '1.50',
+        'total_purchase_cost': '6.00',
+    })
+    assert response.status_code == 200, response.get_json()
+
+    response = client.post('/api/receive_delivery', json={
+        'supplier_id': supplier_id, 'purchase_date': '2024-03-01',
+        'products': [{'product_id': product_id, 'quantity': 4, 'purchase_price_per_item': '3.00',
+                      'purchase_total_price': '12.00'} for product_id in delivered],
+        'packaging': [{'packaging_id': packaging_ids[1], 'quantity': 4, 'purchase_price_per_unit': '1.50',
+                       'total_purchase_cost': '6.00'}],
+    })
+    assert response.status_code == 201, response.get_json()
+
+    for single_id, delivered_id in zip(single, delivered):
+        expected = _fields(db_session.get(Product, single_id), PRODUCT_FIELDS)
+        assert _fields(db_session.get(Product, delivered_id), PRODUCT_FIELDS) == expected
+        for model in (PurchaseHistory, StockHistory):
+            assert db_session.query(model).filter_by(product_id=single_id).count() == \
+                   db_session.query(model).filter_by(product_id=delivered_id).count() == 1
+    assert _fields(db_session.get(PackagingMaterial, packaging_ids[1]), PACKAGING_FIELDS) == \
+           _fields(db_session.get(PackagingMaterial, packaging_ids[0]), PACKAGING_FIELDS)
@@ -0,0 +1,36 @@
+from decimal import Decimal
+
+from models import Product
+from tests.factories import make_customer, make_product
+
+
+def test_sales_count_from_null_selling_totals(db_session, client):
+    """Товари, створені без selling_quantity / selling_total_price (NULL), продаються обома шляхами."""
+    customer = make_customer(db_session)
+    product = make_product(db_session, quantity=10, selling_quantity=None, selling_total_price=None)
+    db_session.commit()
+    product_id, customer_id = product.id, customer.id
+    db_session.remove()
+
+    response = client.post(f'/api/product/{product_id}/sale', json={
+        'customer': customer_id, 'quantity': 2, 'selling_price_per_item': 5, 'selling_total_price': 10,
+    })
+    assert response.status_code == 201, response.get_json()
+    product = db_session.get(Product, product_id)
+    # NULL + 2 у SQL дав би NULL без жодної помилки
+    assert (product.selling_quantity, product.selling_total_price) == (2, Decimal('10'))
+
+    db_session.query(Product).filter(Product.id == product_id).update(
+        {'selling_quantity': None, 'selling_total_price': None})
+    db_session.commit()
+    db_session.remove()
+
+    response = client.post('/api/orders', json={
+        'customer_id': customer_id,
+        'products': [{'product_id': product_id, 'quantity': 3, 'selling_price_per_item': 5}],
+    })
+    assert response.status_code == 201, response.get_json()
+
+    product = db_session.get(Product, product_id)
+    assert (product.available_quantity, product.sold_quantity, product.selling_quantity) == (5, 5, 3)
+    assert product.selling_total_price == Decimal('15')
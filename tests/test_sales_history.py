@@ -0,0 +1,61 @@
+from sqlalchemy import update
+
+from models import GiftSetSalesHistory
+from services.sales_history_services import query_product_sales, query_gift_set_sales, serialize_product_sale, \
+    serialize_gift_set_sale
+from tests.factories import seed_sales_history, BASE_DATE
+
+N_SALES = 10
+N_GIFT_SETS = 4
+
+
+def _load_product_sales(db_session):
+    return [serialize_product_sale(sale) for sale in query_product_sales(db_session).all()]
+
+
+def _load_gift_set_sales(db_session):
+    return [serialize_gift_set_sale(sale) for sale in query_gift_set_sales(db_session).all()]
+
+
+def _count(count_queries, db_session, load):
+    """Кількість запитів на читання і серіалізацію; сесія порожня, тож нічого не береться з identity map."""
+    db_session.remove()
+    with count_queries() as counter:
+        rows = load()
+    db_session.remove()
+    return counter.count, len(rows)
+
+
+def test_query_count_does_not_grow_with_rows(db_session, client, count_queries):
+    loaders = {
+        'product sales': lambda: _load_product_sales(db_session),
+        'gift set sales': lambda: _load_gift_set_sales(db_session),
+        'all sales endpoint': lambda: client.get('/api/get_all_sales_history').get_json(),
+        'all sales ndjson': lambda: client.get(
+            '/api/get_all_sales_history', headers={'Accept': 'application/x-ndjson'}
+        ).get_data(as_text=True).splitlines(),
+        'sales page endpoint': lambda: client.get('/api/get_sales_history_page?limit=500').get_json()['items'],
+    }
+
+    seed_sales_history(db_session, N_SALES, N_GIFT_SETS)
+    small = {name: _count(count_queries, db_session, load) for name, load in loaders.items()}
+
+    seed_sales_history(db_session, N_SALES, N_GIFT_SETS)  # Удвічі більше рядків історії
+    large = {name: _count(count_queries, db_session, load) for name, load in loaders.items()}
+
+    for name in loaders:
+        (small_queries, small_rows), (large_queries, large_rows) = small[name], large[name]
+        assert large_rows > small_rows, name
+        assert large_queries == small_queries, f'{name}: {small_queries} -> {large_queries} queries'
+
+
+def test_sales_page_puts_gift_sets_first_within_a_date(db_session, client):
+    seed_sales_history(db_session, 1, 1)
+    db_session.execute(update(GiftSetSalesHistory).values(sold_at=BASE_DATE))  # Та сама мить, що й продаж товару
+    db_session.commit()
+
+    first = client.get('/api/get_sales_history_page?limit=1').get_json()
+    second = client.get(f'/api/get_sales_history_page?limit=1&cursor={first["next_cursor"]}').get_json()
+
+    assert [item['type'] for item in first['items'] + second['items']] == ['gift_set', 'product']
+    assert second['next_cursor'] is None
@@ -0,0 +1,127 @@
+import re
+
+import pytest
+
+from models import GiftSet, GiftSetProduct, GiftSetPackaging
+from services.serializers import PRODUCT_FIELDS, PACKAGING_MATERIAL_FIELDS, CUSTOMER_FIELDS, SUPPLIER_FIELDS, \
+    GIFT_SET_FIELDS, SUPPLIER_PROJECTION, PACKAGING_SUPPLIER_PROJECTION
+from tests.factories import make_product, make_packaging
+
+# Поля списку, які не є власними колонками його таблиці: що саме вони додають до запиту
+NESTED = {'supplier', 'category_ids', 'type', 'products', 'packagings'}
+
+
+def _combinations(allowed):
+    """None (усі поля), кожне поле окремо і кожне поле разом з id."""
+    yield None
+    for field in allowed:
+        yield (field,)
+        if field != 'id':
+            yield ('id', field)
+
+
+def _selected_columns(statement):
+    """Колонки table.column зі списку SELECT верхнього рівня (до першого FROM)."""
+    select_list = statement.split('\nFROM ', 1)[0]
+    return set(re.findall(r'\b(\w+\.\w+)\b', select_list))
+
+
+def _selects(client, count_queries, url, fields):
+    """SELECT-запити одного запиту до ендпоінта з ?fields=."""
+    query = f'?fields={",".join(fields)}' if fields else ''
+    with count_queries() as counter:
+        response = client.get(url + query)
+    assert response.status_code == 200, response.get_data(as_text=True)
+    return [statement for statement in counter.statements if statement.lstrip().startswith('SELECT')]
+
+
+def _from(statements, table):
+    return [statement for statement in statements if re.search(rf'\nFROM {table}\b', statement)]
+
+
+def _own(table, fields, allowed):
+    keys = allowed if fields is None else fields
+    return {f'{table}.{key}' for key in keys if key not in NESTED}
+
+
+def _columns(table, projection):
+    return {f'{table}.{key}' for key in projection.keys}
+
+
+@pytest.fixture
+def seeded(db_session):
+    product = make_product(db_session)
+    packaging = make_packaging(db_session)
+    gift_set = GiftSet(name='Projected set', description='', total_price=10, gift_selling_price=20)
+    gift_set.gift_set_products.append(GiftSetProduct(product_id=product.id, quantity=1))
+    gift_set.gift_set_packagings.append(GiftSetPackaging(packaging_id=packaging.id, quantity=1))
+    db_session.add(gift_set)
+    db_session.commit()
+    db_session.remove()
+
+
+@pytest.mark.parametrize('fields', list(_combinations(PRODUCT_FIELDS)))
+def test_products_select_only_projected_columns(seeded, client, count_queries, fields):
+    [statement] = _from(_selects(client, count_queries, '/api/get_all_products/', fields), 'products')
+    wants = lambda key: fields is None or key in fields  # noqa: E731
+
+    expected = _own('products', fields, PRODUCT_FIELDS)
+    if wants('supplier'):
+        expected |= _columns('suppliers', SUPPLIER_PROJECTION)
+    if wants('category_ids'):
+        expected.add('anon_1.category_ids')
+    assert _selected_columns(statement) == expected
+    assert ('JOIN suppliers' in statement) == wants('supplier')
+    assert ('array_agg' in statement) == wants('category_ids')
+
+
+@pytest.mark.parametrize('fields', list(_combinations(PACKAGING_MATERIAL_FIELDS)))
+def test_packaging_select_only_projected_columns(seeded, client, count_queries, fields):
+    [statement] = _from(_selects(client, count_queries, '/api/packaging/get_all_packaging_materials', fields),
+                        'packaging_materials')
+    with_supplier = fields is None or 'supplier' in fields
+
+    expected = _own('packaging_materials', fields, PACKAGING_MATERIAL_FIELDS)
+    if with_supplier:
+        expected |= _columns('packaging_material_suppliers', PACKAGING_SUPPLIER_PROJECTION)
+    assert _selected_columns(statement) == expected
+    assert ('JOIN packaging_material_suppliers' in statement) == with_supplier
+
+
+@pytest.mark.parametrize('fields', list(_combinations(CUSTOMER_FIELDS)))
+def test_customers_select_only_projected_columns(seeded, client, count_queries, fields):
+    [statement] = _from(_selects(client, count_queries, '/api/customers/get_all_customers', fields), 'customers')
+
+    assert _selected_columns(statement) == _own('customers', fields, CUSTOMER_FIELDS)
+    assert 'JOIN' not in statement
+
+
+@pytest.mark.parametrize('fields', list(_combinations(SUPPLIER_FIELDS)))
+def test_suppliers_select_only_projected_columns(seeded, client, count_queries, fields):
+    statements = _selects(client, count_queries, '/api/suppliers/get_suppliers_list', fields)
+    for table in ('suppliers', 'packaging_material_suppliers'):
+        [statement] = _from(statements, table)
+
+        assert _selected_columns(statement) == _own(table, fields, SUPPLIER_FIELDS)
+        assert 'JOIN' not in statement
+
+
+@pytest.mark.parametrize('fields', list(_combinations(GIFT_SET_FIELDS)))
+def test_gift_sets_select_only_projected_columns(seeded, client, count_queries, fields):
+    wants = lambda key: fields is None or key in fields  # noqa: E731
+
+    statements = _selects(client, count_queries, '/api/get_all_gift_sets', fields)
+    [statement] = _from(statements, 'gift_set')
+    # id набору потрібен завжди — за ним збирається склад
+    assert _selected_columns(statement) == _own('gift_set', fields, GIFT_SET_FIELDS) | {'gift_set.id'}
+    assert 'JOIN' not in statement
+
+    items = _from(statements, 'gift_set_product')
+    assert len(items) == wants('products')
+    if items:
+        assert 'JOIN products' in items[0]
+
+    items = _from(statements, 'gift_set_packaging')
+    assert len(items) == wants('packagings')
+    if items:
+        assert 'JOIN packaging_materials' in items[0]
@@ -0,0 +1,78 @@
+"""
+Навантажувальна перевірка очищення сесії після кожного запиту (teardown_appcontext).
+
+Кожен раунд — п'ять запитів, один з них падає з винятком. За замовчуванням 300 раундів (1500 запитів
+після розігріву), щоб тест лишався швидким у CI. Для повного прогону на 100 тисяч запитів задайте
+SESSION_LOAD_ROUNDS=20000.
+"""
+import gc
+import logging
+import os
+import tracemalloc
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+
+from models import Product
+from postgreSQLConnect import get_pool_status
+from tests.factories import make_product, make_supplier
+
+ROUNDS = int(os.getenv('SESSION_LOAD_ROUNDS', 300))
+REQUESTS_PER_ROUND = 5
+WARMUP_ROUNDS = 50
+
+
+def _failing_request(app, db_session):
+    """Запит, що падає посеред транзакції: teardown_appcontext отримує виняток і має відкотити сесію."""
+    with pytest.raises(SQLAlchemyError):
+        with app.test_request_context('/api/product/1'):
+            db_session.execute(text('SELECT * FROM products'))
+            db_session.execute(text('SELECT 1 / 0'))
+
+
+def _live_products():
+    gc.collect()
+    return sum(1 for obj in gc.get_objects() if isinstance(obj, Product))
+
+
+def test_requests_release_connections_and_identity_map(app, client, db_session, monkeypatch):
+    # Інакше записи логу кожного запиту накопичує перехоплення логів pytest, а не застосунок
+    monkeypatch.setattr(logging.getLogger('app_logger'), 'propagate', False)
+    supplier = make_supplier(db_session)
+    product_ids = [make_product(db_session, supplier=supplier).id for _ in range(20)]
+    db_session.commit()
+    db_session.remove()
+
+    def run_round(i):
+        responses = [
+            client.get('/api/get_all_products/'),
+            client.get(f'/api/product/{product_ids[i % len(product_ids)]}'),
+            client.get('/api/product/999999'),
+            client.post('/api/add_new_product', json={'name': 'Broken'}),
+        ]
+        assert [r.status_code for r in responses] == [200, 200, 404, 400]
+        _failing_request(app, db_session)
+
+        # Після кожного запиту з'єднання повернуто в пул, а сесію потоку прибрано разом з identity map
+        assert get_pool_status()['checked_out'] == 0
+        assert not db_session.registry.has()
+
+    for i in range(WARMUP_ROUNDS):
+        run_round(i)
+
+    tracemalloc.start()
+    try:
+        start, _ = tracemalloc.get_traced_memory()
+        for i in range(ROUNDS):
+            run_round(i)
+        gc.collect()
+        end, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    # Жоден запит не лишає завантажених товарів живими
+    assert _live_products() == 0
+    # Запити (п'ята частина з винятком) не накопичують пам'ять: допускаємо кеші компіляції та метрик
+    assert end - start < 512 * 1024, \
+        f'memory grew by {(end - start) / 1024:.0f} KiB over {ROUNDS * REQUESTS_PER_ROUND} requests'